@@ -1 +1,17 @@
 """PI Infer API package."""
+import time
+
+# 最早的计时点，用于在 /version 中报告启动耗时
+IMPORT_STARTED = time.perf_counter()
+
+
+def __getattr__(name: str):
+    # 延迟到首次访问时才构造应用，导入子模块（如 app.config）不会触发应用初始化
+    if name == "app":
+        from app.main import app
+
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ["app"]
@@ -1,4 +1,197 @@
-from app.main import app
+"""
+命令行入口：整机状态导出/导入，模型增量更新
 
+    python -m app export [-o FILE] [--url URL] [--dedup-against URL]
+    python -m app import [FILE] [--url URL]
+    python -m app delta NEW_MODEL --base NAME [--model NAME] [--block-size N] [--url URL] [-o FILE]
 
-__all__ = ["app"]
+不指定 --url 时直接读写本机数据目录（按 PI_INFER_* 环境变量与 .env），否则通过该板卡的 API 流式传输。
+FILE 为 "-" 或省略时使用标准输出/标准输入，因此克隆板卡只需一条管道：
+
+    python -m app export --url http://board-1:8000 --dedup-against http://board-2:8000 \\
+        | python -m app import --url http://board-2:8000
+
+delta 取得板上 --base 模型的块签名，为本地的新模型生成增量指令流并上传到 /model/patch
+（或在本机直接应用）；指定 -o 时只写出指令流。
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, List, Optional
+import argparse
+import hashlib
+import json
+import sys
+import tempfile
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app", description="PI Infer state export/import")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="stream the device state as a tar archive")
+    export.add_argument("-o", "--output", default="-", help="output file, '-' for stdout")
+    export.add_argument("--url", help="export from this board's API instead of the local data directory")
+    export.add_argument(
+        "--dedup-against",
+        metavar="URL",
+        help="skip model data the target board already has (reads its /state/manifest)",
+    )
+
+    restore = commands.add_parser("import", help="apply a state archive")
+    restore.add_argument("input", nargs="?", default="-", help="archive file, '-' for stdin")
+    restore.add_argument("--url", help="import into this board's API instead of the local data directory")
+
+    delta = commands.add_parser("delta", help="update a model on the board by sending only the changed blocks")
+    delta.add_argument("file", type=Path, help="new model file")
+    delta.add_argument("--base", required=True, help="model on the board to build the delta against")
+    delta.add_argument("--model", help="name of the patched model (default: replace --base)")
+    delta.add_argument("--block-size", type=int, help="signature block size in bytes (default 65536)")
+    delta.add_argument("--url", help="patch this board through its API instead of the local data directory")
+    delta.add_argument("-o", "--output", help="only write the delta stream to this file ('-' for stdout)")
+
+    args = parser.parse_args(argv)
+    try:
+        if args.command == "export":
+            known = _known_models(args.dedup_against) if args.dedup_against else []
+            with _open(args.output, "wb") as output:
+                _export(output, args.url, known)
+        elif args.command == "delta":
+            result = _delta(args.file, args.base, args.model, args.block_size, args.url, args.output)
+            if result is not None:
+                print(json.dumps(result, indent=2, ensure_ascii=False))
+        else:
+            with _open(args.input, "rb") as source:
+                result = _import(source, args.url)
+            print(json.dumps(result, indent=2, ensure_ascii=False))
+    except Exception as exc:  # noqa: BLE001 - 命令行统一输出错误
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _export(output: IO[bytes], url: Optional[str], known: List[str]) -> None:
+    if url:
+        import httpx
+
+        params = {"known": ",".join(known)} if known else None
+        with httpx.stream("GET", f"{url.rstrip('/')}/state/export", params=params, timeout=None) as response:
+            _raise_for_status(response)
+            for chunk in response.iter_raw(CHUNK_SIZE):
+                output.write(chunk)
+        return
+    _, chunks = _local_state().export(known)
+    for chunk in chunks:
+        output.write(chunk)
+
+
+def _import(source: IO[bytes], url: Optional[str]) -> dict:
+    if url:
+        import httpx
+
+        response = httpx.post(f"{url.rstrip('/')}/state/import", content=_iter_file(source), timeout=None)
+        _raise_for_status(response)
+        return response.json()
+    return _local_state().import_state(source)
+
+
+def _delta(
+    path: Path,
+    base: str,
+    model: Optional[str],
+    block_size: Optional[int],
+    url: Optional[str],
+    output: Optional[str],
+) -> Optional[Dict[str, Any]]:
+    from app.managers.model_delta import DEFAULT_BLOCK_SIZE, make_delta
+
+    block_size = block_size or DEFAULT_BLOCK_SIZE
+
+    if url:
+        import httpx
+
+        response = httpx.get(
+            f"{url.rstrip('/')}/model/signature", params={"model": base, "block_size": block_size}, timeout=None
+        )
+        _raise_for_status(response)
+        signature = response.json()
+    else:
+        signature = _local_registry().model_manager.signature(base, block_size)
+    chunks = make_delta(signature, path)
+    if output:
+        with _open(output, "wb") as target:
+            for chunk in chunks:
+                target.write(chunk)
+        return None
+    params: Dict[str, Any] = {"base": base, "sha256": _sha256(path), "block_size": block_size}
+    if model:
+        params["model"] = model
+    if url:
+        response = httpx.post(f"{url.rstrip('/')}/model/patch", params=params, content=chunks, timeout=None)
+        _raise_for_status(response)
+        return response.json()
+    with tempfile.TemporaryFile() as spool:
+        for chunk in chunks:
+            spool.write(chunk)
+        spool.seek(0)
+        return _local_registry().model_manager.patch(spool, base, params["sha256"], model, block_size)
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in _iter_file(handle):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _known_models(url: str) -> List[str]:
+    import httpx
+
+    response = httpx.get(f"{url.rstrip('/')}/state/manifest", timeout=30)
+    _raise_for_status(response)
+    return [entry["sha256"] for entry in response.json().get("models", [])]
+
+
+def _local_state():  # type: ignore[no-untyped-def]
+    return _local_registry().state_manager
+
+
+def _local_registry():  # type: ignore[no-untyped-def]
+    from app.config import load_settings
+    from app.managers.registry import ManagerRegistry
+
+    return ManagerRegistry(load_settings())
+
+
+def _raise_for_status(response) -> None:  # type: ignore[no-untyped-def]
+    if response.is_success:
+        return
+    response.read()
+    try:
+        detail = response.json().get("detail")
+    except ValueError:
+        detail = response.text
+    raise RuntimeError(f"{response.request.method} {response.request.url} -> {response.status_code}: {detail}")
+
+
+def _iter_file(source: IO[bytes]) -> Iterator[bytes]:
+    while True:
+        chunk = source.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _open(path: str, mode: str) -> IO[bytes]:
+    if path == "-":
+        stream = sys.stdout.buffer if "w" in mode else sys.stdin.buffer
+        return open(stream.fileno(), mode, closefd=False)
+    return open(path, mode)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
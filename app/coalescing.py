@@ -0,0 +1,141 @@
+"""
+读接口的请求合并与短时缓存
+
+多个看板在同一时刻刷新时，相同参数的 /logs、/history、/model/list、/status/system 请求
+只计算一次：并发的相同请求等待同一次计算（single-flight），结果再缓存 ttl 秒。
+任何写请求（POST/PUT/PATCH/DELETE）完成时整体失效，失效前已开始的计算结果不会写入缓存。
+不经过本 worker 写请求的变化（推理进程退出、任务队列、其他 worker 的写入）最多滞后 ttl 秒可见。
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+import threading
+import time
+
+T = TypeVar("T")
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+@dataclass
+class _Flight:
+    """一次进行中的计算"""
+    generation: int
+    done: threading.Event = field(default_factory=threading.Event)
+    value: Any = None
+    error: Optional[BaseException] = None
+
+
+class RequestCoalescer:
+    """
+    single-flight + TTL 缓存
+
+    Args:
+        ttl: 结果缓存秒数，0 表示只合并并发请求、不缓存
+        max_entries: 最多缓存的结果数，超出时先丢弃最早过期的
+    """
+
+    def __init__(self, ttl: float = 0.5, max_entries: int = 256) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.invalidations = 0
+        self._entries: Dict[Tuple[str, Hashable], Tuple[float, Any]] = {}
+        self._flights: Dict[Tuple[str, Hashable], _Flight] = {}
+        self._generation = 0
+        self._counters: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0, "coalesced": 0})
+        self._lock = threading.Lock()
+
+    def get(self, name: str, key: Hashable, compute: Callable[[], T]) -> T:
+        """
+        返回缓存结果；没有时合并到进行中的相同计算，或自己计算
+
+        compute 抛出的异常会传给所有等待者，且不缓存。
+        """
+        cache_key = (name, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._counters[name]["hits"] += 1
+                return entry[1]
+            flight = self._flights.get(cache_key)
+            leader = flight is None
+            if flight is None:
+                flight = _Flight(generation=self._generation)
+                self._flights[cache_key] = flight
+                self._counters[name]["misses"] += 1
+            else:
+                self._counters[name]["coalesced"] += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = compute()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(cache_key, None)
+                if flight.error is None and self.ttl > 0 and flight.generation == self._generation:
+                    self._store(cache_key, flight.value)
+            flight.done.set()
+        return flight.value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            endpoints = {name: dict(counts) for name, counts in self._counters.items()}
+            totals = {
+                metric: sum(counts[metric] for counts in endpoints.values())
+                for metric in ("hits", "misses", "coalesced")
+            }
+            return {
+                "ttl": self.ttl,
+                "entries": len(self._entries),
+                "in_flight": len(self._flights),
+                "invalidations": self.invalidations,
+                **totals,
+                "endpoints": endpoints,
+            }
+
+    def _store(self, cache_key: Tuple[str, Hashable], value: Any) -> None:
+        now = time.monotonic()
+        if len(self._entries) >= self.max_entries:
+            for stale in [key for key, (expires, _) in self._entries.items() if expires <= now]:
+                del self._entries[stale]
+            while len(self._entries) >= self.max_entries:
+                del self._entries[min(self._entries, key=lambda key: self._entries[key][0])]
+        self._entries[cache_key] = (now + self.ttl, value)
+
+
+class InvalidateOnWriteMiddleware:
+    """写请求开始响应时（以及结束后）使缓存失效；读请求直接透传"""
+
+    def __init__(self, app: Any, coalescer: RequestCoalescer) -> None:
+        self.app = app
+        self.coalescer = coalescer
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                self.coalescer.invalidate()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.coalescer.invalidate()
@@ -0,0 +1,211 @@
+"""
+响应压缩
+
+按 Accept-Encoding 与服务端偏好（PI_INFER_COMPRESSION）协商 zstd/br/gzip：
+小于 min_size 的响应原样返回；一次性响应整体压缩并改写 Content-Length；
+流式响应（日志下载等）逐块压缩并 flush，客户端可以边收边解。
+brotli 与 zstandard 为可选依赖，未安装时对应编码不参与协商。
+已压缩的内容（zip、tar、模型文件等）、Range 响应与 SSE 不压缩。
+压缩后的表示与原始字节不同，强 ETag 追加编码后缀（"<hash>-gzip"），If-Match 比较前用 base_etag 去掉。
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import zlib
+
+try:
+    import brotli
+except ImportError:  # 可选依赖
+    brotli = None  # type: ignore[assignment]
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖
+    zstandard = None  # type: ignore[assignment]
+
+ENCODINGS = ("zstd", "br", "gzip")
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml", "image/svg+xml")
+EXCLUDED_TYPES = ("text/event-stream",)
+
+
+class _Encoder:
+    """单个响应的压缩器"""
+
+    def __init__(self, encoding: str) -> None:
+        self.encoding = encoding
+        if encoding == "zstd":
+            self._zstd = zstandard.ZstdCompressor(level=3).compressobj()
+        elif encoding == "br":
+            self._brotli = brotli.Compressor(quality=4)
+        else:
+            self._gzip = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, flush: bool) -> bytes:
+        """压缩一块数据；flush 为 True 时输出到目前为止的全部数据（流式响应每块调用）"""
+        if self.encoding == "zstd":
+            out = self._zstd.compress(data)
+            return out + self._zstd.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK) if flush else out
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + self._brotli.flush() if flush else out
+        out = self._gzip.compress(data)
+        return out + self._gzip.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def finish(self) -> bytes:
+        if self.encoding == "zstd":
+            return self._zstd.flush()
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._gzip.flush()
+
+
+def base_etag(value: str) -> str:
+    """去掉引号、弱校验前缀与压缩编码后缀，得到原始内容的 ETag 值"""
+    tag = value.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    for encoding in ENCODINGS:
+        if tag.endswith(f"-{encoding}"):
+            return tag[: -len(encoding) - 1]
+    return tag
+
+
+def available_encodings(preference: str) -> List[str]:
+    """按偏好顺序返回本机可用的编码"""
+    installed = {"gzip": True, "br": brotli is not None, "zstd": zstandard is not None}
+    return [name for name in (item.strip() for item in preference.split(",")) if installed.get(name)]
+
+
+def negotiate(accept_encoding: str, encodings: List[str]) -> Optional[str]:
+    """按服务端偏好选择客户端接受（q > 0）的编码"""
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in encodings:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+class CompressionMiddleware:
+    """
+    协商压缩的 ASGI 中间件
+
+    Args:
+        app: 下游应用
+        encodings: 服务端偏好的编码顺序（如 ["zstd", "br", "gzip"]）
+        min_size: 小于该字节数的一次性响应不压缩
+    """
+
+    def __init__(self, app: Any, encodings: List[str], min_size: int = 1024) -> None:
+        self.app = app
+        self.encodings = encodings
+        self.min_size = min_size
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        encoding = negotiate(headers.get(b"accept-encoding", b"").decode("latin-1"), self.encodings)
+        if encoding is None or b"range" in headers:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSend(send, encoding, self.min_size))
+
+
+class _CompressingSend:
+    def __init__(self, send: Callable, encoding: str, min_size: int) -> None:
+        self.send = send
+        self.encoding = encoding
+        self.min_size = min_size
+        self.start: Optional[Dict[str, Any]] = None
+        self.encoder: Optional[_Encoder] = None
+        self.passthrough = False
+
+    async def __call__(self, message: Dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            self.passthrough = not _compressible(message)
+            if self.passthrough:
+                await self.send(message)
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.encoder is None:
+            assert self.start is not None
+            length = _content_length(self.start)
+            small = len(body) < self.min_size if not more_body else (length is not None and length < self.min_size)
+            if small:
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send(message)
+                return
+            self.encoder = _Encoder(self.encoding)
+            if not more_body:
+                compressed = self.encoder.compress(body, flush=False) + self.encoder.finish()
+                await self.send(_with_encoding(self.start, self.encoding, len(compressed)))
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+            await self.send(_with_encoding(self.start, self.encoding, None))
+        if more_body:
+            chunk = self.encoder.compress(body, flush=True)
+            if chunk:
+                await self.send({"type": "http.response.body", "body": chunk, "more_body": True})
+        else:
+            chunk = self.encoder.compress(body, flush=False) + self.encoder.finish()
+            await self.send({"type": "http.response.body", "body": chunk})
+
+
+def _header(message: Dict[str, Any], name: bytes) -> Optional[bytes]:
+    for key, value in message.get("headers", []):
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _content_length(message: Dict[str, Any]) -> Optional[int]:
+    value = _header(message, b"content-length")
+    return int(value) if value is not None and value.isdigit() else None
+
+
+def _compressible(message: Dict[str, Any]) -> bool:
+    if message.get("status", 200) in (204, 206, 304) or _header(message, b"content-encoding") is not None:
+        return False
+    content_type = (_header(message, b"content-type") or b"").decode("latin-1").lower()
+    if content_type.startswith(EXCLUDED_TYPES):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES) or content_type.endswith("+json")
+
+
+def _with_encoding(message: Dict[str, Any], encoding: str, length: Optional[int]) -> Dict[str, Any]:
+    headers: List[Tuple[bytes, bytes]] = [
+        (key, value)
+        for key, value in message.get("headers", [])
+        if key.lower() not in (b"content-length", b"vary", b"etag")
+    ]
+    etag = _header(message, b"etag")
+    if etag is not None:
+        # 不同编码的字节不同，强 ETag 加上编码后缀以免共用同一个强校验值
+        if not etag.startswith(b"W/") and etag.endswith(b'"'):
+            etag = etag[:-1] + b"-" + encoding.encode("latin-1") + b'"'
+        headers.append((b"etag", etag))
+    vary = _header(message, b"vary")
+    headers.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+    headers.append((b"content-encoding", encoding.encode("latin-1")))
+    if length is not None:
+        headers.append((b"content-length", str(length).encode("latin-1")))
+    return {**message, "headers": headers}
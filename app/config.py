@@ -3,6 +3,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Optional
 import os
 
 from dotenv import load_dotenv
@@ -22,6 +23,40 @@ class Settings:
     version: str
     build_time: str
     git_commit: str
+    preload_model: bool = True
+    stop_timeout: float = 5.0
+    profile_rate: float = 0.0
+    profile_token: str = ""
+    profile_keep: int = 50
+    startup_budget: float = 2.0
+    run_dir: Optional[Path] = None
+    detach_inference: bool = False
+    job_poll_interval: float = 1.0
+    sweep_dir: Optional[Path] = None
+    governor_policy: str = ""
+    governor_temp_high: float = 80.0
+    governor_temp_low: float = 70.0
+    governor_cpu_high: float = 0.0
+    governor_memory_high: float = 0.0
+    governor_interval: float = 2.0
+    governor_duty: float = 0.5
+    governor_nice: int = 10
+    governor_fallback_model: str = ""
+    limit_memory: str = ""
+    limit_cpu: float = 0.0
+    limit_cpuset: str = ""
+    api_cpus: str = ""
+    cgroup_root: Path = Path("/sys/fs/cgroup")
+    result_socket: Optional[Path] = None
+    result_queue: int = 256
+    fleet_boards: str = ""
+    fleet_timeout: float = 2.0
+    fleet_cache_ttl: float = 2.0
+    cache_ttl: float = 0.5
+    model_quota: str = ""
+    model_min_free: str = ""
+    compression: str = "zstd,br,gzip"
+    compress_min_size: int = 1024
 
 
 def load_settings() -> Settings:
@@ -51,6 +86,41 @@ def load_settings() -> Settings:
         "PI_INFER_BUILD_TIME", datetime.now(timezone.utc).isoformat()
     )
     git_commit = os.getenv("PI_INFER_GIT_COMMIT", "unknown")
+    preload_model = os.getenv("PI_INFER_PRELOAD_MODEL", "1") != "0"
+    stop_timeout = float(os.getenv("PI_INFER_STOP_TIMEOUT", "5"))
+    profile_rate = float(os.getenv("PI_INFER_PROFILE_RATE", "0"))
+    profile_token = os.getenv("PI_INFER_PROFILE_TOKEN", "")
+    profile_keep = int(os.getenv("PI_INFER_PROFILE_KEEP", "50"))
+    startup_budget = float(os.getenv("PI_INFER_STARTUP_BUDGET", "2"))
+    run_dir = Path(os.getenv("PI_INFER_RUN_DIR", data_dir / "run")).resolve()
+    detach_inference = os.getenv("PI_INFER_DETACH", "0") == "1"
+    job_poll_interval = float(os.getenv("PI_INFER_JOB_POLL_INTERVAL", "1"))
+    sweep_dir = Path(os.getenv("PI_INFER_SWEEP_DIR", data_dir / "sweeps")).resolve()
+    governor_policy = os.getenv("PI_INFER_GOVERNOR_POLICY", "")
+    governor_temp_high = float(os.getenv("PI_INFER_GOVERNOR_TEMP_HIGH", "80"))
+    governor_temp_low = float(os.getenv("PI_INFER_GOVERNOR_TEMP_LOW", "70"))
+    governor_cpu_high = float(os.getenv("PI_INFER_GOVERNOR_CPU_HIGH", "0"))
+    governor_memory_high = float(os.getenv("PI_INFER_GOVERNOR_MEMORY_HIGH", "0"))
+    governor_interval = float(os.getenv("PI_INFER_GOVERNOR_INTERVAL", "2"))
+    governor_duty = float(os.getenv("PI_INFER_GOVERNOR_DUTY", "0.5"))
+    governor_nice = int(os.getenv("PI_INFER_GOVERNOR_NICE", "10"))
+    governor_fallback_model = os.getenv("PI_INFER_GOVERNOR_FALLBACK_MODEL", "")
+    limit_memory = os.getenv("PI_INFER_LIMIT_MEMORY", "")
+    limit_cpu = float(os.getenv("PI_INFER_LIMIT_CPU", "0"))
+    limit_cpuset = os.getenv("PI_INFER_LIMIT_CPUSET", "")
+    api_cpus = os.getenv("PI_INFER_API_CPUS", "")
+    cgroup_root = Path(os.getenv("PI_INFER_CGROUP_ROOT", "/sys/fs/cgroup"))
+    result_socket_raw = os.getenv("PI_INFER_RESULT_SOCKET", "")
+    result_socket = Path(result_socket_raw).resolve() if result_socket_raw else None
+    result_queue = int(os.getenv("PI_INFER_RESULT_QUEUE", "256"))
+    fleet_boards = os.getenv("PI_INFER_FLEET_BOARDS", "")
+    fleet_timeout = float(os.getenv("PI_INFER_FLEET_TIMEOUT", "2"))
+    fleet_cache_ttl = float(os.getenv("PI_INFER_FLEET_CACHE_TTL", "2"))
+    cache_ttl = float(os.getenv("PI_INFER_CACHE_TTL", "0.5"))
+    model_quota = os.getenv("PI_INFER_MODEL_QUOTA", "")
+    model_min_free = os.getenv("PI_INFER_MODEL_MIN_FREE", "")
+    compression = os.getenv("PI_INFER_COMPRESSION", "zstd,br,gzip")
+    compress_min_size = int(os.getenv("PI_INFER_COMPRESS_MIN_SIZE", "1024"))
 
     return Settings(
         base_dir=base_dir,
@@ -65,4 +135,38 @@ def load_settings() -> Settings:
         version=version,
         build_time=build_time,
         git_commit=git_commit,
+        preload_model=preload_model,
+        stop_timeout=stop_timeout,
+        profile_rate=profile_rate,
+        profile_token=profile_token,
+        profile_keep=profile_keep,
+        startup_budget=startup_budget,
+        run_dir=run_dir,
+        detach_inference=detach_inference,
+        job_poll_interval=job_poll_interval,
+        sweep_dir=sweep_dir,
+        governor_policy=governor_policy,
+        governor_temp_high=governor_temp_high,
+        governor_temp_low=governor_temp_low,
+        governor_cpu_high=governor_cpu_high,
+        governor_memory_high=governor_memory_high,
+        governor_interval=governor_interval,
+        governor_duty=governor_duty,
+        governor_nice=governor_nice,
+        governor_fallback_model=governor_fallback_model,
+        limit_memory=limit_memory,
+        limit_cpu=limit_cpu,
+        limit_cpuset=limit_cpuset,
+        api_cpus=api_cpus,
+        cgroup_root=cgroup_root,
+        result_socket=result_socket,
+        result_queue=result_queue,
+        fleet_boards=fleet_boards,
+        fleet_timeout=fleet_timeout,
+        fleet_cache_ttl=fleet_cache_ttl,
+        cache_ttl=cache_ttl,
+        model_quota=model_quota,
+        model_min_free=model_min_free,
+        compression=compression,
+        compress_min_size=compress_min_size,
     )
@@ -8,21 +8,29 @@ PI Infer API 主应用文件
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import threading
+import time
 
-from fastapi import Body, FastAPI, File, HTTPException, Query, UploadFile
+from fastapi import Body, FastAPI, File, Header, HTTPException, Query, Request, UploadFile, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, PlainTextResponse
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
 
+from app import IMPORT_STARTED
+from app.coalescing import InvalidateOnWriteMiddleware, RequestCoalescer
+from app.compression import CompressionMiddleware, available_encodings, base_etag
 from app.config import Settings, load_settings
-from app.managers import (
-    ConfigManager,
-    HistoryManager,
-    InferenceManager,
-    LogManager,
-    ModelManager,
-    SystemMonitor,
-)
+from app.managers.config_manager import ConfigConflictError
+from app.managers.config_parser import ConfigValidationError
+from app.managers.model_delta import DEFAULT_BLOCK_SIZE
+from app.managers.model_manager import ModelQuotaError
+from app.managers.registry import ManagerRegistry
+from app.profiling import ProfileStore, ProfilingMiddleware, token_matches
+from app.responses import FastJSONResponse, FastJSONRoute
+from app.streaming import consume_request_stream
+from app.utils import process_age_seconds
 
 
 def create_app(settings: Optional[Settings] = None) -> FastAPI:
@@ -35,20 +43,21 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
     Returns:
         配置完成的FastAPI应用实例
     """
+    create_started = time.perf_counter()
     settings = settings or load_settings()
 
-    # 初始化各个管理器
-    log_manager = LogManager(settings.log_dir, settings.log_retention_days)
-    history_manager = HistoryManager(settings.history_file)
-    model_manager = ModelManager(settings.model_dir)
-    config_manager = ConfigManager(settings.config_dir)
-    inference_manager = InferenceManager(
-        settings.infer_binary, log_manager, history_manager
-    )
-    system_monitor = SystemMonitor()
+    # 管理器按需构造，首次使用时才创建实例
+    managers = ManagerRegistry(settings)
 
     # 创建FastAPI应用，设置根路径为/api
-    app = FastAPI(title="PI Infer API", version=settings.version, root_path="/api")
+    app = FastAPI(
+        title="PI Infer API",
+        version=settings.version,
+        root_path="/api",
+        default_response_class=FastJSONResponse,
+    )
+    # 接口返回值直接用 orjson 序列化，跳过 response_model 推断与 jsonable_encoder
+    app.router.route_class = FastJSONRoute
 
     # 配置CORS中间件，允许所有来源的跨域请求
     app.add_middleware(
@@ -56,17 +65,73 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
         allow_origins=["*"],
         allow_methods=["*"],
         allow_headers=["*"],
+        # 跨域部署的 Web UI 需要读取增量日志游标与 ETag
+        expose_headers=["X-Log-Cursor", "ETag"],
+    )
+
+    # 仅在启用时注册采样中间件，未启用时请求路径零开销
+    profile_store = ProfileStore(settings.profile_keep)
+    profiling_enabled = settings.profile_rate > 0 or bool(settings.profile_token)
+    if profiling_enabled:
+        app.add_middleware(
+            ProfilingMiddleware,
+            store=profile_store,
+            rate=settings.profile_rate,
+            token=settings.profile_token,
+        )
+
+    # 读接口的请求合并与短时缓存，任何写请求都会使其失效
+    coalescer = RequestCoalescer(settings.cache_ttl)
+    app.add_middleware(InvalidateOnWriteMiddleware, coalescer=coalescer)
+
+    # 最外层：按 Accept-Encoding 协商压缩（日志等文本约可压缩到 1/10）
+    app.add_middleware(
+        CompressionMiddleware,
+        encodings=available_encodings(settings.compression),
+        min_size=settings.compress_min_size,
     )
 
+    resume_thread: List[threading.Thread] = []
+
+    @app.on_event("startup")
+    def _startup() -> None:
+        """
+        启动时只执行已配置功能的初始化；推理会话对账、任务队列与调速器在后台线程中恢复，
+        不阻塞应用开始处理请求（请求先用到推理管理器时会在首次构造时完成对账）
+        """
+        if settings.api_cpus:
+            managers.resource_limiter.pin_api()
+        if managers.result_channel is not None:
+            managers.result_channel.start()
+        thread = threading.Thread(target=managers.resume, name="startup-resume", daemon=True)
+        thread.start()
+        resume_thread.append(thread)
+
     @app.on_event("shutdown")
     def _shutdown() -> None:
         """应用关闭时的清理工作"""
-        inference_manager.shutdown()
+        for thread in resume_thread:
+            thread.join(timeout=5)
+        if managers.created("governor"):
+            managers.governor.stop()
+        if managers.created("job_queue"):
+            managers.job_queue.stop_worker()
+        if managers.created("inference_manager"):
+            managers.inference_manager.shutdown()
+        if managers.created("result_channel"):
+            managers.result_channel.stop()
+
+    @app.on_event("shutdown")
+    async def _close_fleet() -> None:
+        """关闭聚合模式的连接池"""
+        if managers.created("fleet"):
+            await managers.fleet.close()
 
     @app.post("/inference/start")
     def start_inference(
         model: Optional[str] = Query(default=None),
         config: Optional[str] = Query(default=None),
+        bundle: Optional[str] = Query(default=None),
     ) -> Dict[str, Any]:
         """
         启动推理进程
@@ -74,6 +139,7 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
         Args:
             model: 模型文件名，如果为None则使用当前默认模型
             config: 配置文件名，如果为None则使用当前默认配置
+            bundle: 部署包名，提供时使用包内的模型、配置和运行参数
 
         Returns:
             包含进程PID和日志文件路径的字典
@@ -81,21 +147,33 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
         Raises:
             HTTPException: 当模型或配置不存在，或推理已在运行时抛出
         """
-        model_path = model_manager.get_current() if not model else model_manager.get_model(model)
-        config_path = config_manager.get_current() if not config else config_manager.get_config(config)
+        extra_args: List[str] = []
+        if bundle:
+            try:
+                resolved = managers.bundle_manager.resolve(bundle)
+            except FileNotFoundError as exc:
+                raise HTTPException(status_code=404, detail=str(exc)) from exc
+            model_path = resolved["model_path"]
+            config_path = resolved["config_path"]
+            extra_args = resolved["args"]
+        else:
+            model_path = managers.model_manager.get_current() if not model else managers.model_manager.get_model(model)
+            config_path = managers.config_manager.get_current() if not config else managers.config_manager.get_config(config)
         if not model_path or not config_path:
             raise HTTPException(status_code=400, detail="model or config not set")
         try:
-            pid = inference_manager.start(model_path, config_path)
+            pid = managers.inference_manager.start(model_path, config_path, extra_args)
         except RuntimeError as exc:
             raise HTTPException(status_code=409, detail=str(exc)) from exc
         except FileNotFoundError as exc:
             raise HTTPException(status_code=404, detail=str(exc)) from exc
+        except ValueError as exc:
+            raise HTTPException(status_code=422, detail=str(exc)) from exc
         except Exception as exc:
             raise HTTPException(status_code=500, detail=str(exc)) from exc
         return {
             "pid": pid,
-            "log_file": str(inference_manager.log_file) if inference_manager.log_file else None,
+            "log_file": str(managers.inference_manager.log_file) if managers.inference_manager.log_file else None,
         }
 
     @app.post("/inference/stop")
@@ -110,7 +188,7 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
             HTTPException: 当没有运行中的推理进程时抛出
         """
         try:
-            inference_manager.stop()
+            managers.inference_manager.stop()
         except RuntimeError as exc:
             raise HTTPException(status_code=409, detail=str(exc)) from exc
         return {"status": "stopped"}
@@ -126,13 +204,13 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
         Returns:
             推理状态信息字典，包含运行状态、PID、模型、配置等信息
         """
-        status = inference_manager.status()
+        status = managers.inference_manager.status()
         data = status.__dict__
         
         # If not running, show current defaults
         if not data.get("running"):
-            current_model = model_manager.get_current()
-            current_config = config_manager.get_current()
+            current_model = managers.model_manager.get_current()
+            current_config = managers.config_manager.get_current()
             data["current_model"] = current_model.name if current_model else None
             data["current_config"] = current_config.name if current_config else None
         
@@ -142,6 +220,96 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
             return {field: data[field]}
         return data
 
+    def _result_channel() -> Any:
+        channel = managers.result_channel
+        if channel is None:
+            raise HTTPException(status_code=404, detail="result channel disabled")
+        if not channel.listening:
+            # 套接字由另一个 worker 监听，本 worker 收不到任何结果
+            raise HTTPException(
+                status_code=503,
+                detail="result channel is served by another worker; run the API with a single worker",
+            )
+        return channel
+
+    @app.get("/inference/results")
+    async def stream_results() -> StreamingResponse:
+        """
+        以 SSE 推送推理结果
+
+        每条结果为一个 result 事件（id 为序号），data 中的 dropped 为该连接因积压丢弃的累计条数。
+
+        Raises:
+            HTTPException: 未启用结果通道（404）或本 worker 未监听结果套接字（503）时抛出
+        """
+        subscription = _result_channel().subscribe()
+
+        async def events() -> Any:
+            try:
+                # 客户端断开时 StreamingResponse 会取消本生成器
+                while True:
+                    frames = await subscription.get(timeout=15)
+                    if not frames:
+                        yield ": keepalive\n\n"
+                        continue
+                    for frame in frames:
+                        data = json.dumps({**frame.to_dict(), "dropped": subscription.dropped})
+                        yield f"id: {frame.seq}\nevent: result\ndata: {data}\n\n"
+            finally:
+                subscription.close()
+
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @app.websocket("/inference/results")
+    async def websocket_results(websocket: WebSocket, format: str = Query(default="json")) -> None:
+        """
+        以 WebSocket 推送推理结果
+
+        format=json 时每条结果为一个文本消息；format=binary 时为二进制消息：
+        8 字节序号 + 4 字节累计丢弃数（大端）+ 推理进程写入的原始负载。
+        本 worker 未监听结果套接字（多 worker 部署）时以 1013 关闭连接。
+        """
+        channel = managers.result_channel
+        if channel is None or format not in ("json", "binary"):
+            await websocket.close(code=1008)
+            return
+        if not channel.listening:
+            await websocket.close(code=1013)
+            return
+        await websocket.accept()
+        subscription = channel.subscribe()
+        receiver = asyncio.ensure_future(websocket.receive())
+        try:
+            while True:
+                getter = asyncio.ensure_future(subscription.get())
+                done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+                if receiver in done:
+                    getter.cancel()
+                    if receiver.result()["type"] == "websocket.disconnect":
+                        break
+                    receiver = asyncio.ensure_future(websocket.receive())  # 忽略客户端发来的消息
+                    continue
+                for frame in getter.result():
+                    if format == "binary":
+                        await websocket.send_bytes(frame.to_binary(subscription.dropped))
+                    else:
+                        await websocket.send_json({**frame.to_dict(), "dropped": subscription.dropped})
+        finally:
+            receiver.cancel()
+            subscription.close()
+
+    @app.get("/inference/results/status")
+    def result_channel_status() -> Dict[str, Any]:
+        """返回结果通道状态：套接字、连接的推理进程数、帧数、订阅者与丢弃数"""
+        channel = managers.result_channel
+        if channel is None:
+            return {"enabled": False}
+        return {"enabled": True, **channel.status()}
+
     @app.post("/model/upload")
     def upload_model(
         model: Optional[str] = Query(default=None),
@@ -161,11 +329,73 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
             HTTPException: 当上传失败时抛出
         """
         try:
-            target = model_manager.upload(file, model_name=model)
+            target = managers.model_manager.upload(file, model_name=model)
+        except ModelQuotaError as exc:
+            raise HTTPException(status_code=507, detail=str(exc)) from exc
         except Exception as exc:
             raise HTTPException(status_code=400, detail=str(exc)) from exc
         return {"model": target}
 
+    @app.get("/model/signature")
+    def model_signature(
+        model: str = Query(...),
+        block_size: int = Query(default=DEFAULT_BLOCK_SIZE),
+    ) -> Dict[str, Any]:
+        """
+        获取模型的块签名（增量更新的第一步）
+
+        Args:
+            model: 已有模型文件名
+            block_size: 块大小（字节）
+
+        Returns:
+            包含 size、sha256、block_size 与每块 [弱校验, 强校验] 的字典
+
+        Raises:
+            HTTPException: 当模型不存在或块大小不合法时抛出
+        """
+        try:
+            return managers.model_manager.signature(model, block_size)
+        except FileNotFoundError as exc:
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    @app.post("/model/patch")
+    async def patch_model(
+        request: Request,
+        base: str = Query(...),
+        sha256: str = Query(...),
+        model: Optional[str] = Query(default=None),
+        block_size: int = Query(default=DEFAULT_BLOCK_SIZE),
+    ) -> Dict[str, Any]:
+        """
+        流式上传增量补丁，以已有模型为基础重建新模型
+
+        Args:
+            request: 原始请求，请求体为增量指令流，边接收边重建
+            base: 作为基础的已有模型（即取签名的模型）
+            sha256: 新模型的 sha256，不一致时丢弃结果
+            model: 新模型文件名，默认覆盖 base
+            block_size: 生成补丁时使用的块大小
+
+        Returns:
+            新模型名、大小、sha256 与其中字面数据的字节数
+
+        Raises:
+            HTTPException: 当基础模型不存在、补丁无效或哈希校验失败时抛出
+        """
+        try:
+            return await consume_request_stream(
+                request, managers.model_manager.patch, base, sha256, model, block_size
+            )
+        except ModelQuotaError as exc:
+            raise HTTPException(status_code=507, detail=str(exc)) from exc
+        except FileNotFoundError as exc:
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+
     @app.get("/model/list")
     def list_models(wildcard: Optional[str] = Query(default=None)) -> Dict[str, Any]:
         """
@@ -177,7 +407,9 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
         Returns:
             包含模型文件名列表的字典
         """
-        return {"models": model_manager.list_models(wildcard)}
+        return coalescer.get(
+            "model_list", wildcard, lambda: {"models": managers.model_manager.list_models(wildcard)}
+        )
 
     @app.get("/model/current")
     def current_model() -> Dict[str, Any]:
@@ -187,7 +419,7 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
         Returns:
             包含当前模型文件名的字典
         """
-        current = model_manager.get_current()
+        current = managers.model_manager.get_current()
         return {"model": current.name if current else None}
 
     @app.post("/model/select")
@@ -205,9 +437,11 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
             HTTPException: 当模型文件不存在时抛出
         """
         try:
-            selected = model_manager.set_current(model)
+            selected = managers.model_manager.set_current(model)
         except FileNotFoundError as exc:
             raise HTTPException(status_code=404, detail=str(exc)) from exc
+        if managers.preloader is not None:
+            managers.preloader.schedule(selected)
         return {"model": selected.name}
 
     @app.get("/model/download")
@@ -225,7 +459,7 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
             HTTPException: 当模型文件不存在时抛出
         """
         try:
-            path = model_manager.get_model(model)
+            path = managers.model_manager.get_model(model)
         except FileNotFoundError as exc:
             raise HTTPException(status_code=404, detail=str(exc)) from exc
         return FileResponse(path)
@@ -245,11 +479,81 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
             HTTPException: 当模型文件不存在时抛出
         """
         try:
-            removed = model_manager.delete(model)
+            removed = managers.model_manager.delete(model)
         except FileNotFoundError as exc:
             raise HTTPException(status_code=404, detail=str(exc)) from exc
+        managers.resource_limiter.forget(removed.name)
         return {"deleted": removed.name}
 
+    @app.get("/model/usage")
+    def model_usage() -> Dict[str, Any]:
+        """
+        获取模型存储占用
+
+        Returns:
+            配额、总占用、磁盘剩余空间、每个模型的大小/最近使用时间/固定状态，以及最近的淘汰记录
+        """
+        return managers.model_manager.usage()
+
+    @app.post("/model/pin")
+    def pin_model(model: str = Query(...), pinned: bool = Query(default=True)) -> Dict[str, Any]:
+        """
+        固定或取消固定模型，固定的模型不会因配额被淘汰
+
+        Args:
+            model: 模型文件名
+            pinned: 为False时取消固定
+
+        Raises:
+            HTTPException: 当模型文件不存在时抛出
+        """
+        try:
+            return managers.model_manager.pin(model, pinned)
+        except FileNotFoundError as exc:
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+    @app.get("/model/limits")
+    def get_model_limits(model: str = Query(...)) -> Dict[str, Any]:
+        """
+        获取模型的资源限制
+
+        Returns:
+            configured 为该模型单独配置的限制，effective 为合并全局默认值后实际生效的限制
+        """
+        try:
+            name = managers.model_manager.get_model(model).name
+        except FileNotFoundError as exc:
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        return managers.resource_limiter.get_limits(name)
+
+    @app.post("/model/limits")
+    def set_model_limits(
+        model: str = Query(...),
+        memory_max: Optional[str] = Query(default=None),
+        cpu_max: Optional[float] = Query(default=None, gt=0),
+        cpuset: Optional[str] = Query(default=None),
+    ) -> Dict[str, Any]:
+        """
+        设置模型的资源限制，下次启动推理时生效；全部省略时清除该模型的配置
+
+        Args:
+            model: 模型文件名
+            memory_max: 内存上限（字节或 512M、1G）
+            cpu_max: CPU 配额（核数）
+            cpuset: 可用 CPU 列表（如 2-3）
+        """
+        try:
+            name = managers.model_manager.get_model(model).name
+            return managers.resource_limiter.set_limits(
+                name, {"memory_max": memory_max, "cpu_max": cpu_max, "cpuset": cpuset}
+            )
+        except FileNotFoundError as exc:
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+
     @app.post("/config/upload")
     def upload_config(
         config: Optional[str] = Query(default=None),
@@ -269,7 +573,9 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
             HTTPException: 当上传失败时抛出
         """
         try:
-            target = config_manager.upload(file, config_name=config)
+            target = managers.config_manager.upload(file, config_name=config)
+        except ConfigValidationError as exc:
+            raise HTTPException(status_code=422, detail=exc.errors) from exc
         except Exception as exc:
             raise HTTPException(status_code=400, detail=str(exc)) from exc
         return {"config": target}
@@ -285,7 +591,7 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
         Returns:
             包含配置文件名列表的字典
         """
-        return {"configs": config_manager.list_configs(wildcard)}
+        return {"configs": managers.config_manager.list_configs(wildcard)}
 
     @app.get("/config/current")
     def current_config() -> Dict[str, Any]:
@@ -295,7 +601,7 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
         Returns:
             包含当前配置文件名的字典
         """
-        current = config_manager.get_current()
+        current = managers.config_manager.get_current()
         return {"config": current.name if current else None}
 
     @app.post("/config/select")
@@ -313,7 +619,7 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
             HTTPException: 当配置文件不存在时抛出
         """
         try:
-            selected = config_manager.set_current(config)
+            selected = managers.config_manager.set_current(config)
         except FileNotFoundError as exc:
             raise HTTPException(status_code=404, detail=str(exc)) from exc
         return {"config": selected.name}
@@ -333,15 +639,81 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
             HTTPException: 当配置文件不存在时抛出
         """
         try:
-            path = config_manager.get_config(config)
+            path = managers.config_manager.get_config(config)
         except FileNotFoundError as exc:
             raise HTTPException(status_code=404, detail=str(exc)) from exc
         return FileResponse(path)
 
+    @app.get("/config/get")
+    def get_config(
+        config: str = Query(...),
+        format: str = Query(default="raw", pattern="^(raw|json)$"),
+    ) -> Response:
+        """
+        读取配置内容
+
+        Args:
+            config: 配置文件名
+            format: raw 返回原文；json 返回缓存的解析结果
+
+        Returns:
+            配置内容，ETag 头为内容哈希
+
+        Raises:
+            HTTPException: 当配置不存在、格式无法识别或解析失败时抛出
+        """
+        try:
+            if format == "raw":
+                path = managers.config_manager.get_config(config)
+                etag = f'"{managers.config_manager.parser.file_hash(path)}"'
+                return PlainTextResponse(path.read_text(), headers={"ETag": etag})
+            digest, tree = managers.config_manager.read_parsed(config)
+        except FileNotFoundError as exc:
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        except ConfigValidationError as exc:
+            raise HTTPException(status_code=422, detail=exc.errors) from exc
+        except ValueError as exc:
+            raise HTTPException(status_code=415, detail=str(exc)) from exc
+        return FastJSONResponse(
+            {"config": Path(config).name, "hash": digest, "data": tree},
+            headers={"ETag": f'"{digest}"'},
+        )
+
+    @app.get("/config/schema")
+    def get_config_schema() -> Dict[str, Any]:
+        """
+        获取配置校验 schema
+
+        Returns:
+            包含 schema 的字典，未设置时为None
+        """
+        return {"schema": managers.config_manager.parser.get_schema()}
+
+    @app.post("/config/schema")
+    def set_config_schema(schema: Dict[str, Any] = Body(...)) -> Dict[str, Any]:
+        """
+        设置配置校验 schema（JSON Schema 常用子集），上传与更新配置时生效
+
+        Args:
+            schema: JSON Schema 对象，传空对象则取消校验
+
+        Returns:
+            包含当前 schema 的字典
+
+        Raises:
+            HTTPException: 当 schema 结构不合法时抛出 400，detail 为错误列表（path 为 schema 内的位置）
+        """
+        try:
+            managers.config_manager.parser.set_schema(schema)
+        except ConfigValidationError as exc:
+            raise HTTPException(status_code=400, detail=exc.errors) from exc
+        return {"schema": managers.config_manager.parser.get_schema()}
+
     @app.post("/config/update")
     def update_config(
         config: str = Query(...),
         content: str = Body(..., embed=True),
+        if_match: Optional[str] = Header(default=None),
     ) -> Dict[str, Any]:
         """
         更新配置文件内容
@@ -349,19 +721,130 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
         Args:
             config: 要更新的配置文件名
             content: 新的配置文件内容
+            if_match: 可选的期望内容哈希，与当前内容不一致时拒绝写入
 
         Returns:
             包含更新配置名的字典
 
         Raises:
-            HTTPException: 当配置文件不存在时抛出
+            HTTPException: 当配置文件不存在、内容校验失败或内容已被修改时抛出
         """
         try:
-            updated = config_manager.update(config, content)
+            updated = managers.config_manager.update(config, content, expected_hash=_match_hash(if_match))
         except FileNotFoundError as exc:
             raise HTTPException(status_code=404, detail=str(exc)) from exc
+        except ConfigConflictError as exc:
+            raise HTTPException(status_code=412, detail=str(exc)) from exc
+        except ConfigValidationError as exc:
+            raise HTTPException(status_code=422, detail=exc.errors) from exc
         return {"config": updated}
 
+    @app.patch("/config")
+    def patch_config(
+        config: str = Query(...),
+        reload: bool = Query(default=False),
+        patch: Any = Body(...),
+        content_type: str = Header(default="application/merge-patch+json"),
+        if_match: Optional[str] = Header(default=None),
+    ) -> FastJSONResponse:
+        """
+        以补丁方式修改配置
+
+        Args:
+            config: 配置文件名
+            reload: 是否在写入后通知运行中的推理进程热加载（SIGHUP）
+            patch: JSON Patch 操作数组或 Merge Patch 对象
+            content_type: application/json-patch+json 或 application/merge-patch+json
+            if_match: 可选的期望内容哈希（来自 /config/get 的 ETag）
+
+        Returns:
+            包含配置名、新哈希和是否已热加载的字典，ETag 头为新哈希
+
+        Raises:
+            HTTPException: 当配置不存在、内容已被修改、补丁无效或校验失败时抛出
+        """
+        media_type = content_type.split(";", 1)[0].strip().lower()
+        try:
+            name, digest = managers.config_manager.patch(
+                config, patch, media_type, expected_hash=_match_hash(if_match)
+            )
+        except FileNotFoundError as exc:
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        except ConfigConflictError as exc:
+            raise HTTPException(status_code=412, detail=str(exc)) from exc
+        except ConfigValidationError as exc:
+            raise HTTPException(status_code=422, detail=exc.errors) from exc
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        reloaded = managers.inference_manager.reload(name) if reload else False
+        return FastJSONResponse(
+            {"config": name, "hash": digest, "reloaded": reloaded},
+            headers={"ETag": f'"{digest}"'},
+        )
+
+    @app.get("/config/versions")
+    def list_config_versions(config: str = Query(...)) -> Dict[str, Any]:
+        """
+        获取配置的版本历史
+
+        Args:
+            config: 配置文件名
+
+        Returns:
+            包含 head 版本号与版本列表的字典
+        """
+        history = managers.config_manager.versions.list_versions(config)
+        return {"config": Path(config).name, **history}
+
+    @app.get("/config/diff", response_class=PlainTextResponse)
+    def diff_config_versions(
+        config: str = Query(...),
+        from_version: int = Query(..., alias="from", ge=1),
+        to_version: int = Query(..., alias="to", ge=1),
+    ) -> str:
+        """
+        比较配置的两个版本
+
+        Args:
+            config: 配置文件名
+            from_version: 起始版本号
+            to_version: 目标版本号
+
+        Returns:
+            unified diff 文本
+
+        Raises:
+            HTTPException: 当版本不存在时抛出
+        """
+        try:
+            return managers.config_manager.versions.diff(config, from_version, to_version)
+        except FileNotFoundError as exc:
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+    @app.post("/config/rollback")
+    def rollback_config(
+        config: str = Query(...),
+        version: int = Query(..., ge=1),
+    ) -> Dict[str, Any]:
+        """
+        回滚配置到指定版本（移动 head 指针，不新增版本）
+
+        Args:
+            config: 配置文件名
+            version: 目标版本号
+
+        Returns:
+            包含配置名与当前版本条目的字典
+
+        Raises:
+            HTTPException: 当版本不存在时抛出
+        """
+        try:
+            entry = managers.config_manager.rollback(config, version)
+        except FileNotFoundError as exc:
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        return {"config": Path(config).name, "head": entry}
+
     @app.post("/config/delete")
     def delete_config(config: str = Query(...)) -> Dict[str, Any]:
         """
@@ -377,11 +860,164 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
             HTTPException: 当配置文件不存在时抛出
         """
         try:
-            removed = config_manager.delete(config)
+            removed = managers.config_manager.delete(config)
         except FileNotFoundError as exc:
             raise HTTPException(status_code=404, detail=str(exc)) from exc
         return {"deleted": removed.name}
 
+    @app.post("/bundle/upload")
+    async def upload_bundle(
+        request: Request,
+        bundle: Optional[str] = Query(default=None),
+    ) -> Dict[str, Any]:
+        """
+        流式上传部署包（请求体为 tar 归档，可压缩）
+
+        Args:
+            request: 原始请求，请求体边接收边解包
+            bundle: 可选的部署包名，默认使用 manifest 中的 name
+
+        Returns:
+            保存的部署包记录
+
+        Raises:
+            HTTPException: 当归档无效或哈希校验失败时抛出（400），配置未通过校验时返回逐条错误（422）
+        """
+        try:
+            return await consume_request_stream(request, managers.bundle_manager.extract, bundle)
+        except ModelQuotaError as exc:
+            raise HTTPException(status_code=507, detail=str(exc)) from exc
+        except ConfigValidationError as exc:
+            raise HTTPException(status_code=422, detail=exc.errors) from exc
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    @app.get("/bundle/list")
+    def list_bundles() -> Dict[str, Any]:
+        """
+        获取部署包列表
+
+        Returns:
+            包含部署包名列表的字典
+        """
+        return {"bundles": managers.bundle_manager.list_bundles()}
+
+    @app.get("/bundle/info")
+    def bundle_info(bundle: str = Query(...)) -> Dict[str, Any]:
+        """
+        获取部署包详情
+
+        Args:
+            bundle: 部署包名
+
+        Returns:
+            部署包记录，包含模型、配置、哈希和运行参数
+
+        Raises:
+            HTTPException: 当部署包不存在时抛出
+        """
+        try:
+            return managers.bundle_manager.get_bundle(bundle)
+        except FileNotFoundError as exc:
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+    @app.post("/bundle/select")
+    def select_bundle(bundle: str = Query(...)) -> Dict[str, Any]:
+        """
+        将部署包的模型与配置同时设为当前选择
+
+        Args:
+            bundle: 部署包名
+
+        Returns:
+            部署包记录
+
+        Raises:
+            HTTPException: 当部署包或其文件不存在时抛出
+        """
+        try:
+            record = managers.bundle_manager.select(bundle)
+        except FileNotFoundError as exc:
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        current = managers.model_manager.get_current()
+        if managers.preloader is not None and current is not None:
+            managers.preloader.schedule(current)
+        return record
+
+    @app.post("/bundle/delete")
+    def delete_bundle(bundle: str = Query(...)) -> Dict[str, Any]:
+        """
+        删除部署包记录（保留模型与配置文件）
+
+        Args:
+            bundle: 部署包名
+
+        Returns:
+            包含删除的部署包名的字典
+
+        Raises:
+            HTTPException: 当部署包不存在时抛出
+        """
+        try:
+            removed = managers.bundle_manager.delete(bundle)
+        except FileNotFoundError as exc:
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        return {"deleted": removed}
+
+    @app.get("/state/manifest")
+    def state_manifest(known: Optional[str] = Query(default=None)) -> Dict[str, Any]:
+        """
+        获取整机状态导出的 manifest（模型、配置的大小与 sha256，当前选择与部署包记录）
+
+        Args:
+            known: 逗号分隔的 sha256，对应模型标记为不传数据
+        """
+        return managers.state_manager.manifest(_split_names(known))
+
+    @app.get("/state/export")
+    def export_state(known: Optional[str] = Query(default=None)) -> StreamingResponse:
+        """
+        流式导出整机状态（tar，manifest.json 为第一个成员）
+
+        Args:
+            known: 逗号分隔的 sha256，目标板卡已有这些模型时不传输其数据
+
+        Returns:
+            带 Content-Length 的 tar 数据流
+        """
+        size, chunks = managers.state_manager.export(_split_names(known))
+        filename = f"pi-infer-state-{time.strftime('%Y%m%d-%H%M%S')}.tar"
+        return StreamingResponse(
+            chunks,
+            media_type="application/x-tar",
+            headers={
+                "Content-Length": str(size),
+                "Content-Disposition": f'attachment; filename="{filename}"',
+            },
+        )
+
+    @app.post("/state/import")
+    async def import_state(request: Request) -> Dict[str, Any]:
+        """
+        流式导入整机状态（请求体为 /state/export 生成的 tar，可压缩）
+
+        Returns:
+            写入、去重的文件与合并的历史记录条数
+
+        Raises:
+            HTTPException: 当归档无效、哈希校验失败或存储空间不足时抛出
+        """
+        try:
+            result = await consume_request_stream(request, managers.state_manager.import_state)
+        except ModelQuotaError as exc:
+            raise HTTPException(status_code=507, detail=str(exc)) from exc
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        current = managers.model_manager.get_current()
+        if managers.preloader is not None and current is not None:
+            managers.preloader.schedule(current)
+        return result
+
     @app.get("/status/system")
     def system_status(field: Optional[str] = Query(default=None)) -> Dict[str, Any]:
         """
@@ -393,13 +1029,18 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
         Returns:
             系统状态信息字典，包含内存、CPU、温度等信息
         """
-        status = system_monitor.get_status()
+        status = coalescer.get("status_system", None, managers.system_monitor.get_status)
         if field:
             if field not in status:
                 raise HTTPException(status_code=400, detail="unknown field")
             return {field: status[field]}
         return status
 
+    @app.get("/status/cache")
+    def cache_status() -> Dict[str, Any]:
+        """返回读接口缓存的命中、未命中、合并次数与失效次数（总计及按接口）"""
+        return coalescer.stats()
+
     @app.get("/status/inference")
     def status_inference_alias(field: Optional[str] = Query(default=None)) -> Dict[str, Any]:
         """
@@ -417,13 +1058,16 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
     def read_logs(
         since: Optional[str] = Query(default=None),
         tail: Optional[int] = Query(default=None),
-    ) -> str:
+        cursor: Optional[str] = Query(default=None),
+    ) -> Any:
         """
         读取日志内容
 
         Args:
             since: 可选的时间戳，只返回该时间之后的日志
             tail: 可选的行数，只返回最后N行日志
+            cursor: 增量读取游标；传入（可为空字符串）时只返回游标之后新增的完整行，
+                并在 X-Log-Cursor 响应头返回下次使用的游标
 
         Returns:
             日志内容的纯文本字符串
@@ -431,23 +1075,355 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
         Raises:
             HTTPException: 当时间戳格式无效时抛出
         """
+        if cursor is not None:
+            text, next_cursor = managers.log_manager.follow(cursor, tail=tail)
+            return PlainTextResponse(text, headers={"X-Log-Cursor": next_cursor})
+        try:
+            return coalescer.get(
+                "logs", (since, tail), lambda: managers.log_manager.read_logs(since=since, tail=tail)
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    @app.get("/logs/run")
+    def run_log(request: Request, id: int = Query(...)) -> Response:
+        """
+        下载某条历史记录对应的日志文件，支持 Range 请求
+
+        Args:
+            id: 历史记录 ID（见 /history）
+
+        Raises:
+            HTTPException: 当记录或日志文件不存在时抛出
+        """
+        try:
+            record = managers.history_manager.get(id)
+            path = managers.log_manager.run_log(record.get("log_file") or "")
+        except (KeyError, FileNotFoundError, ValueError) as exc:
+            raise HTTPException(status_code=404, detail=str(exc).strip("'")) from exc
+        if record.get("end_time") is None and "range" not in request.headers:
+            # 运行中的日志仍在增长：按当前长度返回，避免实际发送的字节数超过 Content-Length
+            size, chunks = managers.log_manager.snapshot(path)
+            return StreamingResponse(
+                chunks,
+                media_type="text/plain; charset=utf-8",
+                headers={"Content-Length": str(size), "Accept-Ranges": "bytes"},
+            )
+        return FileResponse(
+            path,
+            media_type="text/plain; charset=utf-8",
+            filename=path.name,
+            content_disposition_type="inline",
+        )
+
+    @app.get("/logs/archive")
+    def log_archive(
+        since: Optional[str] = Query(default=None),
+        until: Optional[str] = Query(default=None),
+        format: str = Query(default="zip"),
+    ) -> StreamingResponse:
+        """
+        打包下载时间范围内的日志文件（边读边压缩）
+
+        Args:
+            since: 起始时间（YYYY-MM-DD_HH:MM:SS）
+            until: 结束时间（YYYY-MM-DD_HH:MM:SS）
+            format: zip 或 tar.gz
+
+        Raises:
+            HTTPException: 当参数无效或范围内没有日志时抛出
+        """
         try:
-            return log_manager.read_logs(since=since, tail=tail)
+            paths = managers.log_manager.segments(since, until)
+            chunks = managers.log_manager.archive(paths, format)
         except ValueError as exc:
             raise HTTPException(status_code=400, detail=str(exc)) from exc
+        if not paths:
+            raise HTTPException(status_code=404, detail="no logs in range")
+        filename = f"logs-{time.strftime('%Y%m%d-%H%M%S')}.{format}"
+        return StreamingResponse(
+            chunks,
+            media_type="application/zip" if format == "zip" else "application/gzip",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
+    @app.get("/jobs")
+    def list_jobs(status: Optional[str] = Query(default=None)) -> Dict[str, Any]:
+        """
+        列出推理任务与定时计划
+
+        Args:
+            status: 按状态过滤（queued、running、done、failed、cancelled）
+        """
+        return managers.job_queue.list_jobs(status)
+
+    @app.post("/jobs/enqueue")
+    def enqueue_job(
+        model: Optional[str] = Query(default=None),
+        config: Optional[str] = Query(default=None),
+        bundle: Optional[str] = Query(default=None),
+        duration: Optional[float] = Query(default=None, gt=0),
+        priority: int = Query(default=0),
+        cron: Optional[str] = Query(default=None),
+    ) -> Dict[str, Any]:
+        """
+        推理任务入队；提供 cron 时创建定时计划，到点自动入队
+
+        Args:
+            model: 模型文件名，为None时使用运行时的当前模型
+            config: 配置文件名，为None时使用运行时的当前配置
+            bundle: 部署包名
+            duration: 运行秒数，为None时运行到推理进程自行退出
+            priority: 优先级，越大越先运行
+            cron: 五段式 cron 表达式（分 时 日 月 周）
+        """
+        try:
+            if model:
+                managers.model_manager.get_model(model)
+            if config:
+                managers.config_manager.get_config(config)
+            if bundle:
+                managers.bundle_manager.resolve(bundle)
+        except FileNotFoundError as exc:
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        try:
+            if cron:
+                return managers.job_queue.add_schedule(cron, model, config, bundle, duration, priority)
+            return managers.job_queue.enqueue(model, config, bundle, duration, priority)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    @app.post("/jobs/cancel")
+    def cancel_job(job_id: str = Query(..., alias="id")) -> Dict[str, Any]:
+        """取消排队或运行中的任务，或删除定时计划"""
+        try:
+            return managers.job_queue.cancel(job_id)
+        except KeyError as exc:
+            raise HTTPException(status_code=404, detail="job not found") from exc
+        except ValueError as exc:
+            raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+    @app.post("/jobs/priority")
+    def reprioritize_job(
+        job_id: str = Query(..., alias="id"),
+        priority: int = Query(...),
+    ) -> Dict[str, Any]:
+        """调整排队任务的优先级"""
+        try:
+            return managers.job_queue.set_priority(job_id, priority)
+        except KeyError as exc:
+            raise HTTPException(status_code=404, detail="job not found") from exc
+        except ValueError as exc:
+            raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+    @app.post("/sweeps/start")
+    def start_sweep(
+        models: Optional[str] = Query(default=None),
+        configs: Optional[str] = Query(default=None),
+        duration: Optional[float] = Query(default=None, gt=0),
+        frames: Optional[int] = Query(default=None, ge=1),
+        interval: float = Query(default=0.5, gt=0),
+        rank_by: str = Query(default="fps"),
+    ) -> Dict[str, Any]:
+        """
+        启动模型 × 配置基准扫描
+
+        Args:
+            models: 逗号分隔的模型文件名，省略时使用全部模型
+            configs: 逗号分隔的配置文件名，省略时使用全部配置
+            duration: 每组运行秒数
+            frames: 每组运行帧数
+            interval: 系统采样间隔（秒）
+            rank_by: 排序依据 fps|latency
+        """
+        try:
+            return managers.sweep_runner.start(
+                _split_names(models), _split_names(configs), duration, frames, interval, rank_by
+            )
+        except FileNotFoundError as exc:
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        except RuntimeError as exc:
+            raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+    @app.get("/sweeps")
+    def list_sweeps() -> Dict[str, Any]:
+        """列出基准扫描及其最佳组合"""
+        return {"sweeps": managers.sweep_runner.list_sweeps()}
+
+    @app.get("/sweeps/report")
+    def sweep_report(
+        sweep_id: str = Query(..., alias="id"),
+        format: str = Query(default="json"),
+    ) -> Response:
+        """
+        获取扫描报告
+
+        Args:
+            sweep_id: 扫描ID
+            format: json 或 csv
+        """
+        try:
+            if format == "csv":
+                return PlainTextResponse(
+                    managers.sweep_runner.get_csv(sweep_id),
+                    media_type="text/csv",
+                    headers={"Content-Disposition": f'attachment; filename="{sweep_id}.csv"'},
+                )
+            if format != "json":
+                raise HTTPException(status_code=400, detail="format must be json or csv")
+            return FastJSONResponse(managers.sweep_runner.get_report(sweep_id))
+        except FileNotFoundError as exc:
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+    @app.post("/sweeps/cancel")
+    def cancel_sweep(sweep_id: str = Query(..., alias="id")) -> Dict[str, Any]:
+        """取消运行中的扫描"""
+        try:
+            managers.sweep_runner.cancel(sweep_id)
+        except FileNotFoundError as exc:
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        return {"status": "cancelling"}
 
     @app.get("/history")
-    def get_history(limit: int = Query(default=10, ge=1)) -> Dict[str, Any]:
+    def get_history(
+        limit: int = Query(default=10, ge=1),
+        cursor: Optional[int] = Query(default=None, ge=0),
+        model: Optional[str] = Query(default=None),
+        config: Optional[str] = Query(default=None),
+        status: Optional[str] = Query(default=None),
+        since: Optional[str] = Query(default=None),
+        until: Optional[str] = Query(default=None),
+    ) -> Dict[str, Any]:
         """
         获取推理历史记录
 
         Args:
-            limit: 返回的历史记录数量上限，默认10条
+            limit: 每页记录数，默认10条
+            cursor: 上一页返回的 next_cursor，省略时从最新记录开始
+            model: 按模型过滤
+            config: 按配置过滤
+            status: 按状态过滤
+            since: 启动时间下限（YYYY-MM-DD_HH:MM:SS）
+            until: 启动时间上限（YYYY-MM-DD_HH:MM:SS）
+
+        Returns:
+            包含历史记录列表（页内按时间正序）与 next_cursor 的字典
+        """
+        try:
+            return coalescer.get(
+                "history",
+                (limit, cursor, model, config, status, since, until),
+                lambda: managers.history_manager.query(limit, cursor, model, config, status, since, until),
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    @app.get("/history/stats")
+    def history_stats(
+        group_by: str = Query(default="model"),
+        model: Optional[str] = Query(default=None),
+        config: Optional[str] = Query(default=None),
+        since: Optional[str] = Query(default=None),
+        until: Optional[str] = Query(default=None),
+    ) -> Dict[str, Any]:
+        """
+        按模型、配置或模型+配置汇总运行次数、运行时长与失败率
+
+        Args:
+            group_by: model、config 或 pair
+            since: 启动时间下限（按天粒度）
+            until: 启动时间上限（按天粒度）
+        """
+        try:
+            return coalescer.get(
+                "history_stats",
+                (group_by, model, config, since, until),
+                lambda: managers.history_manager.stats(group_by, model, config, since, until),
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    def _fleet() -> Any:
+        fleet = managers.fleet
+        if fleet is None:
+            raise HTTPException(status_code=404, detail="fleet mode disabled")
+        return fleet
+
+    @app.get("/fleet")
+    async def fleet_status(
+        refresh: bool = Query(default=False),
+        boards: Optional[str] = Query(default=None),
+    ) -> Dict[str, Any]:
+        """
+        聚合各板卡的推理状态、系统状态与最近历史
+
+        Args:
+            refresh: 为True时忽略缓存重新轮询
+            boards: 逗号分隔的板卡名，默认全部
+
+        Raises:
+            HTTPException: 未启用聚合模式或板卡名未知时抛出
+        """
+        try:
+            return await _fleet().snapshot(refresh=refresh, names=_split_names(boards))
+        except KeyError as exc:
+            raise HTTPException(status_code=400, detail=exc.args[0]) from exc
+
+    @app.post("/fleet/{action:path}")
+    async def fleet_action(action: str, request: Request, boards: Optional[str] = Query(default=None)) -> Dict[str, Any]:
+        """
+        向板卡广播操作（model/select、config/select、bundle/select、inference/start、inference/stop）
+
+        除 boards 外的查询参数原样转发，例如 POST /fleet/model/select?model=yolo.onnx
+
+        Raises:
+            HTTPException: 未启用聚合模式、操作不支持或板卡名未知时抛出
+        """
+        params = {key: value for key, value in request.query_params.items() if key != "boards"}
+        try:
+            return await _fleet().broadcast(action, params, names=_split_names(boards))
+        except ValueError as exc:
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        except KeyError as exc:
+            raise HTTPException(status_code=400, detail=exc.args[0]) from exc
+
+    @app.get("/governor/status")
+    def governor_status() -> Dict[str, Any]:
+        """返回调速器状态、最近采样、调速统计与最近的动作"""
+        return managers.governor.status()
+
+    @app.get("/debug/profiles")
+    def debug_profiles(
+        profile_id: Optional[int] = Query(default=None, alias="id"),
+        x_profile: Optional[str] = Header(default=None),
+    ) -> Response:
+        """
+        获取请求采样结果（调用栈包含请求参数等内部信息，需携带管理员令牌）
+
+        Args:
+            profile_id: 可选的采样记录ID，提供时返回该记录的 collapsed stacks 文本
+            x_profile: 请求头 X-Profile，须与 PI_INFER_PROFILE_TOKEN 一致
 
         Returns:
-            包含历史记录列表的字典
+            采样记录摘要列表，或 flamegraph 可用的 collapsed stacks 文本
+
+        Raises:
+            HTTPException: 未配置令牌或令牌不符时抛出 403，采样记录不存在时抛出 404
         """
-        return {"history": history_manager.list_history(limit)}
+        if not token_matches(x_profile, settings.profile_token):
+            raise HTTPException(status_code=403, detail="X-Profile token required")
+        if profile_id is None:
+            return FastJSONResponse(
+                {"enabled": profiling_enabled, "profiles": profile_store.list()}
+            )
+        try:
+            return PlainTextResponse(profile_store.collapsed(profile_id))
+        except KeyError as exc:
+            raise HTTPException(status_code=404, detail="profile not found") from exc
 
     @app.get("/help", response_class=PlainTextResponse)
     def help_doc() -> str:
@@ -465,53 +1441,132 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
         获取版本信息
 
         Returns:
-            包含版本、Git提交哈希和构建时间的字典
+            包含版本、Git提交哈希、构建时间和启动耗时的字典
         """
         return {
             "version": settings.version,
             "git_commit": settings.git_commit,
             "build_time": settings.build_time,
+            "startup": startup,
         }
 
+    create_finished = time.perf_counter()
+    process_age = process_age_seconds()
+    measured = process_age if process_age is not None else create_finished - IMPORT_STARTED
+    startup = {
+        "import_seconds": round(create_started - IMPORT_STARTED, 4),
+        "create_app_seconds": round(create_finished - create_started, 4),
+        "process_seconds": round(process_age, 4) if process_age is not None else None,
+        "budget_seconds": settings.startup_budget,
+        "within_budget": measured <= settings.startup_budget,
+    }
     return app
 
 
+def _split_names(value: Optional[str]) -> List[str]:
+    """把逗号分隔的名称列表拆分为列表，忽略空项"""
+    return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+
+def _match_hash(if_match: Optional[str]) -> Optional[str]:
+    """If-Match 可能带有压缩响应的编码后缀或弱校验前缀，比较前还原为内容哈希"""
+    if if_match is None or if_match.strip() == "*":
+        return if_match
+    return base_etag(if_match)
+
+
 def _help_text() -> str:
     return """PI Infer API
 
-POST /inference/start?model=PATH&config=PATH
+POST /inference/start?model=PATH&config=PATH|bundle=NAME
 POST /inference/stop
-GET  /inference/status?field=running|current_model|current_config|uptime|pid|log_file|last_error|exit_code
+GET  /inference/status?field=running|current_model|current_config|uptime|pid|log_file|last_error|exit_code|model_verified|preload_seconds|detached|limits
+GET  /inference/results                (SSE)
+WS   /inference/results?format=json|binary
+GET  /inference/results/status
 
 POST /model/upload?model=NAME (multipart file)
+GET  /model/signature?model=NAME&block_size=BYTES
+POST /model/patch?base=NAME&sha256=HEX&model=NAME&block_size=BYTES (delta stream)
 GET  /model/list?wildcard=PATTERN
 GET  /model/current
 POST /model/select?model=NAME
 GET  /model/download?model=NAME
 POST /model/delete?model=NAME
+GET  /model/usage
+POST /model/pin?model=NAME&pinned=true|false
+GET  /model/limits?model=NAME
+POST /model/limits?model=NAME&memory_max=SIZE&cpu_max=CORES&cpuset=LIST
 
 POST /config/upload?config=NAME (multipart file)
 GET  /config/list?wildcard=PATTERN
 GET  /config/current
 POST /config/select?config=NAME
 GET  /config/download?config=NAME
-POST /config/update?config=NAME (JSON body)
+GET  /config/get?config=NAME&format=raw|json
+GET  /config/schema
+POST /config/schema (JSON Schema body)
+POST /config/update?config=NAME (JSON body, optional If-Match)
+PATCH /config?config=NAME&reload=BOOL (json-patch+json | merge-patch+json, optional If-Match)
 POST /config/delete?config=NAME
+GET  /config/versions?config=NAME
+GET  /config/diff?config=NAME&from=N&to=M
+POST /config/rollback?config=NAME&version=N
+
+POST /bundle/upload?bundle=NAME (tar body, manifest.json first)
+GET  /bundle/list
+GET  /bundle/info?bundle=NAME
+POST /bundle/select?bundle=NAME
+POST /bundle/delete?bundle=NAME
+
+GET  /state/manifest?known=SHA256,SHA256
+GET  /state/export?known=SHA256,SHA256 (tar stream)
+POST /state/import (tar body from /state/export)
+
+GET  /jobs?status=queued|running|done|failed|cancelled
+POST /jobs/enqueue?model=NAME&config=NAME|bundle=NAME&duration=SECONDS&priority=N&cron=EXPR
+POST /jobs/cancel?id=ID
+POST /jobs/priority?id=ID&priority=N
+
+POST /sweeps/start?models=A,B&configs=X,Y&duration=SECONDS|frames=N&interval=SECONDS&rank_by=fps|latency
+GET  /sweeps
+GET  /sweeps/report?id=ID&format=json|csv
+POST /sweeps/cancel?id=ID
 
 GET  /status/system?field=memory_usage|cpu_load|temperature|uptime
 GET  /status/inference?field=...
+GET  /status/cache
 GET  /logs?since=YYYY-MM-DD_HH:MM:SS&tail=N
-GET  /history?limit=N
+GET  /logs?cursor=<X-Log-Cursor>&tail=N
+GET  /logs/run?id=HISTORY_ID (Range supported)
+GET  /logs/archive?since=YYYY-MM-DD_HH:MM:SS&until=YYYY-MM-DD_HH:MM:SS&format=zip|tar.gz
+GET  /history?limit=N&cursor=ID&model=NAME&config=NAME&status=STATUS&since=TIME&until=TIME
+GET  /history/stats?group_by=model|config|pair&model=NAME&config=NAME&since=TIME&until=TIME
+GET  /fleet?refresh=true|false&boards=NAME,NAME
+POST /fleet/model/select|config/select|bundle/select|inference/start|inference/stop?boards=NAME,NAME&...
+GET  /governor/status
+GET  /debug/profiles?id=N
 GET  /help
 GET  /version
 """
 
 
-app = create_app()
+def __getattr__(name: str) -> Any:
+    """
+    惰性构造默认应用
+
+    uvicorn 通过 getattr 读取 app.main:app，此时才加载配置并构造应用；
+    仅导入 create_app 的代码（测试、CLI）不会产生副作用。
+    """
+    if name == "app":
+        application = create_app()
+        globals()["app"] = application
+        return application
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
     import uvicorn
 
     settings = load_settings()
-    uvicorn.run(app, host=settings.host, port=settings.port)
+    uvicorn.run(create_app(settings), host=settings.host, port=settings.port)
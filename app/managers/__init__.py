@@ -1,17 +1,37 @@
 """Manager modules for PI Infer API."""
 
+from app.managers.bundle_manager import BundleManager
 from app.managers.config_manager import ConfigManager
+from app.managers.fleet import FleetAggregator
+from app.managers.governor import ThermalGovernor
 from app.managers.history_manager import HistoryManager
 from app.managers.inference_manager import InferenceManager
+from app.managers.inference_state import InferenceStateStore
+from app.managers.job_queue import JobQueue
 from app.managers.log_manager import LogManager
 from app.managers.model_manager import ModelManager
+from app.managers.model_preloader import ModelPreloader
+from app.managers.resource_limits import ResourceLimiter
+from app.managers.result_channel import ResultChannel
+from app.managers.state_manager import StateManager
+from app.managers.sweep_runner import SweepRunner
 from app.managers.system_monitor import SystemMonitor
 
 __all__ = [
+	"BundleManager",
 	"ConfigManager",
+	"FleetAggregator",
 	"HistoryManager",
 	"InferenceManager",
+	"InferenceStateStore",
+	"JobQueue",
 	"LogManager",
 	"ModelManager",
+	"ModelPreloader",
+	"ResourceLimiter",
+	"ResultChannel",
+	"StateManager",
+	"SweepRunner",
 	"SystemMonitor",
+	"ThermalGovernor",
 ]
@@ -0,0 +1,230 @@
+"""
+部署包管理器
+
+部署包（bundle）是一个 tar 归档，包含模型、配置以及描述二者关系的 manifest.json。
+上传时边接收边解包，同一遍读取中完成哈希校验，全部通过后才原子地落盘。
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Any, Dict, List, Optional
+import hashlib
+import json
+import os
+import tarfile
+
+from app.managers.config_manager import ConfigManager
+from app.managers.model_manager import ModelManager
+from app.utils import TIMESTAMP_FORMAT, ensure_dir, safe_resolve
+
+MANIFEST_NAME = "manifest.json"
+CHUNK_SIZE = 1024 * 1024
+
+
+class BundleManager:
+    """
+    部署包管理器
+
+    包记录保存在 model_dir/.bundles/<name>.json，模型与配置文件分别解包到
+    model_dir 与 config_dir，与单独上传的文件共用同一套目录。
+    """
+
+    def __init__(self, model_manager: ModelManager, config_manager: ConfigManager) -> None:
+        self.model_manager = model_manager
+        self.config_manager = config_manager
+        self.bundle_dir = model_manager.model_dir / ".bundles"
+        ensure_dir(self.bundle_dir)
+
+    def extract(self, stream: IO[bytes], bundle_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        从流中解包部署包
+
+        manifest.json 必须是归档的第一个成员，其后的成员按 manifest 中的文件名
+        写入对应目录的临时文件，同时计算 sha256；全部校验通过后再重命名。
+
+        Args:
+            stream: tar 归档数据流（支持 gzip/bz2/xz 压缩）
+            bundle_name: 可选的包名，默认使用 manifest 中的 name
+
+        Returns:
+            保存的部署包记录
+
+        Raises:
+            ValueError: 归档格式错误、缺少文件或哈希不匹配时抛出
+        """
+        pending: Dict[str, Path] = {}
+        try:
+            try:
+                archive = tarfile.open(fileobj=stream, mode="r|*")
+            except tarfile.TarError as exc:
+                raise ValueError(f"invalid bundle archive: {exc}") from exc
+            with archive:
+                manifest: Optional[Dict[str, Any]] = None
+                targets: Dict[str, Dict[str, Any]] = {}
+                for member in archive:
+                    if not member.isfile():
+                        continue
+                    name = Path(member.name).name
+                    source = archive.extractfile(member)
+                    if source is None:
+                        continue
+                    if manifest is None:
+                        if name != MANIFEST_NAME:
+                            raise ValueError("manifest.json must be the first member")
+                        manifest = self._parse_manifest(source.read())
+                        targets = self._targets(manifest)
+                        continue
+                    target = targets.get(name)
+                    if target is None:
+                        raise ValueError(f"unexpected bundle member: {member.name}")
+                    if name in pending:
+                        raise ValueError(f"duplicate bundle member: {member.name}")
+                    if name == manifest["model"]["file"]:
+                        self.model_manager.make_room(member.size, replace=name)
+                    pending[name] = self._write_verified(source, target["path"], target["sha256"])
+            if manifest is None:
+                raise ValueError("bundle manifest missing")
+            missing = sorted(set(targets) - set(pending))
+            if missing:
+                raise ValueError(f"bundle members missing: {', '.join(missing)}")
+            name = Path(bundle_name or str(manifest.get("name") or "")).name
+            if not name:
+                raise ValueError("bundle name is required")
+            if name.startswith("."):
+                raise ValueError("bundle name must not start with '.'")
+            config_name = manifest["config"]["file"]
+            self.config_manager.parser.validate(config_name, pending[config_name].read_bytes())
+            config_path = targets[config_name]["path"]
+            self.config_manager.snapshot_existing(config_path)
+            for member_name, partial in pending.items():
+                os.replace(partial, targets[member_name]["path"])
+            pending.clear()
+            self.config_manager.versions.record(config_name, config_path.read_bytes(), "bundle")
+            model = manifest["model"]
+            self.model_manager.record_hash(targets[model["file"]]["path"], model["sha256"])
+        finally:
+            for partial in pending.values():
+                partial.unlink(missing_ok=True)
+
+        record = {
+            "name": name,
+            "model": manifest["model"]["file"],
+            "model_sha256": manifest["model"]["sha256"],
+            "config": manifest["config"]["file"],
+            "config_sha256": manifest["config"]["sha256"],
+            "args": manifest.get("args", []),
+            "created": datetime.now().strftime(TIMESTAMP_FORMAT),
+        }
+        (self.bundle_dir / f"{name}.json").write_text(json.dumps(record, indent=2))
+        return record
+
+    def list_bundles(self) -> List[str]:
+        ensure_dir(self.bundle_dir)
+        return [path.stem for path in sorted(self.bundle_dir.glob("*.json"))]
+
+    def referenced_models(self) -> List[str]:
+        """返回所有部署包引用的模型文件名（配额淘汰时跳过）"""
+        models = []
+        for path in sorted(self.bundle_dir.glob("*.json")):
+            try:
+                models.append(json.loads(path.read_text())["model"])
+            except (OSError, KeyError, TypeError, json.JSONDecodeError):
+                continue
+        return models
+
+    def get_bundle(self, bundle_name: str) -> Dict[str, Any]:
+        path = safe_resolve(self.bundle_dir, f"{Path(bundle_name).name}.json")
+        if not path.exists():
+            raise FileNotFoundError("bundle not found")
+        return json.loads(path.read_text())
+
+    def resolve(self, bundle_name: str) -> Dict[str, Any]:
+        """
+        解析部署包对应的模型、配置路径和运行参数
+
+        Returns:
+            包含 model_path、config_path、args 的字典
+
+        Raises:
+            FileNotFoundError: 部署包或其引用的文件不存在时抛出
+        """
+        record = self.get_bundle(bundle_name)
+        return {
+            "model_path": self.model_manager.get_model(record["model"]),
+            "config_path": self.config_manager.get_config(record["config"]),
+            "args": list(record.get("args", [])),
+        }
+
+    def select(self, bundle_name: str) -> Dict[str, Any]:
+        """将部署包的模型与配置同时设为当前选择"""
+        resolved = self.resolve(bundle_name)
+        self.model_manager.set_current(resolved["model_path"])
+        self.config_manager.set_current(resolved["config_path"])
+        return self.get_bundle(bundle_name)
+
+    def delete(self, bundle_name: str) -> str:
+        """删除部署包记录（不删除其模型与配置文件）"""
+        path = safe_resolve(self.bundle_dir, f"{Path(bundle_name).name}.json")
+        if not path.exists():
+            raise FileNotFoundError("bundle not found")
+        path.unlink()
+        return path.stem
+
+    def _parse_manifest(self, raw: bytes) -> Dict[str, Any]:
+        try:
+            manifest = json.loads(raw)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"invalid manifest: {exc}") from exc
+        if not isinstance(manifest, dict):
+            raise ValueError("invalid manifest: expected an object")
+        for key in ("model", "config"):
+            entry = manifest.get(key)
+            if not isinstance(entry, dict) or not entry.get("file") or not entry.get("sha256"):
+                raise ValueError(f"invalid manifest: {key}.file and {key}.sha256 are required")
+            entry["file"] = Path(str(entry["file"])).name
+            entry["sha256"] = str(entry["sha256"]).lower()
+            # 以 . 开头的是元数据文件（.current_model、.hashes.json、.bundles 等），不允许被包覆盖
+            if not entry["file"] or entry["file"].startswith("."):
+                raise ValueError(f"invalid manifest: {key}.file must not start with '.'")
+        args = manifest.get("args", [])
+        if not isinstance(args, list) or not all(isinstance(arg, str) for arg in args):
+            raise ValueError("invalid manifest: args must be a list of strings")
+        if manifest["model"]["file"] == manifest["config"]["file"]:
+            raise ValueError("invalid manifest: model and config must have different names")
+        return manifest
+
+    def _targets(self, manifest: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        model = manifest["model"]
+        config = manifest["config"]
+        return {
+            model["file"]: {
+                "path": self.model_manager.model_dir / model["file"],
+                "sha256": model["sha256"],
+            },
+            config["file"]: {
+                "path": self.config_manager.config_dir / config["file"],
+                "sha256": config["sha256"],
+            },
+        }
+
+    def _write_verified(self, source: IO[bytes], target: Path, expected: str) -> Path:
+        ensure_dir(target.parent)
+        partial = target.with_name(f".{target.name}.partial")
+        digest = hashlib.sha256()
+        try:
+            with partial.open("wb") as handle:
+                while True:
+                    chunk = source.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    handle.write(chunk)
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
+        if digest.hexdigest() != expected:
+            partial.unlink(missing_ok=True)
+            raise ValueError(f"sha256 mismatch for {target.name}")
+        return partial
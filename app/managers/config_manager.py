@@ -1,18 +1,37 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import os
+import threading
 
 from fastapi import UploadFile
 
+from app.managers.config_parser import ConfigParser, config_format
+from app.managers.config_versions import ConfigVersionStore
+from app.managers.config_patch import (
+    JSON_PATCH,
+    MERGE_PATCH,
+    PatchError,
+    apply_json_patch,
+    apply_merge_patch,
+)
 from app.utils import ensure_dir, safe_resolve
 
 
+class ConfigConflictError(RuntimeError):
+    """If-Match 指定的内容哈希与当前配置不一致"""
+
+
 class ConfigManager:
     def __init__(self, config_dir: Path) -> None:
         self.config_dir = config_dir
         ensure_dir(self.config_dir)
         self.current_file = self.config_dir / ".current_config"
+        self.parser = ConfigParser(self.config_dir / ".schema.json")
+        self.versions = ConfigVersionStore(self.config_dir / ".versions")
+        self._write_lock = threading.Lock()
 
     def _write_current(self, path: Path) -> None:
         self.current_file.write_text(str(path))
@@ -48,14 +67,20 @@ class ConfigManager:
         safe_name = Path(name).name
         target = self.config_dir / safe_name
         content = upload.file.read()
-        target.write_bytes(content)
+        self.parser.validate(safe_name, content)
+        with self._write_lock:
+            self._commit(target, content, "upload")
         self._write_current(target)
         return safe_name
 
     def list_configs(self, pattern: Optional[str] = None) -> List[str]:
         ensure_dir(self.config_dir)
         glob_pattern = pattern or "*"
-        return [path.name for path in sorted(self.config_dir.glob(glob_pattern)) if path.is_file()]
+        return [
+            path.name
+            for path in sorted(self.config_dir.glob(glob_pattern))
+            if path.is_file() and not path.name.startswith(".")
+        ]
 
     def get_config(self, config_path: str) -> Path:
         resolved = safe_resolve(self.config_dir, config_path)
@@ -63,19 +88,124 @@ class ConfigManager:
             raise FileNotFoundError("config not found")
         return resolved
 
-    def update(self, config_path: str, content: str) -> str:
+    def read_parsed(self, config_path: str) -> Tuple[str, Any]:
+        """
+        返回配置的内容哈希与解析结果（命中缓存时不重新解析）
+
+        Raises:
+            FileNotFoundError: 配置不存在时抛出
+            ValueError: 配置格式无法识别时抛出
+        """
+        resolved = self.get_config(config_path)
+        digest, tree = self.parser.load(resolved)
+        if tree is None and config_format(resolved.name) is None:
+            raise ValueError("unsupported config format, expected .json/.yaml/.yml")
+        return digest, tree
+
+    def update(self, config_path: str, content: str, expected_hash: Optional[str] = None) -> str:
         resolved = safe_resolve(self.config_dir, config_path)
         if not resolved.exists():
             raise FileNotFoundError("config not found")
-        resolved.write_text(content)
+        data = content.encode("utf-8")
+        self.parser.validate(resolved.name, data)
+        with self._write_lock:
+            self._check_hash(resolved, expected_hash)
+            self._commit(resolved, data, "update")
         self._write_current(resolved)
         return resolved.name
 
+    def patch(
+        self,
+        config_path: str,
+        patch: Any,
+        content_type: str = MERGE_PATCH,
+        expected_hash: Optional[str] = None,
+    ) -> Tuple[str, str]:
+        """
+        对解析后的配置应用 JSON Patch 或 Merge Patch 并写回原格式
+
+        Args:
+            config_path: 配置文件名
+            patch: 补丁内容
+            content_type: application/json-patch+json 或 application/merge-patch+json
+            expected_hash: 可选的期望内容哈希（If-Match），不一致时拒绝写入
+
+        Returns:
+            (配置文件名, 新内容哈希)
+
+        Raises:
+            FileNotFoundError: 配置不存在时抛出
+            ConfigConflictError: 内容哈希与 expected_hash 不一致时抛出
+            ValueError: 补丁无法应用、格式不支持或校验失败时抛出
+        """
+        resolved = safe_resolve(self.config_dir, config_path)
+        if not resolved.exists():
+            raise FileNotFoundError("config not found")
+        fmt = config_format(resolved.name)
+        if fmt is None:
+            raise ValueError("unsupported config format, expected .json/.yaml/.yml")
+        with self._write_lock:
+            self._check_hash(resolved, expected_hash)
+            _, tree = self.parser.load(resolved)
+            if content_type == JSON_PATCH:
+                patched = apply_json_patch(tree, patch)
+            elif content_type == MERGE_PATCH:
+                patched = apply_merge_patch(tree, patch)
+            else:
+                raise PatchError(f"unsupported patch type {content_type!r}")
+            data = self._dump(fmt, patched)
+            digest, _ = self.parser.validate(resolved.name, data)
+            self._commit(resolved, data, "patch")
+        return resolved.name, digest
+
+    def rollback(self, config_path: str, version: int) -> Dict[str, Any]:
+        """
+        回滚到指定版本：移动版本 head 指针并还原工作文件，不新增版本
+
+        Raises:
+            FileNotFoundError: 版本不存在时抛出
+        """
+        resolved = safe_resolve(self.config_dir, config_path)
+        with self._write_lock:
+            entry = self.versions.set_head(resolved.name, version)
+            self._write_atomic(resolved, self.versions.content(resolved.name, version))
+        return entry
+
+    def snapshot_existing(self, path: Path) -> None:
+        """文件尚无版本记录时，把当前内容记为初始版本，避免首次覆盖丢失旧内容"""
+        if path.exists() and not self.versions.has_history(path.name):
+            self.versions.record(path.name, path.read_bytes(), "initial")
+
+    def _commit(self, path: Path, data: bytes, source: str) -> None:
+        self.snapshot_existing(path)
+        self._write_atomic(path, data)
+        self.versions.record(path.name, data, source)
+
+    def _check_hash(self, path: Path, expected_hash: Optional[str]) -> None:
+        if expected_hash is None:
+            return
+        expected = expected_hash.strip().strip('"')
+        if expected != "*" and self.parser.file_hash(path) != expected:
+            raise ConfigConflictError("config changed since it was read")
+
+    def _write_atomic(self, path: Path, data: bytes) -> None:
+        partial = path.with_name(f".{path.name}.partial")
+        partial.write_bytes(data)
+        os.replace(partial, path)
+
+    def _dump(self, fmt: str, tree: Any) -> bytes:
+        if fmt == "json":
+            return (json.dumps(tree, indent=2, ensure_ascii=False) + "\n").encode("utf-8")
+        import yaml
+
+        return yaml.safe_dump(tree, sort_keys=False, allow_unicode=True).encode("utf-8")
+
     def delete(self, config_path: str) -> Path:
         resolved = safe_resolve(self.config_dir, config_path)
         if not resolved.exists():
             raise FileNotFoundError("config not found")
         resolved.unlink()
+        self.parser.forget(resolved)
         self._refresh_current(resolved)
         return resolved
 
@@ -0,0 +1,363 @@
+"""
+配置解析与校验
+
+按文件后缀解析 YAML/JSON 配置，按用户提供的 JSON Schema（常用子集）进行校验，
+并以内容哈希为键缓存解析结果。错误以结构化列表返回，尽量附带行号。
+yaml 在首次解析时才导入，不计入应用启动耗时。
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import json
+import re
+import threading
+
+JSON_SUFFIXES = {".json"}
+YAML_SUFFIXES = {".yaml", ".yml"}
+
+_TYPE_CHECKS = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+    "null": lambda value: value is None,
+}
+
+
+class ConfigValidationError(ValueError):
+    """配置解析或校验失败，errors 为 {"path", "line", "message"} 列表"""
+
+    def __init__(self, errors: List[Dict[str, Any]]) -> None:
+        self.errors = errors
+        super().__init__("; ".join(self._format(error) for error in errors))
+
+    @staticmethod
+    def _format(error: Dict[str, Any]) -> str:
+        location = error.get("path") or "/"
+        if error.get("line"):
+            location = f"{location} (line {error['line']})"
+        return f"{location}: {error['message']}"
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def config_format(name: str) -> Optional[str]:
+    """根据文件名返回 "json"、"yaml"，无法识别时返回None"""
+    suffix = Path(name).suffix.lower()
+    if suffix in JSON_SUFFIXES:
+        return "json"
+    if suffix in YAML_SUFFIXES:
+        return "yaml"
+    return None
+
+
+class ConfigParser:
+    """
+    配置解析器
+
+    解析结果按内容哈希缓存（LRU），文件读取按 (mtime_ns, size) 缓存哈希，
+    重复读取同一未变化的文件无需重新解析。
+    """
+
+    def __init__(self, schema_file: Path, cache_size: int = 64) -> None:
+        self.schema_file = schema_file
+        self.cache_size = cache_size
+        self._trees: "OrderedDict[str, Any]" = OrderedDict()
+        self._file_hashes: Dict[Path, Tuple[int, int, str]] = {}
+        self._schema: Optional[Tuple[int, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+
+    def get_schema(self) -> Optional[Dict[str, Any]]:
+        if not self.schema_file.exists():
+            return None
+        mtime = self.schema_file.stat().st_mtime_ns
+        with self._lock:
+            if self._schema and self._schema[0] == mtime:
+                return self._schema[1]
+        schema = json.loads(self.schema_file.read_text())
+        with self._lock:
+            self._schema = (mtime, schema)
+        return schema
+
+    def set_schema(self, schema: Optional[Dict[str, Any]]) -> None:
+        """
+        保存校验用的 schema；传入None或空字典时移除 schema
+
+        Raises:
+            ConfigValidationError: schema 结构不合法（如 pattern 无法编译）时抛出，不写入文件
+        """
+        if schema:
+            errors: List[Dict[str, Any]] = []
+            _check_schema(schema, "", errors)
+            if errors:
+                raise ConfigValidationError(errors)
+        if not schema:
+            self.schema_file.unlink(missing_ok=True)
+        else:
+            self.schema_file.write_text(json.dumps(schema, indent=2))
+        with self._lock:
+            self._schema = None
+
+    def parse(self, name: str, content: bytes) -> Tuple[str, Any]:
+        """
+        解析配置内容
+
+        Returns:
+            (内容哈希, 解析后的树)；无法识别格式时树为None
+
+        Raises:
+            ConfigValidationError: 语法错误时抛出，包含行号
+        """
+        digest = content_hash(content)
+        fmt = config_format(name)
+        if fmt is None:
+            return digest, None
+        key = f"{fmt}:{digest}"
+        with self._lock:
+            if key in self._trees:
+                self._trees.move_to_end(key)
+                return digest, self._trees[key]
+        tree = self._parse_text(fmt, self._decode(content))
+        with self._lock:
+            self._trees[key] = tree
+            while len(self._trees) > self.cache_size:
+                self._trees.popitem(last=False)
+        return digest, tree
+
+    def validate(self, name: str, content: bytes) -> Tuple[str, Any]:
+        """
+        解析并按当前 schema 校验配置内容
+
+        Raises:
+            ConfigValidationError: 语法或 schema 校验失败时抛出
+        """
+        digest, tree = self.parse(name, content)
+        schema = self.get_schema()
+        if schema is None or config_format(name) is None:
+            return digest, tree
+        errors: List[Dict[str, Any]] = []
+        _check(schema, tree, "", errors)
+        if errors:
+            lines = _line_index(self._decode(content))
+            for error in errors:
+                error["line"] = _nearest_line(lines, error["path"])
+            raise ConfigValidationError(errors)
+        return digest, tree
+
+    def load(self, path: Path) -> Tuple[str, Any]:
+        """读取并解析配置文件，文件未变化时直接命中缓存"""
+        stat = path.stat()
+        with self._lock:
+            cached = self._file_hashes.get(path)
+            key = f"{config_format(path.name)}:{cached[2]}" if cached else None
+            if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size) and key in self._trees:
+                self._trees.move_to_end(key)
+                return cached[2], self._trees[key]
+        digest, tree = self.parse(path.name, path.read_bytes())
+        with self._lock:
+            self._file_hashes[path] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest, tree
+
+    def file_hash(self, path: Path) -> str:
+        """返回文件内容哈希，按 (mtime_ns, size) 缓存"""
+        stat = path.stat()
+        with self._lock:
+            cached = self._file_hashes.get(path)
+            if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+                return cached[2]
+        digest = content_hash(path.read_bytes())
+        with self._lock:
+            self._file_hashes[path] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def forget(self, path: Path) -> None:
+        with self._lock:
+            self._file_hashes.pop(path, None)
+
+    def _decode(self, content: bytes) -> str:
+        try:
+            return content.decode("utf-8")
+        except UnicodeDecodeError as exc:
+            raise ConfigValidationError(
+                [{"path": "", "line": None, "message": f"config is not valid utf-8: {exc}"}]
+            ) from exc
+
+    def _parse_text(self, fmt: str, text: str) -> Any:
+        if fmt == "json":
+            try:
+                return json.loads(text)
+            except json.JSONDecodeError as exc:
+                raise ConfigValidationError(
+                    [{"path": "", "line": exc.lineno, "message": exc.msg}]
+                ) from exc
+        import yaml
+
+        try:
+            return yaml.safe_load(text)
+        except yaml.MarkedYAMLError as exc:
+            line = exc.problem_mark.line + 1 if exc.problem_mark else None
+            raise ConfigValidationError(
+                [{"path": "", "line": line, "message": str(exc.problem or exc)}]
+            ) from exc
+        except yaml.YAMLError as exc:
+            raise ConfigValidationError([{"path": "", "line": None, "message": str(exc)}]) from exc
+
+
+def _check(schema: Dict[str, Any], value: Any, path: str, errors: List[Dict[str, Any]]) -> None:
+    """按 JSON Schema 常用子集校验，错误追加到 errors"""
+
+    def fail(message: str) -> None:
+        errors.append({"path": path, "line": None, "message": message})
+
+    if not isinstance(schema, dict):
+        return
+    expected = schema.get("type")
+    if expected:
+        types = expected if isinstance(expected, list) else [expected]
+        if not any(_TYPE_CHECKS.get(name, lambda _: True)(value) for name in types):
+            fail(f"expected {' or '.join(types)}")
+            return
+    if "enum" in schema and value not in schema["enum"]:
+        fail(f"must be one of {schema['enum']}")
+    if "const" in schema and value != schema["const"]:
+        fail(f"must equal {schema['const']!r}")
+
+    if _TYPE_CHECKS["number"](value):
+        if "minimum" in schema and value < schema["minimum"]:
+            fail(f"must be >= {schema['minimum']}")
+        if "maximum" in schema and value > schema["maximum"]:
+            fail(f"must be <= {schema['maximum']}")
+        if "exclusiveMinimum" in schema and value <= schema["exclusiveMinimum"]:
+            fail(f"must be > {schema['exclusiveMinimum']}")
+        if "exclusiveMaximum" in schema and value >= schema["exclusiveMaximum"]:
+            fail(f"must be < {schema['exclusiveMaximum']}")
+
+    if isinstance(value, str):
+        if "minLength" in schema and len(value) < schema["minLength"]:
+            fail(f"length must be >= {schema['minLength']}")
+        if "maxLength" in schema and len(value) > schema["maxLength"]:
+            fail(f"length must be <= {schema['maxLength']}")
+        if "pattern" in schema and not re.search(schema["pattern"], value):
+            fail(f"must match pattern {schema['pattern']!r}")
+
+    if isinstance(value, list):
+        if "minItems" in schema and len(value) < schema["minItems"]:
+            fail(f"must have at least {schema['minItems']} items")
+        if "maxItems" in schema and len(value) > schema["maxItems"]:
+            fail(f"must have at most {schema['maxItems']} items")
+        if isinstance(schema.get("items"), dict):
+            for index, item in enumerate(value):
+                _check(schema["items"], item, f"{path}/{index}", errors)
+
+    if isinstance(value, dict):
+        properties = schema.get("properties", {})
+        for key in schema.get("required", []):
+            if key not in value:
+                fail(f"missing required property {key!r}")
+        additional = schema.get("additionalProperties", True)
+        for key, item in value.items():
+            child = f"{path}/{_escape(str(key))}"
+            if key in properties:
+                _check(properties[key], item, child, errors)
+            elif additional is False:
+                errors.append({"path": child, "line": None, "message": "unexpected property"})
+            elif isinstance(additional, dict):
+                _check(additional, item, child, errors)
+
+
+_NUMBER_KEYWORDS = ("minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum")
+_COUNT_KEYWORDS = ("minLength", "maxLength", "minItems", "maxItems")
+
+
+def _check_schema(schema: Any, path: str, errors: List[Dict[str, Any]]) -> None:
+    """检查 schema 本身的结构（_check 支持的关键字），错误追加到 errors，path 为 schema 内的位置"""
+
+    def fail(message: str) -> None:
+        errors.append({"path": path, "line": None, "message": message})
+
+    if not isinstance(schema, dict):
+        fail("schema must be an object")
+        return
+    expected = schema.get("type")
+    if expected is not None:
+        types = expected if isinstance(expected, list) else [expected]
+        unknown = [name for name in types if not isinstance(name, str) or name not in _TYPE_CHECKS]
+        if unknown or not types:
+            fail(f"type must be one of {', '.join(_TYPE_CHECKS)} or a list of them")
+    if "enum" in schema and not isinstance(schema["enum"], list):
+        fail("enum must be an array")
+    for keyword in _NUMBER_KEYWORDS:
+        if keyword in schema and not _TYPE_CHECKS["number"](schema[keyword]):
+            fail(f"{keyword} must be a number")
+    for keyword in _COUNT_KEYWORDS:
+        if keyword in schema and not (_TYPE_CHECKS["integer"](schema[keyword]) and schema[keyword] >= 0):
+            fail(f"{keyword} must be a non-negative integer")
+    if "pattern" in schema:
+        try:
+            re.compile(schema["pattern"])
+        except (re.error, TypeError) as exc:
+            fail(f"pattern is not a valid regular expression: {exc}")
+    required = schema.get("required", [])
+    if not isinstance(required, list) or not all(isinstance(key, str) for key in required):
+        fail("required must be an array of strings")
+    properties = schema.get("properties", {})
+    if not isinstance(properties, dict):
+        fail("properties must be an object")
+    else:
+        for key, child in properties.items():
+            _check_schema(child, f"{path}/properties/{_escape(str(key))}", errors)
+    if "items" in schema:
+        _check_schema(schema["items"], f"{path}/items", errors)
+    additional = schema.get("additionalProperties", True)
+    if isinstance(additional, dict):
+        _check_schema(additional, f"{path}/additionalProperties", errors)
+    elif not isinstance(additional, bool):
+        fail("additionalProperties must be a boolean or an object")
+
+
+def _escape(token: str) -> str:
+    return token.replace("~", "~0").replace("/", "~1")
+
+
+def _line_index(text: str) -> Dict[str, int]:
+    """把 JSON Pointer 映射到源文本行号（基于 YAML 节点位置，JSON 同样适用）"""
+    import yaml
+
+    try:
+        root = yaml.compose(text)
+    except yaml.YAMLError:
+        return {}
+    index: Dict[str, int] = {}
+
+    def walk(node: Any, path: str) -> None:
+        if node is None:
+            return
+        index[path] = node.start_mark.line + 1
+        if isinstance(node, yaml.MappingNode):
+            for key_node, value_node in node.value:
+                child = f"{path}/{_escape(str(key_node.value))}"
+                walk(value_node, child)
+                index[child] = key_node.start_mark.line + 1  # 指向键所在行，而不是值的起始行
+        elif isinstance(node, yaml.SequenceNode):
+            for position, item in enumerate(node.value):
+                walk(item, f"{path}/{position}")
+
+    walk(root, "")
+    return index
+
+
+def _nearest_line(index: Dict[str, int], path: str) -> Optional[int]:
+    while True:
+        if path in index:
+            return index[path]
+        if not path:
+            return None
+        path = path.rsplit("/", 1)[0]
@@ -0,0 +1,150 @@
+"""
+配置补丁
+
+实现 RFC 6902 JSON Patch 与 RFC 7396 JSON Merge Patch，作用于解析后的配置树。
+"""
+
+from __future__ import annotations
+
+from copy import deepcopy
+from typing import Any, Dict, List, Tuple
+
+JSON_PATCH = "application/json-patch+json"
+MERGE_PATCH = "application/merge-patch+json"
+
+
+class PatchError(ValueError):
+    """补丁格式错误或无法应用"""
+
+
+def apply_merge_patch(target: Any, patch: Any) -> Any:
+    """按 RFC 7396 合并补丁，null 表示删除键；返回新对象，不修改入参"""
+    if not isinstance(patch, dict):
+        return deepcopy(patch)
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
+
+
+def apply_json_patch(document: Any, operations: List[Dict[str, Any]]) -> Any:
+    """
+    按 RFC 6902 依次应用操作，任一操作失败则整体失败
+
+    Raises:
+        PatchError: 操作格式错误、路径不存在或 test 不通过时抛出
+    """
+    if not isinstance(operations, list):
+        raise PatchError("json patch must be an array of operations")
+    result = deepcopy(document)
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict) or "op" not in operation or "path" not in operation:
+            raise PatchError(f"operation {index}: 'op' and 'path' are required")
+        op = operation["op"]
+        path = operation["path"]
+        try:
+            if op == "add":
+                result = _add(result, path, deepcopy(_require(operation, "value")))
+            elif op == "remove":
+                result, _ = _remove(result, path)
+            elif op == "replace":
+                _get(result, path)
+                result, _ = _remove(result, path)
+                result = _add(result, path, deepcopy(_require(operation, "value")))
+            elif op == "move":
+                source = _require(operation, "from")
+                if path != source and path.startswith(f"{source}/"):
+                    raise PatchError("cannot move a value into one of its children")
+                result, value = _remove(result, source)
+                result = _add(result, path, value)
+            elif op == "copy":
+                value = deepcopy(_get(result, _require(operation, "from")))
+                result = _add(result, path, value)
+            elif op == "test":
+                if _get(result, path) != _require(operation, "value"):
+                    raise PatchError(f"test failed at {path!r}")
+            else:
+                raise PatchError(f"unknown op {op!r}")
+        except PatchError as exc:
+            raise PatchError(f"operation {index}: {exc}") from None
+    return result
+
+
+def _require(operation: Dict[str, Any], key: str) -> Any:
+    if key not in operation:
+        raise PatchError(f"'{key}' is required for {operation['op']}")
+    return operation[key]
+
+
+def _tokens(path: str) -> List[str]:
+    if path == "":
+        return []
+    if not path.startswith("/"):
+        raise PatchError(f"invalid pointer {path!r}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in path[1:].split("/")]
+
+
+def _index(container: List[Any], token: str, allow_end: bool) -> int:
+    if token == "-" and allow_end:
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token.startswith("0")):
+        raise PatchError(f"invalid array index {token!r}")
+    position = int(token)
+    limit = len(container) if allow_end else len(container) - 1
+    if position > limit:
+        raise PatchError(f"array index {token} out of range")
+    return position
+
+
+def _parent(document: Any, path: str) -> Tuple[Any, str]:
+    tokens = _tokens(path)
+    if not tokens:
+        raise PatchError("operation on the document root is not supported here")
+    node = document
+    for token in tokens[:-1]:
+        if isinstance(node, dict) and token in node:
+            node = node[token]
+        elif isinstance(node, list):
+            node = node[_index(node, token, allow_end=False)]
+        else:
+            raise PatchError(f"path {path!r} not found")
+    return node, tokens[-1]
+
+
+def _get(document: Any, path: str) -> Any:
+    node = document
+    for token in _tokens(path):
+        if isinstance(node, dict) and token in node:
+            node = node[token]
+        elif isinstance(node, list):
+            node = node[_index(node, token, allow_end=False)]
+        else:
+            raise PatchError(f"path {path!r} not found")
+    return node
+
+
+def _add(document: Any, path: str, value: Any) -> Any:
+    if path == "":
+        return value
+    parent, token = _parent(document, path)
+    if isinstance(parent, dict):
+        parent[token] = value
+    elif isinstance(parent, list):
+        parent.insert(_index(parent, token, allow_end=True), value)
+    else:
+        raise PatchError(f"path {path!r} not found")
+    return document
+
+
+def _remove(document: Any, path: str) -> Tuple[Any, Any]:
+    if path == "":
+        return None, document
+    parent, token = _parent(document, path)
+    if isinstance(parent, dict) and token in parent:
+        return document, parent.pop(token)
+    if isinstance(parent, list):
+        return document, parent.pop(_index(parent, token, allow_end=False))
+    raise PatchError(f"path {path!r} not found")
@@ -0,0 +1,205 @@
+"""
+配置版本存储
+
+每次上传或更新配置都会生成一个新版本。内容按哈希去重存储，
+每隔若干版本保存一次完整关键帧，其余版本仅保存相对上一版本的行级差异。
+回滚只移动 head 指针，不会新增版本。
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from difflib import SequenceMatcher, unified_diff
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import os
+import threading
+
+from app.utils import TIMESTAMP_FORMAT, ensure_dir
+
+KEYFRAME_INTERVAL = 8
+
+
+class ConfigVersionStore:
+    """
+    配置版本存储
+
+    目录结构：<root>/<config>/index.json 记录版本列表与 head，
+    <root>/<config>/objects/<hash>.json 为关键帧或差异对象。
+    """
+
+    def __init__(self, root: Path, keyframe_interval: int = KEYFRAME_INTERVAL) -> None:
+        self.root = root
+        self.keyframe_interval = keyframe_interval
+        self._lock = threading.Lock()
+
+    def record(self, name: str, content: bytes, source: str) -> Dict[str, Any]:
+        """
+        记录一个新版本
+
+        Args:
+            name: 配置文件名
+            content: 新内容
+            source: 版本来源（upload/update/patch/bundle/initial）
+
+        Returns:
+            新版本条目；内容与 head 相同时返回 head 条目，不新增版本
+        """
+        text = content.decode("utf-8", errors="surrogateescape")
+        digest = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            index = self._load_index(name)
+            head = self._head_entry(index)
+            if head and head["hash"] == digest:
+                return head
+            if not self._object_path(name, digest).exists():
+                self._store_object(name, digest, text, head)
+            entry = {
+                "version": (index["versions"][-1]["version"] + 1) if index["versions"] else 1,
+                "hash": digest,
+                "size": len(content),
+                "source": source,
+                "created": datetime.now().strftime(TIMESTAMP_FORMAT),
+            }
+            index["versions"].append(entry)
+            index["head"] = entry["version"]
+            self._save_index(name, index)
+            return entry
+
+    def has_history(self, name: str) -> bool:
+        return self._index_path(name).exists()
+
+    def list_versions(self, name: str) -> Dict[str, Any]:
+        with self._lock:
+            index = self._load_index(name)
+        return {"head": index["head"], "versions": index["versions"]}
+
+    def content(self, name: str, version: int) -> bytes:
+        """
+        还原指定版本的内容
+
+        Raises:
+            FileNotFoundError: 版本不存在时抛出
+        """
+        with self._lock:
+            entry = self._find(self._load_index(name), version)
+            return self._materialize(name, entry["hash"]).encode("utf-8", errors="surrogateescape")
+
+    def diff(self, name: str, from_version: int, to_version: int) -> str:
+        """返回两个版本之间的 unified diff 文本"""
+        before = self.content(name, from_version).decode("utf-8", errors="replace")
+        after = self.content(name, to_version).decode("utf-8", errors="replace")
+        return "".join(
+            unified_diff(
+                before.splitlines(keepends=True),
+                after.splitlines(keepends=True),
+                fromfile=f"{name}@{from_version}",
+                tofile=f"{name}@{to_version}",
+            )
+        )
+
+    def set_head(self, name: str, version: int) -> Dict[str, Any]:
+        """
+        将 head 指向已有版本（回滚），返回该版本条目
+
+        Raises:
+            FileNotFoundError: 版本不存在时抛出
+        """
+        with self._lock:
+            index = self._load_index(name)
+            entry = self._find(index, version)
+            index["head"] = version
+            self._save_index(name, index)
+            return entry
+
+    def _find(self, index: Dict[str, Any], version: int) -> Dict[str, Any]:
+        for entry in index["versions"]:
+            if entry["version"] == version:
+                return entry
+        raise FileNotFoundError("config version not found")
+
+    def _head_entry(self, index: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if index["head"] is None:
+            return None
+        return self._find(index, index["head"])
+
+    def _store_object(
+        self, name: str, digest: str, text: str, head: Optional[Dict[str, Any]]
+    ) -> None:
+        obj: Dict[str, Any] = {"kind": "key", "depth": 0, "text": text}
+        if head is not None:
+            base = self._read_object(name, head["hash"])
+            if base["depth"] + 1 < self.keyframe_interval:
+                base_text = self._materialize(name, head["hash"])
+                obj = {
+                    "kind": "delta",
+                    "base": head["hash"],
+                    "depth": base["depth"] + 1,
+                    "ops": _line_delta(base_text, text),
+                }
+        path = self._object_path(name, digest)
+        ensure_dir(path.parent)
+        path.write_text(json.dumps(obj))
+
+    def _materialize(self, name: str, digest: str) -> str:
+        chain: List[Dict[str, Any]] = []
+        obj = self._read_object(name, digest)
+        while obj["kind"] == "delta":
+            chain.append(obj)
+            obj = self._read_object(name, obj["base"])
+        text = obj["text"]
+        for delta in reversed(chain):
+            text = _apply_delta(text, delta["ops"])
+        return text
+
+    def _read_object(self, name: str, digest: str) -> Dict[str, Any]:
+        return json.loads(self._object_path(name, digest).read_text())
+
+    def _config_root(self, name: str) -> Path:
+        return self.root / Path(name).name
+
+    def _index_path(self, name: str) -> Path:
+        return self._config_root(name) / "index.json"
+
+    def _object_path(self, name: str, digest: str) -> Path:
+        return self._config_root(name) / "objects" / f"{digest}.json"
+
+    def _load_index(self, name: str) -> Dict[str, Any]:
+        path = self._index_path(name)
+        if not path.exists():
+            return {"head": None, "versions": []}
+        return json.loads(path.read_text())
+
+    def _save_index(self, name: str, index: Dict[str, Any]) -> None:
+        path = self._index_path(name)
+        ensure_dir(path.parent)
+        partial = path.with_name(f".{path.name}.partial")
+        partial.write_text(json.dumps(index, indent=2))
+        os.replace(partial, path)
+
+
+def _line_delta(base: str, target: str) -> List[List[Any]]:
+    """生成行级差异：["c", i1, i2] 复制基准行区间，["i", [lines]] 插入新行"""
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    ops: List[List[Any]] = []
+    matcher = SequenceMatcher(None, base_lines, target_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(["c", i1, i2])
+        elif tag in ("replace", "insert"):
+            ops.append(["i", target_lines[j1:j2]])
+    return ops
+
+
+def _apply_delta(base: str, ops: List[List[Any]]) -> str:
+    base_lines = base.splitlines(keepends=True)
+    parts: List[str] = []
+    for op in ops:
+        if op[0] == "c":
+            parts.extend(base_lines[op[1] : op[2]])
+        else:
+            parts.extend(op[1])
+    return "".join(parts)
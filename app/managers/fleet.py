@@ -0,0 +1,218 @@
+"""
+多板卡聚合
+
+聚合模式下 API 并发轮询多块板卡的 /inference/status、/status/system 与 /history，
+合并为一个视图，并把选择模型、启动/停止推理等操作广播到全部（或指定）板卡。
+
+所有请求共用一个 httpx.AsyncClient 连接池；每块板卡有独立的超时，慢板卡只影响自己的条目。
+轮询结果按板卡缓存 cache_ttl 秒，同一板卡的并发轮询合并为一次请求。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import time
+
+import httpx
+
+# 可广播的操作：名称 -> (HTTP 方法, 板卡上的路径)
+ACTIONS: Dict[str, Tuple[str, str]] = {
+    "model/select": ("POST", "/model/select"),
+    "config/select": ("POST", "/config/select"),
+    "bundle/select": ("POST", "/bundle/select"),
+    "inference/start": ("POST", "/inference/start"),
+    "inference/stop": ("POST", "/inference/stop"),
+}
+
+
+@dataclass(frozen=True)
+class Board:
+    """一块板卡"""
+    name: str  # 显示名（默认取 URL 的 host:port）
+    url: str  # API 根地址
+    timeout: float  # 单次请求超时（秒）
+
+
+def parse_boards(value: str, default_timeout: float) -> List[Board]:
+    """
+    解析板卡列表：逗号分隔的 API 根地址，可用 "#秒数" 后缀单独设置超时
+
+    例如 "http://board-1:8000,http://board-2:8000#5"
+
+    Raises:
+        ValueError: 地址或超时不合法时抛出
+    """
+    boards: List[Board] = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        url, _, timeout = item.partition("#")
+        parsed = httpx.URL(url.rstrip("/"))
+        if parsed.scheme not in ("http", "https") or not parsed.host:
+            raise ValueError(f"invalid board url: {item!r}")
+        name = f"{parsed.host}:{parsed.port}" if parsed.port else parsed.host
+        if any(board.name == name for board in boards):
+            name = str(parsed)
+        boards.append(Board(name=name, url=str(parsed), timeout=float(timeout) if timeout else default_timeout))
+    return boards
+
+
+class FleetAggregator:
+    """
+    板卡聚合器
+
+    Args:
+        boards: 板卡列表
+        cache_ttl: 轮询结果的缓存秒数
+        history_limit: 每块板卡取回的历史记录条数
+        mounts: 可选的 httpx 传输映射（测试时把板卡地址挂到本地应用）
+    """
+
+    def __init__(
+        self,
+        boards: List[Board],
+        cache_ttl: float = 2.0,
+        history_limit: int = 5,
+        mounts: Optional[Dict[str, httpx.AsyncBaseTransport]] = None,
+    ) -> None:
+        self.boards = boards
+        self.cache_ttl = cache_ttl
+        self.history_limit = history_limit
+        self.mounts = mounts
+        self._client: Optional[httpx.AsyncClient] = None
+        self._cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._pending: Dict[str, asyncio.Future[Dict[str, Any]]] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=max(10, len(self.boards) * 4),
+                    max_keepalive_connections=max(5, len(self.boards) * 2),
+                ),
+                mounts=self.mounts,
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def select(self, names: Optional[List[str]]) -> List[Board]:
+        """
+        按名称选择板卡，未指定时返回全部
+
+        Raises:
+            KeyError: 存在未知板卡时抛出
+        """
+        if not names:
+            return list(self.boards)
+        by_name = {board.name: board for board in self.boards}
+        unknown = [name for name in names if name not in by_name]
+        if unknown:
+            raise KeyError(f"unknown boards: {', '.join(unknown)}")
+        return [by_name[name] for name in names]
+
+    async def snapshot(self, refresh: bool = False, names: Optional[List[str]] = None) -> Dict[str, Any]:
+        """并发取回各板卡状态并合并，refresh 为 True 时忽略缓存"""
+        boards = self.select(names)
+        entries = await asyncio.gather(*(self._board_state(board, refresh) for board in boards))
+        online = [entry for entry in entries if entry["ok"]]
+        return {
+            "boards": entries,
+            "summary": {
+                "boards": len(entries),
+                "online": len(online),
+                "running": sum(1 for entry in online if (entry["inference"] or {}).get("running")),
+                "models": sorted({
+                    (entry["inference"] or {}).get("current_model")
+                    for entry in online
+                    if (entry["inference"] or {}).get("current_model")
+                }),
+            },
+        }
+
+    async def broadcast(
+        self, action: str, params: Dict[str, str], names: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        并发向板卡执行操作，返回每块板卡的状态码与响应
+
+        Raises:
+            ValueError: 操作不支持时抛出
+            KeyError: 存在未知板卡时抛出
+        """
+        if action not in ACTIONS:
+            raise ValueError(f"action must be one of {', '.join(ACTIONS)}")
+        method, path = ACTIONS[action]
+        boards = self.select(names)
+        results = await asyncio.gather(*(self._call(board, method, path, params) for board in boards))
+        for board in boards:
+            self._cache.pop(board.name, None)
+        return {
+            "action": action,
+            "ok": all(result["ok"] for result in results),
+            "results": results,
+        }
+
+    async def _board_state(self, board: Board, refresh: bool) -> Dict[str, Any]:
+        cached = self._cache.get(board.name)
+        if not refresh and cached and time.monotonic() - cached[0] < self.cache_ttl:
+            return cached[1]
+        pending = self._pending.get(board.name)
+        if pending is None:
+            pending = asyncio.ensure_future(self._poll(board))
+            self._pending[board.name] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(board.name, None))
+        return await asyncio.shield(pending)
+
+    async def _poll(self, board: Board) -> Dict[str, Any]:
+        started = time.monotonic()
+        entry: Dict[str, Any] = {
+            "name": board.name,
+            "url": board.url,
+            "ok": False,
+            "error": None,
+            "latency_ms": None,
+            "inference": None,
+            "system": None,
+            "history": None,
+        }
+        try:
+            inference, system, history = await asyncio.gather(
+                self._get_json(board, "/inference/status"),
+                self._get_json(board, "/status/system"),
+                self._get_json(board, "/history", {"limit": str(self.history_limit)}),
+            )
+        except (httpx.HTTPError, ValueError) as exc:
+            entry["error"] = f"{type(exc).__name__}: {exc}" if str(exc) else type(exc).__name__
+        else:
+            entry.update(ok=True, inference=inference, system=system, history=history.get("history", []))
+        entry["latency_ms"] = round((time.monotonic() - started) * 1000, 1)
+        entry["fetched_at"] = time.time()
+        self._cache[board.name] = (time.monotonic(), entry)
+        return entry
+
+    async def _get_json(self, board: Board, path: str, params: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        response = await self.client.get(board.url + path, params=params, timeout=board.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    async def _call(self, board: Board, method: str, path: str, params: Dict[str, str]) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"name": board.name, "ok": False, "status_code": None}
+        try:
+            response = await self.client.request(method, board.url + path, params=params, timeout=board.timeout)
+        except httpx.HTTPError as exc:
+            result["error"] = f"{type(exc).__name__}: {exc}" if str(exc) else type(exc).__name__
+            return result
+        try:
+            body: Any = response.json()
+        except ValueError:
+            body = response.text
+        result.update(ok=response.is_success, status_code=response.status_code, response=body)
+        return result
@@ -0,0 +1,306 @@
+"""
+温度与负载调速器
+
+后台循环采样板温、CPU 与内存占用，超过阈值时对运行中的推理执行调速策略，
+回落到低阈值以下（温度带回差）后撤销：
+
+- duty：按占空比交替发送 SIGSTOP/SIGCONT，降低平均功耗
+- nice：调高推理进程的 nice 值（有会话 cgroup 时同时调低 cpu.weight），把 CPU 让给系统与 API
+- fallback：切换到更轻量的备用模型，降温后切回原模型
+
+每个动作都追加到当前运行的历史记录（events 字段），并计入 /governor/status 的统计。
+多个 API worker 都会启动调速线程，但只有持有 governor.lock 的 worker（leader）采样与调速，
+其余 worker 每个采样间隔重试一次，leader 退出后由其中之一接替。
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Any, Deque, Dict, Optional
+import os
+import signal
+import threading
+import time
+
+from app.managers.history_manager import HistoryManager
+from app.managers.inference_manager import InferenceManager
+from app.managers.model_manager import ModelManager
+from app.managers.system_monitor import SystemMonitor
+from app.utils import TIMESTAMP_FORMAT
+
+POLICIES = ("duty", "nice", "fallback")
+DEFAULT_CPU_WEIGHT = 100
+THROTTLED_CPU_WEIGHT = 10
+
+
+@dataclass(frozen=True)
+class GovernorPolicy:
+    """调速参数"""
+    policy: str = ""  # duty|nice|fallback，空字符串表示关闭
+    temp_high: float = 80.0  # 触发温度（℃）
+    temp_low: float = 70.0  # 恢复温度（℃）
+    cpu_high: float = 0.0  # 触发的系统 CPU 占用（%），0 表示不检查
+    memory_high: float = 0.0  # 触发的内存占用（%），0 表示不检查
+    interval: float = 2.0  # 采样间隔（秒）
+    duty: float = 0.5  # duty 策略下推理运行时间占比
+    duty_period: float = 1.0  # duty 策略的周期（秒）
+    nice: int = 10  # nice 策略使用的 nice 值
+    fallback_model: str = ""  # fallback 策略使用的模型文件名
+
+
+class ThermalGovernor:
+    """
+    推理调速器
+
+    只作用于当前会话的推理进程；会话变化（停止、重启）时丢弃调速状态。
+    """
+
+    def __init__(
+        self,
+        inference_manager: InferenceManager,
+        system_monitor: SystemMonitor,
+        history_manager: HistoryManager,
+        model_manager: ModelManager,
+        policy: GovernorPolicy,
+    ) -> None:
+        if policy.policy and policy.policy not in POLICIES:
+            raise ValueError(f"governor policy must be one of {', '.join(POLICIES)}")
+        self.inference_manager = inference_manager
+        self.system_monitor = system_monitor
+        self.history_manager = history_manager
+        self.model_manager = model_manager
+        self.policy = policy
+        self.state = "normal"  # normal|throttled
+        self.reason: Optional[str] = None
+        self.sample: Dict[str, float] = {}
+        self.throttle_count = 0
+        self.throttled_seconds = 0.0
+        self.last_error: Optional[str] = None
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=50)
+        self._pid: Optional[int] = None  # 调速中的推理进程
+        self._original_model: Optional[str] = None  # fallback 前的模型
+        self._throttled_since: Optional[float] = None
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._leader: Optional[IO[str]] = None  # 持有期间本 worker 负责调速
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.policy.policy)
+
+    def start(self) -> None:
+        """启动调速线程（未配置策略时不启动）"""
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="thermal-governor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止调速线程，并撤销尚在生效的调速"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._lock:
+            if self.state == "throttled":
+                self._restore("governor stopped")
+        if self._leader is not None:
+            self._leader.close()
+            self._leader = None
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            throttled = self.throttled_seconds
+            if self._throttled_since is not None:
+                throttled += time.monotonic() - self._throttled_since
+            return {
+                "enabled": self.enabled,
+                "running": self._thread is not None and self._thread.is_alive(),
+                "leader": self._leader is not None,
+                "state": self.state,
+                "reason": self.reason,
+                "pid": self._pid,
+                "sample": self.sample,
+                "throttle_count": self.throttle_count,
+                "throttled_seconds": round(throttled, 3),
+                "last_error": self.last_error,
+                "policy": asdict(self.policy),
+                "events": list(self.events),
+            }
+
+    def tick(self) -> None:
+        """采样一次并按阈值进入或退出调速"""
+        status = self.inference_manager.status()
+        sample = self._sample()
+        with self._lock:
+            self.sample = sample
+            if self.state == "throttled" and (not status.running or status.pid != self._pid):
+                if not self._switching():
+                    self._reset()
+            if not status.running:
+                return
+            hot = self._hot_reason(sample)
+            if self.state == "normal" and hot:
+                self._throttle(status.pid, hot)
+            elif self.state == "throttled" and self._cool(sample):
+                self._restore(f"temperature {sample['temperature']:.1f} <= {self.policy.temp_low:.1f}")
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            if self._leader is None:
+                self._leader = self.inference_manager.state_store.try_leader("governor")
+                if self._leader is None:
+                    self._stopping.wait(self.policy.interval)
+                    continue
+            try:
+                self.tick()
+            except Exception as exc:  # 调速线程不能因单次采样失败退出
+                self.last_error = str(exc)
+            if self.state == "throttled" and self.policy.policy == "duty":
+                self._duty_cycle()
+            else:
+                self._stopping.wait(self.policy.interval)
+
+    def _duty_cycle(self) -> None:
+        """在一个采样间隔内按占空比暂停/继续推理进程，最后保持运行状态"""
+        deadline = time.monotonic() + self.policy.interval
+        on_time = self.policy.duty_period * self.policy.duty
+        off_time = self.policy.duty_period - on_time
+        while time.monotonic() < deadline and not self._stopping.is_set():
+            pid = self._pid
+            if pid is None or not self._signal(pid, signal.SIGSTOP):
+                return
+            self._stopping.wait(off_time)
+            self._signal(pid, signal.SIGCONT)
+            self._stopping.wait(on_time)
+
+    def _sample(self) -> Dict[str, float]:
+        status = self.system_monitor.get_status()
+        return {
+            "temperature": float(status["temperature"]["current"]),
+            "cpu_percent": float(status["cpu_load"]["cpu_percent"]),
+            "memory_percent": float(status["memory_usage"]["percent"]),
+        }
+
+    def _hot_reason(self, sample: Dict[str, float]) -> Optional[str]:
+        policy = self.policy
+        if sample["temperature"] >= policy.temp_high:
+            return f"temperature {sample['temperature']:.1f} >= {policy.temp_high:.1f}"
+        if policy.cpu_high and sample["cpu_percent"] >= policy.cpu_high:
+            return f"cpu {sample['cpu_percent']:.1f}% >= {policy.cpu_high:.1f}%"
+        if policy.memory_high and sample["memory_percent"] >= policy.memory_high:
+            return f"memory {sample['memory_percent']:.1f}% >= {policy.memory_high:.1f}%"
+        return None
+
+    def _cool(self, sample: Dict[str, float]) -> bool:
+        policy = self.policy
+        return (
+            sample["temperature"] <= policy.temp_low
+            and not (policy.cpu_high and sample["cpu_percent"] >= policy.cpu_high)
+            and not (policy.memory_high and sample["memory_percent"] >= policy.memory_high)
+        )
+
+    def _throttle(self, pid: int, reason: str) -> None:
+        policy = self.policy.policy
+        detail: Dict[str, Any] = {}
+        if policy == "nice":
+            detail["nice"] = self._set_nice(pid, self.policy.nice)
+            detail["cpu_weight"] = self._set_cpu_weight(THROTTLED_CPU_WEIGHT)
+        elif policy == "fallback":
+            fallback = self.policy.fallback_model
+            if not fallback:
+                self.last_error = "fallback model not configured"
+                return
+            self._original_model = self.inference_manager.status().current_model
+            if self._original_model == fallback:
+                return
+            pid = self._switch_model(fallback)
+            detail["model"] = fallback
+        self.state = "throttled"
+        self.reason = reason
+        self._pid = pid
+        self.throttle_count += 1
+        self._throttled_since = time.monotonic()
+        self._record("throttle", reason, detail)
+
+    def _restore(self, reason: str) -> None:
+        policy = self.policy.policy
+        detail: Dict[str, Any] = {}
+        if self._pid is not None:
+            if policy == "duty":
+                self._signal(self._pid, signal.SIGCONT)
+            elif policy == "nice":
+                detail["nice"] = self._set_nice(self._pid, 0)
+                detail["cpu_weight"] = self._set_cpu_weight(DEFAULT_CPU_WEIGHT)
+            elif policy == "fallback" and self._original_model:
+                detail["model"] = self._original_model
+                self._pid = self._switch_model(self._original_model)
+        self._record("restore", reason, detail)
+        self._reset()
+
+    def _reset(self) -> None:
+        if self._throttled_since is not None:
+            self.throttled_seconds += time.monotonic() - self._throttled_since
+        self.state = "normal"
+        self.reason = None
+        self._pid = None
+        self._original_model = None
+        self._throttled_since = None
+
+    def _switching(self) -> bool:
+        """fallback 切换后会话 pid 变化属于预期，跟随新的推理进程"""
+        status = self.inference_manager.status()
+        if self.policy.policy == "fallback" and status.running and status.current_model == self.policy.fallback_model:
+            self._pid = status.pid
+            return True
+        return False
+
+    def _switch_model(self, model: str) -> Optional[int]:
+        """用同一配置与运行参数、以指定模型重新启动推理"""
+        session = self.inference_manager.state_store.read()["session"]
+        if not session or not session.get("config_path"):
+            raise RuntimeError("running session has no config path")
+        model_path = self.model_manager.get_model(model)
+        try:
+            self.inference_manager.stop()
+        except RuntimeError:
+            pass
+        return self.inference_manager.start(
+            model_path, Path(session["config_path"]), session.get("args") or []
+        )
+
+    def _set_cpu_weight(self, weight: int) -> Optional[int]:
+        limiter = self.inference_manager.limiter
+        session = self.inference_manager.state_store.read()["session"]
+        if limiter is None or not session or not limiter.set_cpu_weight(session.get("cgroup"), weight):
+            return None
+        return weight
+
+    def _set_nice(self, pid: int, value: int) -> Optional[int]:
+        try:
+            os.setpriority(os.PRIO_PROCESS, pid, value)
+        except OSError as exc:
+            # 降低 nice 值需要 CAP_SYS_NICE，失败时保持当前值并记录原因
+            self.last_error = f"setpriority failed: {exc}"
+            return None
+        return value
+
+    @staticmethod
+    def _signal(pid: int, signum: int) -> bool:
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            return False
+        return True
+
+    def _record(self, action: str, reason: str, detail: Dict[str, Any]) -> None:
+        event = {"action": action, "policy": self.policy.policy, "reason": reason, **detail}
+        self.events.append({"time": datetime.now().strftime(TIMESTAMP_FORMAT), **event})
+        log_file = self.inference_manager.status().log_file
+        if log_file:
+            self.history_manager.record_event(log_file, event)
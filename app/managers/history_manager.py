@@ -1,53 +1,337 @@
 from __future__ import annotations
 
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 import json
+import os
+import threading
 
-from app.utils import TIMESTAMP_FORMAT, ensure_dir
+from app.utils import TIMESTAMP_FORMAT, ensure_dir, parse_timestamp
+
+# 计入失败率的结束状态
+FAILURE_STATUSES = {"failed", "interrupted"}
+STATS_GROUPS = ("model", "config", "pair")
 
 
 class HistoryManager:
+    """
+    推理历史记录
+
+    记录按启动顺序保存在 JSON 列表中，记录 ID 即其在列表中的下标。
+    内存中缓存记录列表，并维护按启动时间有序的索引、按模型/配置的 ID 列表，
+    以及按 (日期, 模型, 配置) 分桶的汇总计数；本进程的写入增量更新这些结构，
+    文件被其他 worker 修改（mtime/size 变化）时整体重建。
+    """
+
     def __init__(self, history_file: Path) -> None:
         self.history_file = history_file
         ensure_dir(self.history_file.parent)
+        self._lock = threading.RLock()
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._items: List[Dict[str, Any]] = []
+        self._starts: List[str] = []
+        self._by_model: Dict[str, List[int]] = defaultdict(list)
+        self._by_config: Dict[str, List[int]] = defaultdict(list)
+        self._open: Dict[str, int] = {}  # 未结束记录：log_file -> ID
+        self._rollups: Dict[Tuple[str, str, str], Dict[str, float]] = {}
 
-    def _load(self) -> List[Dict[str, Optional[str]]]:
-        if not self.history_file.exists():
-            return []
+    def _load(self) -> List[Dict[str, Any]]:
+        """返回缓存的记录列表，文件变化时重新读取并重建索引（需在锁内调用）"""
         try:
-            return json.loads(self.history_file.read_text())
-        except json.JSONDecodeError:
-            return []
+            stat = self.history_file.stat()
+        except FileNotFoundError:
+            stamp = None
+        else:
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp is not None and stamp == self._stamp:
+            return self._items
+        items: List[Dict[str, Any]] = []
+        if stamp is not None:
+            try:
+                items = json.loads(self.history_file.read_text())
+            except json.JSONDecodeError:
+                items = []
+        self._rebuild(items)
+        self._stamp = stamp
+        return self._items
+
+    def _rebuild(self, items: List[Dict[str, Any]]) -> None:
+        self._items = items
+        self._starts = []
+        self._by_model = defaultdict(list)
+        self._by_config = defaultdict(list)
+        self._open = {}
+        self._rollups = {}
+        for record_id, record in enumerate(items):
+            self._index(record_id, record)
+            if record.get("end_time") is not None:
+                self._roll_end(record)
 
-    def _save(self, items: List[Dict[str, Optional[str]]]) -> None:
+    def _index(self, record_id: int, record: Dict[str, Any]) -> None:
+        self._starts.append(record.get("start_time") or "")
+        self._by_model[record.get("model") or ""].append(record_id)
+        self._by_config[record.get("config") or ""].append(record_id)
+        if record.get("end_time") is None and record.get("log_file"):
+            self._open[record["log_file"]] = record_id
+        self._bucket(record)["runs"] += 1
+
+    def _bucket(self, record: Dict[str, Any]) -> Dict[str, float]:
+        key = ((record.get("start_time") or "")[:10], record.get("model") or "", record.get("config") or "")
+        bucket = self._rollups.get(key)
+        if bucket is None:
+            bucket = {"runs": 0, "finished": 0, "failed": 0, "uptime": 0.0}
+            self._rollups[key] = bucket
+        return bucket
+
+    def _roll_end(self, record: Dict[str, Any]) -> None:
+        bucket = self._bucket(record)
+        bucket["finished"] += 1
+        if record.get("status") in FAILURE_STATUSES:
+            bucket["failed"] += 1
+        try:
+            uptime = (parse_timestamp(record["end_time"]) - parse_timestamp(record["start_time"])).total_seconds()
+        except (KeyError, TypeError, ValueError):
+            uptime = 0.0
+        bucket["uptime"] += max(0.0, uptime)
+
+    def _save(self, items: List[Dict[str, Any]]) -> None:
         ensure_dir(self.history_file.parent)
-        self.history_file.write_text(json.dumps(items, indent=2))
+        partial = self.history_file.with_name(f".{self.history_file.name}.{os.getpid()}.partial")
+        partial.write_text(json.dumps(items, indent=2))
+        os.replace(partial, self.history_file)
+        stat = self.history_file.stat()
+        self._stamp = (stat.st_mtime_ns, stat.st_size)
 
     def record_start(self, model: str, config: str, log_file: str) -> Dict[str, Optional[str]]:
-        items = self._load()
-        record = {
-            "start_time": datetime.now().strftime(TIMESTAMP_FORMAT),
-            "end_time": None,
-            "model": model,
-            "config": config,
-            "log_file": log_file,
-            "status": "running",
-        }
-        items.append(record)
-        self._save(items)
-        return record
+        with self._lock:
+            items = self._load()
+            record = {
+                "start_time": datetime.now().strftime(TIMESTAMP_FORMAT),
+                "end_time": None,
+                "model": model,
+                "config": config,
+                "log_file": log_file,
+                "status": "running",
+            }
+            items.append(record)
+            self._index(len(items) - 1, record)
+            self._save(items)
+            return record
 
     def record_end(self, log_file: str, status: str) -> None:
-        items = self._load()
-        for record in reversed(items):
-            if record.get("log_file") == log_file and record.get("end_time") is None:
-                record["end_time"] = datetime.now().strftime(TIMESTAMP_FORMAT)
-                record["status"] = status
-                break
-        self._save(items)
+        with self._lock:
+            items = self._load()
+            record_id = self._open.pop(log_file, None)
+            if record_id is None:
+                return
+            self._end(items[record_id], status)
+            self._save(items)
+
+    def record_event(self, log_file: str, event: Dict[str, Any], keep: int = 100) -> None:
+        """向对应运行记录追加事件（如调速器动作），每条记录最多保留 keep 条"""
+        with self._lock:
+            items = self._load()
+            for record in reversed(items):
+                if record.get("log_file") == log_file:
+                    events = record.setdefault("events", [])
+                    events.append({"time": datetime.now().strftime(TIMESTAMP_FORMAT), **event})
+                    del events[:-keep]
+                    break
+            else:
+                return
+            self._save(items)
+
+    def close_stale(self, status: str, keep_log_file: Optional[str] = None) -> int:
+        """把仍为 running 但进程已不存在的记录标记为结束，返回处理的条数"""
+        with self._lock:
+            items = self._load()
+            stale = [record_id for log_file, record_id in self._open.items() if log_file != keep_log_file]
+            stale += [
+                record_id
+                for record_id, record in enumerate(items)
+                if record.get("end_time") is None and not record.get("log_file")
+            ]
+            for record_id in stale:
+                self._open.pop(items[record_id].get("log_file") or "", None)
+                self._end(items[record_id], status)
+            if stale:
+                self._save(items)
+            return len(stale)
+
+    def merge(self, records: List[Dict[str, Any]], status: str = "interrupted") -> int:
+        """
+        合并从其他板卡导入的记录，返回新增的条数
+
+        以 (start_time, model, config, log_file) 判重，合并后按启动时间排序（已有记录的 ID 可能变化）；
+        导入的未结束记录标记为 status。
+        """
+        with self._lock:
+            items = self._load()
+            seen = {_record_key(record) for record in items}
+            added = 0
+            for record in records:
+                if not isinstance(record, dict) or not record.get("start_time"):
+                    continue
+                key = _record_key(record)
+                if key in seen:
+                    continue
+                seen.add(key)
+                record = {name: value for name, value in record.items() if name != "id"}
+                if record.get("end_time") is None:
+                    record["end_time"] = datetime.now().strftime(TIMESTAMP_FORMAT)
+                    record["status"] = status
+                items.append(record)
+                added += 1
+            if added:
+                merged = sorted(items, key=lambda record: record.get("start_time") or "")
+                self._rebuild(merged)
+                self._save(merged)
+            return added
+
+    def _end(self, record: Dict[str, Any], status: str) -> None:
+        record["end_time"] = datetime.now().strftime(TIMESTAMP_FORMAT)
+        record["status"] = status
+        self._roll_end(record)
+
+    def get(self, record_id: int) -> Dict[str, Any]:
+        """
+        按 ID 返回一条记录
+
+        Raises:
+            KeyError: 记录不存在时抛出
+        """
+        with self._lock:
+            items = self._load()
+            if not 0 <= record_id < len(items):
+                raise KeyError(f"history record {record_id} not found")
+            return {"id": record_id, **items[record_id]}
 
     def list_history(self, limit: int = 10) -> List[Dict[str, Optional[str]]]:
-        items = self._load()
-        return items[-limit:]
+        with self._lock:
+            items = self._load()
+            return items[-limit:]
+
+    def query(
+        self,
+        limit: int = 10,
+        cursor: Optional[int] = None,
+        model: Optional[str] = None,
+        config: Optional[str] = None,
+        status: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        分页查询历史记录
+
+        从最新记录向前取满 limit 条匹配的记录，页内按时间正序返回；
+        next_cursor 传回 cursor 即可继续向前翻页，没有更早的记录时为None。
+        since/until 按启动时间过滤（TIMESTAMP_FORMAT，含端点）。
+
+        Raises:
+            ValueError: 时间格式不合法时抛出
+        """
+        with self._lock:
+            items = self._load()
+            low = bisect_left(self._starts, _check_time(since)) if since else 0
+            high = bisect_right(self._starts, _check_time(until)) if until else len(items)
+            if cursor is not None:
+                high = min(high, max(cursor, 0))
+            candidates = self._candidate_ids(model, config, low, high)
+            page: List[Dict[str, Any]] = []
+            next_cursor: Optional[int] = None
+            for record_id in candidates:
+                record = items[record_id]
+                if (
+                    (model and record.get("model") != model)
+                    or (config and record.get("config") != config)
+                    or (status and record.get("status") != status)
+                ):
+                    continue
+                if len(page) == limit:
+                    next_cursor = page[-1]["id"]
+                    break
+                page.append({"id": record_id, **record})
+            page.reverse()
+            return {"history": page, "next_cursor": next_cursor}
+
+    def _candidate_ids(self, model: Optional[str], config: Optional[str], low: int, high: int) -> Iterable[int]:
+        """返回 [low, high) 内可能匹配的记录 ID（从新到旧），有模型/配置过滤时只遍历对应索引"""
+        ids: Optional[List[int]] = None
+        if model:
+            ids = self._by_model.get(model, [])
+        if config:
+            config_ids = self._by_config.get(config, [])
+            if ids is None or len(config_ids) < len(ids):
+                ids = config_ids
+        if ids is None:
+            return range(high - 1, low - 1, -1)
+        start = bisect_left(ids, low)
+        end = bisect_left(ids, high)
+        return (ids[index] for index in range(end - 1, start - 1, -1))
+
+    def stats(
+        self,
+        group_by: str = "model",
+        model: Optional[str] = None,
+        config: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        汇总运行次数、运行时长与失败率
+
+        基于按天分桶的增量汇总计算，since/until 按启动日期过滤（按天粒度）。
+
+        Raises:
+            ValueError: group_by 或时间格式不合法时抛出
+        """
+        if group_by not in STATS_GROUPS:
+            raise ValueError(f"group_by must be one of {', '.join(STATS_GROUPS)}")
+        since_day = _check_time(since)[:10] if since else ""
+        until_day = _check_time(until)[:10] if until else "9999"
+        groups: Dict[Tuple[str, ...], Dict[str, float]] = {}
+        with self._lock:
+            self._load()
+            for (day, bucket_model, bucket_config), bucket in self._rollups.items():
+                if not since_day <= day <= until_day:
+                    continue
+                if (model and bucket_model != model) or (config and bucket_config != config):
+                    continue
+                key = {"model": (bucket_model,), "config": (bucket_config,)}.get(
+                    group_by, (bucket_model, bucket_config)
+                )
+                total = groups.setdefault(key, {"runs": 0, "finished": 0, "failed": 0, "uptime": 0.0})
+                for name, value in bucket.items():
+                    total[name] += value
+        rows = []
+        for key, total in sorted(groups.items()):
+            row: Dict[str, Any] = {}
+            if group_by in ("model", "pair"):
+                row["model"] = key[0]
+            if group_by in ("config", "pair"):
+                row["config"] = key[-1]
+            finished = int(total["finished"])
+            row.update(
+                runs=int(total["runs"]),
+                finished=finished,
+                failed=int(total["failed"]),
+                total_uptime=round(total["uptime"], 3),
+                mean_uptime=round(total["uptime"] / finished, 3) if finished else None,
+                failure_rate=round(total["failed"] / finished, 4) if finished else None,
+            )
+            rows.append(row)
+        return {"group_by": group_by, "stats": rows}
+
+
+def _record_key(record: Dict[str, Any]) -> Tuple[Any, ...]:
+    return (record.get("start_time"), record.get("model"), record.get("config"), record.get("log_file"))
+
+
+def _check_time(value: str) -> str:
+    """校验时间参数格式，返回原字符串（TIMESTAMP_FORMAT 可按字典序比较）"""
+    parse_timestamp(value)
+    return value
@@ -2,6 +2,7 @@
 推理管理器
 
 负责管理推理进程的启动、停止和状态监控。
+推理会话保存在共享状态文件中，多个 API worker 可以一致地查询、停止同一个推理进程。
 """
 
 from __future__ import annotations
@@ -9,12 +10,24 @@ from __future__ import annotations
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional
+import os
+import signal
 import subprocess
 import sys
+import time
 
 from app.managers.history_manager import HistoryManager
+from app.managers.inference_state import (
+    InferenceStateStore,
+    proc_cmdline_hash,
+    proc_start_ticks,
+)
 from app.managers.log_manager import LogManager
+from app.managers.model_manager import ModelManager
+from app.managers.model_preloader import ModelPreloader
+from app.managers.resource_limits import ResourceLimiter
+from app.managers.result_channel import ResultChannel
 
 
 @dataclass
@@ -28,6 +41,11 @@ class InferenceStatus:
     log_file: Optional[str]  # 日志文件路径
     last_error: Optional[str]  # 最后一次错误信息
     exit_code: Optional[int]  # 退出代码
+    model_verified: Optional[bool]  # 启动前模型哈希校验结果
+    preload_seconds: Optional[float]  # 启动前预加载耗时（秒）
+    detached: bool = False  # 是否以分离模式运行（API 重启后保留）
+    limits: Optional[Dict[str, Any]] = None  # 生效的资源限制（cgroup 或 rlimit）
+    stopped: bool = False  # 上一次运行是否由 stop() 手动停止
 
 
 class InferenceManager:
@@ -35,6 +53,8 @@ class InferenceManager:
     推理进程管理器
 
     负责启动、停止和管理推理进程，记录历史和日志。
+    会话状态保存在 InferenceStateStore 中并由跨进程锁保护；
+    只有启动进程的 worker 持有 Popen 句柄，其他 worker 通过 pid 与 /proc 管理该进程。
     """
 
     def __init__(
@@ -42,6 +62,13 @@ class InferenceManager:
         infer_binary: Path,
         log_manager: LogManager,
         history_manager: HistoryManager,
+        preloader: Optional[ModelPreloader] = None,
+        stop_timeout: float = 5.0,
+        state_store: Optional[InferenceStateStore] = None,
+        detach: bool = False,
+        limiter: Optional[ResourceLimiter] = None,
+        result_channel: Optional[ResultChannel] = None,
+        model_manager: Optional[ModelManager] = None,
     ) -> None:
         """
         初始化推理管理器
@@ -50,85 +77,165 @@ class InferenceManager:
             infer_binary: 推理可执行文件路径
             log_manager: 日志管理器实例
             history_manager: 历史记录管理器实例
+            preloader: 可选的模型预加载器，提供时启动前校验并预热模型
+            stop_timeout: 停止时等待进程响应 SIGTERM 的秒数，超时后强制结束
+            state_store: 共享状态存储，默认保存在日志目录下的 .inference 目录
+            detach: 为True时推理进程在独立会话中运行，API 关闭或重启时不结束推理
+            limiter: 可选的资源限制器，按模型为推理进程设置 cgroup 或 rlimit 限制
+            result_channel: 可选的结果通道，提供时通过环境变量把套接字路径传给推理进程
+            model_manager: 可选的模型管理器，启动成功后记录模型的使用时间（供配额淘汰使用）
         """
         self.infer_binary = infer_binary
         self.log_manager = log_manager
         self.history_manager = history_manager
-        self.process: Optional[subprocess.Popen[str]] = None  # 当前推理进程
+        self.process: Optional[subprocess.Popen[str]] = None  # 本 worker 启动的推理进程
         self.start_time: Optional[datetime] = None  # 进程启动时间
         self.current_model: Optional[str] = None  # 当前模型路径
         self.current_config: Optional[str] = None  # 当前配置路径
         self.log_file: Optional[Path] = None  # 当前日志文件
         self.last_error: Optional[str] = None  # 最后错误信息
         self.last_exit_code: Optional[int] = None  # 最后退出代码
+        self.preloader = preloader
+        self.stop_timeout = stop_timeout
+        self.model_verified: Optional[bool] = None  # 启动前模型校验结果
+        self.preload_seconds: Optional[float] = None  # 启动前预加载耗时
+        self.state_store = state_store or InferenceStateStore(log_manager.log_dir / ".inference")
+        self.detach = detach
+        self.limiter = limiter
+        self.result_channel = result_channel
+        self.model_manager = model_manager
 
-    def start(self, model_path: Path, config_path: Path) -> int:
+    def start(
+        self,
+        model_path: Path,
+        config_path: Path,
+        extra_args: Optional[List[str]] = None,
+    ) -> int:
         """
         启动推理进程
 
         Args:
             model_path: 模型文件路径
             config_path: 配置文件路径
+            extra_args: 追加到命令行末尾的运行参数（来自部署包 manifest）
 
         Returns:
             启动的进程ID
 
         Raises:
             RuntimeError: 当推理已在运行时抛出
+            ValueError: 当模型哈希校验失败时抛出
         """
-        if self.is_running():
+        if self._observe()["session"]:
             raise RuntimeError("inference already running")
-        self.log_manager.prune_old_logs()
-        self.start_time = datetime.now()
-        self.log_file = self.log_manager.create_log_file(self.start_time)
-        self.current_model = model_path.name
-        self.current_config = config_path.name
-        command = self._build_command(model_path, config_path)
-        self.log_file.parent.mkdir(parents=True, exist_ok=True)
-        log_handle = self.log_file.open("a", encoding="utf-8")
-        try:
-            self.process = subprocess.Popen(
-                command,
-                stdout=log_handle,
-                stderr=subprocess.STDOUT,
-                text=True,
+        # 哈希校验与预热可能耗时数秒，在排他锁之外完成，期间其他 worker 的状态查询与停止不被阻塞
+        preload = self.preloader.wait(model_path) if self.preloader is not None else None
+        with self.state_store.lock():
+            state = self._reconcile()
+            if state["session"]:
+                raise RuntimeError("inference already running")
+            if preload is not None:
+                self.model_verified = preload.verified
+                self.preload_seconds = preload.seconds
+                if preload.state == "failed":
+                    self.last_error = preload.error
+                    state["last"]["last_error"] = preload.error
+                    self.state_store.write(state)
+                    raise ValueError(preload.error or "model preload failed")
+            self.log_manager.prune_old_logs()
+            self.start_time = datetime.now()
+            self.log_file = self.log_manager.create_log_file(self.start_time)
+            self.current_model = model_path.name
+            self.current_config = config_path.name
+            command = self._build_command(model_path, config_path) + list(extra_args or [])
+            self.log_file.parent.mkdir(parents=True, exist_ok=True)
+            plan = self.limiter.prepare(model_path.name) if self.limiter else None
+            env = {**os.environ, **self.result_channel.child_env()} if self.result_channel else None
+            log_handle = self.log_file.open("a", encoding="utf-8")
+            try:
+                self.process = subprocess.Popen(
+                    command,
+                    stdout=log_handle,
+                    stderr=subprocess.STDOUT,
+                    text=True,
+                    start_new_session=self.detach,
+                    preexec_fn=plan.preexec_fn if plan else None,
+                    env=env,
+                )
+            except Exception as exc:
+                self.last_error = str(exc)
+                self.process = None
+                if plan and self.limiter:
+                    self.limiter.release(str(plan.cgroup) if plan.cgroup else None)
+                raise
+            finally:
+                # 子进程已持有日志文件描述符，父进程无需保留
+                log_handle.close()
+                if plan:
+                    plan.started()
+            self.last_error = None
+            self.last_exit_code = None
+            state["session"] = self._session_record(self.process.pid)
+            state["session"].update(
+                model_path=str(model_path),
+                config_path=str(config_path),
+                args=list(extra_args or []),
+                limits=plan.describe() if plan and plan.mode else None,
+                cgroup=str(plan.cgroup) if plan and plan.cgroup else None,
             )
-        except Exception as exc:
-            log_handle.close()
-            self.last_error = str(exc)
-            self.process = None
-            raise
-        self.last_error = None
-        self.last_exit_code = None
-        self.history_manager.record_start(
-            self.current_model,
-            self.current_config,
-            str(self.log_file),
-        )
-        return int(self.process.pid)
+            self.state_store.write(state)
+            self.history_manager.record_start(
+                self.current_model,
+                self.current_config,
+                str(self.log_file),
+            )
+            if self.model_manager is not None:
+                self.model_manager.touch(model_path)
+            return int(self.process.pid)
 
     def stop(self) -> None:
         """
-        停止当前运行的推理进程
+        停止当前运行的推理进程（可以是其他 worker 启动的进程）
 
         Raises:
             RuntimeError: 当没有运行中的推理进程时抛出
         """
-        if not self.process:
-            raise RuntimeError("inference not running")
-        if self.process.poll() is None:
-            self.process.terminate()
-            try:
-                self.process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                self.process.kill()
-        self.last_exit_code = self.process.returncode
-        self.history_manager.record_end(
-            str(self.log_file) if self.log_file else "",
-            "manual_stopped",
-        )
-        self.process = None
-        self.start_time = None
+        with self.state_store.lock():
+            state = self._reconcile()
+            session = state["session"]
+            if not session:
+                raise RuntimeError("inference not running")
+            self.last_exit_code = self._terminate(session, self.stop_timeout)
+            self.history_manager.record_end(session.get("log_file") or "", "manual_stopped")
+            self._finish(state, self.last_exit_code, None, stopped=True)
+
+    def reload(self, config_name: Optional[str] = None, settle: float = 0.3) -> bool:
+        """
+        通知推理进程热加载配置（发送 SIGHUP）
+
+        Args:
+            config_name: 可选的配置文件名，仅当与运行中的配置一致时才发送信号
+            settle: 发送信号后确认进程仍存活的等待秒数
+
+        Returns:
+            信号已发送且推理进程在 settle 秒后仍在运行时返回True
+            （未处理 SIGHUP 的程序会被该信号结束，此时记录为失败并返回False）
+        """
+        with self.state_store.lock():
+            session = self._reconcile()["session"]
+            if not session:
+                return False
+            if config_name and config_name != session.get("config"):
+                return False
+            os.kill(int(session["pid"]), signal.SIGHUP)
+            deadline = time.monotonic() + settle
+            while time.monotonic() < deadline:
+                if self.process is not None:
+                    self.process.poll()
+                if not self.state_store.session_alive(session):
+                    break
+                time.sleep(0.02)
+            return self._reconcile()["session"] is not None
 
     def is_running(self) -> bool:
         """
@@ -137,7 +244,7 @@ class InferenceManager:
         Returns:
             如果进程正在运行则返回True，否则返回False
         """
-        return self.process is not None and self.process.poll() is None
+        return self._observe()["session"] is not None
 
     def status(self) -> InferenceStatus:
         """
@@ -146,42 +253,198 @@ class InferenceManager:
         Returns:
             包含当前推理状态信息的InferenceStatus对象
         """
-        if self.process and self.process.poll() is not None:
-            self.last_exit_code = self.process.returncode
-            self.last_error = "inference process exited"
-            self.history_manager.record_end(
-                str(self.log_file) if self.log_file else "",
-                "failed",
-            )
-            self.process = None
-            self.start_time = None
+        state = self._observe()
+        session = state["session"]
+        info = session or state["last"]
         uptime = None
-        if self.start_time and self.is_running():
-            uptime = (datetime.now() - self.start_time).total_seconds()
+        if session and session.get("started_at"):
+            uptime = time.time() - float(session["started_at"])
         return InferenceStatus(
-            running=self.is_running(),
-            pid=self.process.pid if self.process else None,
-            current_model=self.current_model,
-            current_config=self.current_config,
+            running=session is not None,
+            pid=int(session["pid"]) if session else None,
+            current_model=info.get("model"),
+            current_config=info.get("config"),
             uptime=uptime,
-            log_file=str(self.log_file) if self.log_file else None,
-            last_error=self.last_error,
-            exit_code=self.last_exit_code,
+            log_file=info.get("log_file"),
+            last_error=state["last"].get("last_error"),
+            exit_code=state["last"].get("exit_code"),
+            model_verified=info.get("model_verified"),
+            preload_seconds=info.get("preload_seconds"),
+            detached=bool(session.get("detached")) if session else False,
+            limits=session.get("limits") if session else None,
+            stopped=not session and bool(state["last"].get("stopped")),
         )
 
     def shutdown(self) -> None:
         """
-        强制关闭推理进程（用于应用关闭时的清理）
+        应用关闭时的清理：结束本 worker 启动的推理进程；
+        分离模式下保留推理进程，由重启后的 API 通过 adopt 重新接管
         """
-        if self.process and self.process.poll() is None:
-            self.process.terminate()
-            try:
-                self.process.wait(timeout=3)
-            except subprocess.TimeoutExpired:
-                self.process.kill()
+        if self.process is None:
+            return
+        if self.detach:
+            self.process = None
+            self.start_time = None
+            return
+        with self.state_store.lock():
+            state = self._reconcile()
+            session = state["session"]
+            if session and self.process is not None and session.get("pid") == self.process.pid:
+                exit_code = self._terminate(session, 3.0)
+                self.history_manager.record_end(session.get("log_file") or "", "manual_stopped")
+                self._finish(state, exit_code, None)
         self.process = None
         self.start_time = None
 
+    def adopt(self) -> Dict[str, Any]:
+        """
+        API 启动时的状态对账
+
+        校验持久化会话对应的进程是否仍是同一个推理进程（/proc 启动时刻与命令行哈希），
+        仍在运行则重新接管，否则记录为失败；随后把遗留的 running 历史记录标记为 interrupted。
+
+        Returns:
+            {"adopted": 是否接管了运行中的推理, "pid": 进程ID, "closed": 被关闭的历史记录条数}
+        """
+        with self.state_store.lock():
+            session = self._reconcile()["session"]
+            closed = self.history_manager.close_stale(
+                "interrupted", session.get("log_file") if session else None
+            )
+        return {
+            "adopted": session is not None,
+            "pid": int(session["pid"]) if session else None,
+            "closed": closed,
+        }
+
+    def _session_record(self, pid: int) -> Dict[str, Any]:
+        return {
+            "pid": pid,
+            "proc_start": proc_start_ticks(pid),
+            "cmdline_hash": self._wait_cmdline_hash(pid),
+            "detached": self.detach,
+            "owner_pid": os.getpid(),
+            "started_at": time.time(),
+            "model": self.current_model,
+            "config": self.current_config,
+            "log_file": str(self.log_file) if self.log_file else None,
+            "model_verified": self.model_verified,
+            "preload_seconds": self.preload_seconds,
+        }
+
+    @staticmethod
+    def _wait_cmdline_hash(pid: int, timeout: float = 0.5) -> Optional[str]:
+        """exec 刚完成时 /proc/<pid>/cmdline 可能短暂为空，稍作等待后再取哈希"""
+        deadline = time.monotonic() + timeout
+        while True:
+            digest = proc_cmdline_hash(pid)
+            if digest is not None or time.monotonic() >= deadline:
+                return digest
+            time.sleep(0.005)
+
+    def _observe(self) -> Dict[str, Any]:
+        """
+        不加锁读取共享状态（状态文件以原子替换写入）
+
+        会话进程仍存活时直接返回，只有需要把已退出的会话记为结束时才获取排他锁对账，
+        因此状态查询不会被持锁中的启动、停止操作阻塞。
+        """
+        if self.process is not None:
+            self.process.poll()
+        state = self.state_store.read()
+        if state["session"] and not self.state_store.session_alive(state["session"]):
+            with self.state_store.lock():
+                return self._reconcile()
+        self._sync_from(state)
+        return state
+
+    def _reconcile(self) -> Dict[str, Any]:
+        """
+        读取共享状态并处理已退出的会话（需在持有锁时调用）
+
+        Returns:
+            最新的状态字典
+        """
+        if self.process is not None and self.process.poll() is not None:
+            self.last_exit_code = self.process.returncode
+        state = self.state_store.read()
+        session = state["session"]
+        if session and not self.state_store.session_alive(session):
+            exit_code = None
+            if self.process is not None and self.process.pid == session.get("pid"):
+                exit_code = self.process.returncode
+            self.history_manager.record_end(session.get("log_file") or "", "failed")
+            self._finish(state, exit_code, "inference process exited")
+        self._sync_from(state)
+        return state
+
+    def _finish(
+        self, state: Dict[str, Any], exit_code: Optional[int], error: Optional[str], stopped: bool = False
+    ) -> None:
+        session = state["session"] or {}
+        if self.limiter:
+            self.limiter.release(session.get("cgroup"))
+        state["last"] = {
+            "model": session.get("model"),
+            "config": session.get("config"),
+            "log_file": session.get("log_file"),
+            "model_verified": session.get("model_verified"),
+            "preload_seconds": session.get("preload_seconds"),
+            "exit_code": exit_code,
+            "last_error": error,
+            "stopped": stopped,
+        }
+        state["session"] = None
+        self.state_store.write(state)
+        if self.process is not None and self.process.pid == session.get("pid"):
+            self.process = None
+        self.start_time = None
+
+    def _sync_from(self, state: Dict[str, Any]) -> None:
+        """把共享状态同步到实例属性，保持旧接口（log_file 等属性）可用"""
+        info = state["session"] or state["last"]
+        self.current_model = info.get("model")
+        self.current_config = info.get("config")
+        self.log_file = Path(info["log_file"]) if info.get("log_file") else None
+        self.last_error = state["last"].get("last_error")
+        self.last_exit_code = state["last"].get("exit_code")
+        self.model_verified = info.get("model_verified")
+        self.preload_seconds = info.get("preload_seconds")
+
+    def _terminate(self, session: Dict[str, Any], timeout: float) -> Optional[int]:
+        """
+        结束会话进程：先 SIGTERM，超时后 SIGKILL
+        （随后补发 SIGCONT，被调速器暂停的进程也能及时处理 SIGTERM）
+
+        Returns:
+            本 worker 持有句柄时返回退出码，否则返回None
+        """
+        pid = int(session["pid"])
+        if self.process is not None and self.process.pid == pid:
+            if self.process.poll() is None:
+                self.process.terminate()
+                self.process.send_signal(signal.SIGCONT)
+                try:
+                    self.process.wait(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    self.process.kill()
+                    self.process.wait()
+            return self.process.returncode
+        if not self.state_store.session_alive(session):
+            return None
+        os.kill(pid, signal.SIGTERM)
+        os.kill(pid, signal.SIGCONT)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not self.state_store.session_alive(session):
+                return None
+            time.sleep(0.05)
+        if self.state_store.session_alive(session):
+            os.kill(pid, signal.SIGKILL)
+            while self.state_store.session_alive(session):
+                time.sleep(0.01)
+        return None
+
     def _build_command(self, model_path: Path, config_path: Path) -> list[str]:
         """
         构建推理命令行参数
@@ -0,0 +1,129 @@
+"""
+推理共享状态
+
+把推理会话记录保存在状态文件中，并通过锁文件（flock）串行化跨进程的启动/停止操作，
+使多个 uvicorn worker 看到同一份推理状态，也能接管由其他进程启动的推理进程。
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, Optional
+import fcntl
+import hashlib
+import json
+import os
+import threading
+
+from app.utils import ensure_dir
+
+
+def proc_start_ticks(pid: int) -> Optional[int]:
+    """返回进程自开机以来的启动时刻（时钟滴答），进程不存在或已成僵尸时返回None"""
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except OSError:
+        return None
+    fields = stat.rsplit(")", 1)[1].split()
+    if fields[0] in ("Z", "X"):
+        return None
+    return int(fields[19])
+
+
+def proc_cmdline_hash(pid: int) -> Optional[str]:
+    """
+    返回进程命令行（/proc/<pid>/cmdline）的 sha256
+
+    进程不存在，或刚 exec 完成、内核尚未填充命令行（内容为空）时返回None
+    """
+    try:
+        cmdline = Path(f"/proc/{pid}/cmdline").read_bytes()
+    except OSError:
+        return None
+    if not cmdline:
+        return None
+    return hashlib.sha256(cmdline).hexdigest()
+
+
+class InferenceStateStore:
+    """
+    推理状态存储
+
+    状态文件结构：
+        {"session": {...} | null, "last": {...}}
+    session 为运行中的推理会话（pid、/proc 启动时刻、命令行哈希、模型、配置、日志文件等），
+    last 为最近一次会话结束后的信息，供 status 在各 worker 间保持一致。
+    """
+
+    def __init__(self, state_dir: Path) -> None:
+        self.state_dir = state_dir
+        self.state_file = state_dir / "inference.json"
+        self.lock_file = state_dir / "inference.lock"
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._lock_handle: Optional[Any] = None
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """跨进程排他锁（同一进程内可重入）"""
+        with self._thread_lock:
+            if self._depth == 0:
+                ensure_dir(self.state_dir)
+                self._lock_handle = self.lock_file.open("a+")
+                fcntl.flock(self._lock_handle.fileno(), fcntl.LOCK_EX)
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0 and self._lock_handle is not None:
+                    fcntl.flock(self._lock_handle.fileno(), fcntl.LOCK_UN)
+                    self._lock_handle.close()
+                    self._lock_handle = None
+
+    def try_leader(self, role: str) -> Optional[IO[str]]:
+        """
+        尝试成为某个后台角色（如调速器）在所有 worker 中的唯一执行者
+
+        以非阻塞方式对 <role>.lock 加排他 flock，成功时返回需一直持有的文件句柄
+        （关闭句柄或进程退出即释放），已被其他 worker 持有时返回None。
+        """
+        ensure_dir(self.state_dir)
+        handle = (self.state_dir / f"{role}.lock").open("a+")
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return None
+        return handle
+
+    def read(self) -> Dict[str, Any]:
+        try:
+            data = json.loads(self.state_file.read_text())
+        except (OSError, json.JSONDecodeError):
+            data = {}
+        return {"session": data.get("session"), "last": data.get("last") or {}}
+
+    def write(self, state: Dict[str, Any]) -> None:
+        ensure_dir(self.state_dir)
+        partial = self.state_file.with_name(f".{self.state_file.name}.{os.getpid()}.partial")
+        partial.write_text(json.dumps(state, indent=2))
+        os.replace(partial, self.state_file)
+
+    @staticmethod
+    def session_alive(session: Optional[Dict[str, Any]]) -> bool:
+        """会话进程仍存活且 /proc 启动时刻与命令行哈希一致（防止 pid 复用误判）"""
+        if not session or not session.get("pid"):
+            return False
+        pid = int(session["pid"])
+        ticks = proc_start_ticks(pid)
+        if ticks is None:
+            return False
+        if session.get("proc_start") is not None and ticks != session["proc_start"]:
+            return False
+        expected = session.get("cmdline_hash")
+        if expected is None:
+            return True
+        current = proc_cmdline_hash(pid)
+        return current is None or current == expected
@@ -0,0 +1,468 @@
+"""
+推理任务队列
+
+把推理任务（模型、配置、运行时长、优先级）持久化到共享状态目录的 jobs.json，
+由后台工作线程按优先级依次启动；也支持 cron 表达式定时入队。
+板上同一时间只运行一个推理进程，队列在上一个任务结束后立即启动下一个。
+所有读写都在推理状态锁内完成，多个 worker 同时运行工作线程也不会重复启动任务。
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set
+import json
+import os
+import threading
+import time
+import uuid
+
+from app.managers.inference_manager import InferenceManager
+from app.utils import TIMESTAMP_FORMAT, ensure_dir
+
+JOB_STATES = ("queued", "running", "done", "failed", "cancelled")
+FINISHED_STATES = {"done", "failed", "cancelled"}
+
+_CRON_FIELDS = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    ("weekday", 0, 6),
+)
+
+
+class CronSchedule:
+    """
+    五段式 cron 表达式（分 时 日 月 周），支持 *、*/n、a-b、a-b/n 与逗号列表；
+    周字段 0 与 7 均表示周日。
+    """
+
+    def __init__(self, expression: str) -> None:
+        parts = expression.split()
+        if len(parts) != len(_CRON_FIELDS):
+            raise ValueError("cron expression must have 5 fields")
+        self.expression = expression
+        self.fields: List[Set[int]] = [
+            self._parse_field(part, name, low, high)
+            for part, (name, low, high) in zip(parts, _CRON_FIELDS)
+        ]
+        # 与 cron 相同：以 * 开头的字段（含 */n）视为不限制，日、周的匹配不切换为“或”
+        self._day_any = parts[2].startswith("*")
+        self._weekday_any = parts[4].startswith("*")
+
+    @staticmethod
+    def _parse_field(part: str, name: str, low: int, high: int) -> Set[int]:
+        values: Set[int] = set()
+        for item in part.split(","):
+            spec, _, step_text = item.partition("/")
+            try:
+                step = int(step_text) if step_text else 1
+                if spec == "*":
+                    start, end = low, high
+                elif "-" in spec:
+                    start_text, end_text = spec.split("-", 1)
+                    start, end = int(start_text), int(end_text)
+                else:
+                    start = end = int(spec)
+                    if step_text:
+                        end = high
+            except ValueError as exc:
+                raise ValueError(f"invalid cron {name} field: {item!r}") from exc
+            # 周字段允许 7（周日），按步长展开后再映射为 0
+            top = 7 if name == "weekday" else high
+            if step < 1 or start < low or end > top or start > end:
+                raise ValueError(f"invalid cron {name} field: {item!r}")
+            values.update(value % 7 if name == "weekday" else value for value in range(start, end + 1, step))
+        return values
+
+    def matches(self, moment: datetime) -> bool:
+        minute, hour, _, month, _ = self.fields
+        return (
+            moment.minute in minute
+            and moment.hour in hour
+            and moment.month in month
+            and self._day_matches(moment)
+        )
+
+    def next_after(self, moment: datetime) -> datetime:
+        """
+        返回 moment 之后第一个匹配的整分钟时刻
+
+        Raises:
+            ValueError: 四年内没有匹配时刻时抛出（例如 2 月 30 日）
+        """
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 4)
+        while candidate < limit:
+            if candidate.month not in self.fields[3]:
+                year = candidate.year + (candidate.month == 12)
+                candidate = candidate.replace(year=year, month=candidate.month % 12 + 1, day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.fields[1]:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.fields[0]:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"cron expression never matches: {self.expression!r}")
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.fields[2]
+        weekday_ok = (moment.weekday() + 1) % 7 in self.fields[4]
+        # 与 cron 相同：日、周都受限时任一匹配即可
+        if self._day_any or self._weekday_any:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+
+class JobQueue:
+    """
+    持久化推理任务队列
+
+    任务结构：
+        {"id", "model", "config", "bundle", "duration", "priority", "status",
+         "created_at", "started_at", "ended_at", "pid", "log_file", "error", "schedule_id"}
+    duration 为None时运行到推理进程自行退出；priority 越大越先运行，相同优先级按入队顺序。
+    """
+
+    def __init__(
+        self,
+        inference_manager: InferenceManager,
+        resolve: Callable[[Optional[str], Optional[str], Optional[str]], Dict[str, Any]],
+        poll_interval: float = 1.0,
+        keep_finished: int = 200,
+    ) -> None:
+        """
+        初始化任务队列
+
+        Args:
+            inference_manager: 推理管理器实例
+            resolve: 把 (model, config, bundle) 解析为 {model_path, config_path, args} 的函数，
+                在任务真正启动时调用，None 表示使用当时的默认模型/配置
+            poll_interval: 工作线程轮询间隔（秒）
+            keep_finished: 保留的已结束任务条数
+        """
+        self.inference_manager = inference_manager
+        self.resolve = resolve
+        self.poll_interval = poll_interval
+        self.keep_finished = keep_finished
+        self.state_store = inference_manager.state_store
+        self.jobs_file = self.state_store.state_dir / "jobs.json"
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_error: Optional[str] = None  # 最近一次调度失败的信息
+
+    def enqueue(
+        self,
+        model: Optional[str] = None,
+        config: Optional[str] = None,
+        bundle: Optional[str] = None,
+        duration: Optional[float] = None,
+        priority: int = 0,
+    ) -> Dict[str, Any]:
+        """
+        追加一个任务到队列
+
+        Raises:
+            ValueError: duration 非正数时抛出
+        """
+        if duration is not None and duration <= 0:
+            raise ValueError("duration must be positive")
+        with self.state_store.lock():
+            state = self._load()
+            job = self._new_job(model, config, bundle, duration, priority, None)
+            state["jobs"].append(job)
+            self._save(state)
+        self._wake.set()
+        return job
+
+    def add_schedule(
+        self,
+        cron: str,
+        model: Optional[str] = None,
+        config: Optional[str] = None,
+        bundle: Optional[str] = None,
+        duration: Optional[float] = None,
+        priority: int = 0,
+    ) -> Dict[str, Any]:
+        """
+        添加定时计划，到点时按计划参数入队一个任务
+
+        Raises:
+            ValueError: cron 表达式或 duration 不合法时抛出
+        """
+        if duration is not None and duration <= 0:
+            raise ValueError("duration must be positive")
+        next_run = CronSchedule(cron).next_after(datetime.now())
+        schedule = {
+            "id": uuid.uuid4().hex[:12],
+            "cron": cron,
+            "model": model,
+            "config": config,
+            "bundle": bundle,
+            "duration": duration,
+            "priority": priority,
+            "next_run": next_run.strftime(TIMESTAMP_FORMAT),
+        }
+        with self.state_store.lock():
+            state = self._load()
+            state["schedules"].append(schedule)
+            self._save(state)
+        self._wake.set()
+        return schedule
+
+    def list_jobs(self, status: Optional[str] = None) -> Dict[str, Any]:
+        """列出任务（排队中的按运行顺序在前）与定时计划"""
+        with self.state_store.lock():
+            state = self._load()
+        jobs = state["jobs"]
+        if status:
+            jobs = [job for job in jobs if job["status"] == status]
+        queued = self._ordered([job for job in jobs if job["status"] == "queued"])
+        others = [job for job in reversed(jobs) if job["status"] != "queued"]
+        return {
+            "jobs": queued + others,
+            "schedules": state["schedules"],
+            "worker_running": self._thread is not None and self._thread.is_alive(),
+            "worker_error": self.last_error,
+        }
+
+    def referenced_models(self) -> List[str]:
+        """返回排队中、运行中任务与定时计划指定的模型（部署包与默认模型由调用方另行处理）"""
+        state = self._load()
+        jobs = [job for job in state["jobs"] if job["status"] not in FINISHED_STATES]
+        return sorted({item["model"] for item in jobs + state["schedules"] if item.get("model")})
+
+    def cancel(self, item_id: str) -> Dict[str, Any]:
+        """
+        取消排队或运行中的任务，或删除定时计划
+
+        Raises:
+            KeyError: 任务或计划不存在时抛出
+            ValueError: 任务已结束时抛出
+        """
+        with self.state_store.lock():
+            state = self._load()
+            for schedule in state["schedules"]:
+                if schedule["id"] == item_id:
+                    state["schedules"].remove(schedule)
+                    self._save(state)
+                    return schedule
+            job = self._find(state, item_id)
+            if job["status"] in FINISHED_STATES:
+                raise ValueError(f"job already {job['status']}")
+            if job["status"] == "running" and self._job_alive(job):
+                self.inference_manager.stop()
+            self._end(job, "cancelled")
+            self._save(state)
+        self._wake.set()
+        return job
+
+    def set_priority(self, job_id: str, priority: int) -> Dict[str, Any]:
+        """
+        调整排队任务的优先级
+
+        Raises:
+            KeyError: 任务不存在时抛出
+            ValueError: 任务不在排队状态时抛出
+        """
+        with self.state_store.lock():
+            state = self._load()
+            job = self._find(state, job_id)
+            if job["status"] != "queued":
+                raise ValueError("only queued jobs can be reprioritized")
+            job["priority"] = priority
+            self._save(state)
+        return job
+
+    def start_worker(self) -> None:
+        """启动后台工作线程（重复调用无副作用）"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="job-queue", daemon=True)
+        self._thread.start()
+
+    def stop_worker(self) -> None:
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def tick(self, now: Optional[datetime] = None) -> None:
+        """
+        执行一次调度：触发到期的定时计划、结束超时或已退出的任务、启动下一个任务
+
+        只有计划触发或任务状态变化时才写回 jobs.json，空闲轮询不产生写入。
+        """
+        now = now or datetime.now()
+        self._prewarm()
+        with self.state_store.lock():
+            state = self._load()
+            changed = self._fire_schedules(state, now)
+            for job in state["jobs"]:
+                if job["status"] == "running":
+                    changed = self._check_running(job) or changed
+            if not any(job["status"] == "running" for job in state["jobs"]):
+                changed = self._start_next(state) or changed
+            if changed:
+                self._save(state)
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                self.tick()
+                self.last_error = None
+            except Exception as exc:  # 工作线程不能因单次调度失败退出
+                self.last_error = str(exc)
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _fire_schedules(self, state: Dict[str, Any], now: datetime) -> bool:
+        """触发到期的定时计划，返回是否有计划触发"""
+        fired = False
+        for schedule in state["schedules"]:
+            next_run = datetime.strptime(schedule["next_run"], TIMESTAMP_FORMAT)
+            if next_run > now:
+                continue
+            fired = True
+            state["jobs"].append(
+                self._new_job(
+                    schedule["model"],
+                    schedule["config"],
+                    schedule["bundle"],
+                    schedule["duration"],
+                    schedule["priority"],
+                    schedule["id"],
+                )
+            )
+            # 错过的多次触发只补跑一次
+            schedule["next_run"] = CronSchedule(schedule["cron"]).next_after(now).strftime(TIMESTAMP_FORMAT)
+        return fired
+
+    def _prewarm(self) -> None:
+        """在获取排他锁之前预加载下一个排队任务的模型，避免在锁内做哈希校验"""
+        preloader = self.inference_manager.preloader
+        if preloader is None or self.inference_manager.is_running():
+            return
+        queued = self._ordered([job for job in self._load()["jobs"] if job["status"] == "queued"])
+        if not queued:
+            return
+        try:
+            resolved = self.resolve(queued[0]["model"], queued[0]["config"], queued[0]["bundle"])
+        except (OSError, ValueError):
+            return  # 由 _start_next 在锁内记录失败
+        preloader.wait(resolved["model_path"])
+
+    def _check_running(self, job: Dict[str, Any]) -> bool:
+        """结束已退出或到时的任务，返回任务是否结束"""
+        if not self._job_alive(job):
+            status = self.inference_manager.status()
+            if status.stopped:
+                # 手动停止：无论由哪个 worker 停止（能否取得退出码）都记为取消
+                self._end(job, "cancelled", "inference stopped manually")
+            elif status.exit_code in (None, 0):
+                self._end(job, "done")
+            else:
+                self._end(job, "failed", f"inference exited with code {status.exit_code}")
+            return True
+        if job["duration"] is not None and time.time() - job["started_ts"] >= job["duration"]:
+            self.inference_manager.stop()
+            self._end(job, "done")
+            return True
+        return False
+
+    def _start_next(self, state: Dict[str, Any]) -> bool:
+        """启动下一个排队任务，返回是否有任务状态变化（启动或启动失败）"""
+        if self.inference_manager.is_running():
+            return False
+        changed = False
+        for job in self._ordered([job for job in state["jobs"] if job["status"] == "queued"]):
+            try:
+                resolved = self.resolve(job["model"], job["config"], job["bundle"])
+                pid = self.inference_manager.start(
+                    resolved["model_path"], resolved["config_path"], resolved.get("args")
+                )
+            except RuntimeError:
+                return changed
+            except (OSError, ValueError) as exc:
+                self._end(job, "failed", str(exc))
+                changed = True
+                continue
+            job["status"] = "running"
+            job["pid"] = pid
+            job["started_ts"] = time.time()
+            job["started_at"] = datetime.now().strftime(TIMESTAMP_FORMAT)
+            log_file = self.inference_manager.log_file
+            job["log_file"] = str(log_file) if log_file else None
+            return True
+        return changed
+
+    def _job_alive(self, job: Dict[str, Any]) -> bool:
+        status = self.inference_manager.status()
+        return status.running and status.pid == job.get("pid")
+
+    def _new_job(
+        self,
+        model: Optional[str],
+        config: Optional[str],
+        bundle: Optional[str],
+        duration: Optional[float],
+        priority: int,
+        schedule_id: Optional[str],
+    ) -> Dict[str, Any]:
+        return {
+            "id": uuid.uuid4().hex[:12],
+            "model": model,
+            "config": config,
+            "bundle": bundle,
+            "duration": duration,
+            "priority": priority,
+            "status": "queued",
+            "created_at": datetime.now().strftime(TIMESTAMP_FORMAT),
+            "created_ts": time.time(),
+            "started_at": None,
+            "ended_at": None,
+            "pid": None,
+            "log_file": None,
+            "error": None,
+            "schedule_id": schedule_id,
+        }
+
+    @staticmethod
+    def _end(job: Dict[str, Any], status: str, error: Optional[str] = None) -> None:
+        job["status"] = status
+        job["ended_at"] = datetime.now().strftime(TIMESTAMP_FORMAT)
+        job["error"] = error
+
+    @staticmethod
+    def _ordered(jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return sorted(jobs, key=lambda job: (-job["priority"], job["created_ts"]))
+
+    @staticmethod
+    def _find(state: Dict[str, Any], job_id: str) -> Dict[str, Any]:
+        for job in state["jobs"]:
+            if job["id"] == job_id:
+                return job
+        raise KeyError(job_id)
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            data = json.loads(self.jobs_file.read_text())
+        except (OSError, json.JSONDecodeError):
+            data = {}
+        return {"jobs": data.get("jobs") or [], "schedules": data.get("schedules") or []}
+
+    def _save(self, state: Dict[str, Any]) -> None:
+        finished = [job for job in state["jobs"] if job["status"] in FINISHED_STATES]
+        if len(finished) > self.keep_finished:
+            drop = {id(job) for job in finished[: len(finished) - self.keep_finished]}
+            state["jobs"] = [job for job in state["jobs"] if id(job) not in drop]
+        ensure_dir(self.jobs_file.parent)
+        partial = self.jobs_file.with_name(f".{self.jobs_file.name}.{os.getpid()}.partial")
+        partial.write_text(json.dumps(state, indent=2))
+        os.replace(partial, self.jobs_file)
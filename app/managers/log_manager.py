@@ -2,9 +2,19 @@ from __future__ import annotations
 
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Iterable, List, Optional
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
+import io
+import os
+import tarfile
+import time
+import zipfile
+import zlib
 
-from app.utils import TIMESTAMP_FORMAT, ensure_dir, parse_timestamp
+from app.utils import TIMESTAMP_FORMAT, ensure_dir, parse_timestamp, safe_resolve
+
+ARCHIVE_FORMATS = ("zip", "tar.gz")
+ARCHIVE_LEVEL = 6  # 压缩级别，兼顾板卡 CPU 与体积
+CHUNK_SIZE = 256 * 1024
 
 
 class LogManager:
@@ -50,6 +60,146 @@ class LogManager:
             lines = lines[-tail:]
         return "\n".join(lines)
 
+    def follow(self, cursor: Optional[str] = None, tail: Optional[int] = None) -> Tuple[str, str]:
+        """
+        增量读取日志
+
+        cursor 为上次返回的游标（"<文件名>:<字节偏移>"），只返回其后新增的完整行；
+        为空或已失效时从头读取，同时指定 tail 时从最新文件末尾向前按块读取，只读最后 tail 行所需的字节。
+        最新文件末尾未写完的行留到下次返回。
+
+        Returns:
+            (日志文本, 下次使用的游标)
+        """
+        ensure_dir(self.log_dir)
+        files = sorted(self.log_dir.glob("inference_*.log"))
+        start_name, offset = _parse_cursor(cursor)
+        if start_name:
+            files = [path for path in files if path.name >= start_name]
+        chunks: List[bytes] = []
+        next_cursor = cursor or ""
+        if not start_name and tail is not None and tail >= 0:
+            chunks, next_cursor = _read_tail(files, tail)
+            files = []
+        for index, path in enumerate(files):
+            # 只读取游标之后的新增字节，不重读整个文件
+            try:
+                with path.open("rb") as handle:
+                    size = os.fstat(handle.fileno()).st_size
+                    begin = offset if path.name == start_name and offset <= size else 0
+                    handle.seek(begin)
+                    data = handle.read(size - begin)
+            except FileNotFoundError:
+                continue
+            end = len(data)
+            if index == len(files) - 1:
+                end = data.rfind(b"\n") + 1
+            chunks.append(data[:end])
+            next_cursor = f"{path.name}:{begin + end}"
+        lines = b"".join(chunk if chunk.endswith(b"\n") or not chunk else chunk + b"\n" for chunk in chunks)
+        text = lines.decode(errors="replace").splitlines()
+        if tail is not None and tail >= 0:
+            text = text[-tail:] if tail else []
+        return "\n".join(text), next_cursor
+
+    def run_log(self, log_file: str) -> Path:
+        """
+        返回历史记录对应的日志文件
+
+        Raises:
+            FileNotFoundError: 日志文件不存在（如已按保留天数清理）时抛出
+        """
+        path = safe_resolve(self.log_dir, Path(log_file).name)
+        if not path.is_file():
+            raise FileNotFoundError("log file not found")
+        return path
+
+    def segments(self, since: Optional[str] = None, until: Optional[str] = None) -> List[Path]:
+        """
+        返回与 [since, until] 有交集的日志文件（按文件名中的启动时间与最后修改时间判断）
+
+        Raises:
+            ValueError: 时间格式不合法时抛出
+        """
+        start = parse_timestamp(since) if since else None
+        end = parse_timestamp(until) if until else None
+        selected: List[Path] = []
+        for path in sorted(self.log_dir.glob("inference_*.log")):
+            started = self._timestamp_from_name(path)
+            if started is None or (end and started > end):
+                continue
+            try:
+                if start and datetime.fromtimestamp(path.stat().st_mtime) < start:
+                    continue
+            except FileNotFoundError:
+                continue
+            selected.append(path)
+        return selected
+
+    def snapshot(self, path: Path) -> Tuple[int, Iterator[bytes]]:
+        """
+        以当前长度读取日志文件（写入中的文件之后追加的内容不返回）
+
+        Returns:
+            (字节数, 数据块迭代器)
+        """
+        handle = path.open("rb")
+        size = os.fstat(handle.fileno()).st_size
+
+        def chunks() -> Iterator[bytes]:
+            with handle:
+                yield from _read_upto(handle, size)
+
+        return size, chunks()
+
+    def archive(self, paths: List[Path], fmt: str = "zip") -> Iterator[bytes]:
+        """
+        把日志文件边读边打包为 zip 或 tar.gz
+
+        每个文件按打开时的长度读取；生成器每读入一块就产出已压缩的数据，内存占用与日志大小无关。
+
+        Raises:
+            ValueError: 格式不支持时抛出（在开始产出数据前）
+        """
+        if fmt not in ARCHIVE_FORMATS:
+            raise ValueError(f"format must be one of {', '.join(ARCHIVE_FORMATS)}")
+        return self._zip(paths) if fmt == "zip" else self._tar_gz(paths)
+
+    def _zip(self, paths: List[Path]) -> Iterator[bytes]:
+        sink = _ChunkSink()
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=ARCHIVE_LEVEL) as archive:
+            for path, handle, size, mtime in _open_all(paths):
+                with handle:
+                    info = zipfile.ZipInfo(path.name, date_time=time.localtime(mtime)[:6])
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    info.file_size = size  # 用于判断是否需要 zip64
+                    with archive.open(info, "w") as target:
+                        for chunk in _read_upto(handle, size):
+                            target.write(chunk)
+                            yield from sink.drain()
+                yield from sink.drain()
+        yield from sink.drain()
+
+    def _tar_gz(self, paths: List[Path]) -> Iterator[bytes]:
+        sink = _ChunkSink(gzip=True)
+        for path, handle, size, mtime in _open_all(paths):
+            with handle:
+                info = tarfile.TarInfo(path.name)
+                info.size = size
+                info.mtime = int(mtime)
+                info.mode = 0o644
+                sink.write(info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape"))
+                written = 0
+                for chunk in _read_upto(handle, size):
+                    sink.write(chunk)
+                    written += len(chunk)
+                    yield from sink.drain()
+                # 文件在读取期间被截断时补零，保持归档结构完整
+                sink.write(bytes(size - written + -size % tarfile.BLOCKSIZE))
+        sink.write(bytes(2 * tarfile.BLOCKSIZE))
+        sink.finish()
+        yield from sink.drain()
+
     def _timestamp_from_name(self, path: Path) -> Optional[datetime]:
         name = path.stem
         if not name.startswith("inference_"):
@@ -59,3 +209,103 @@ class LogManager:
             return parse_timestamp(raw)
         except ValueError:
             return None
+
+
+class _ChunkSink(io.RawIOBase):
+    """只写、不可 seek 的输出缓冲：打包器写入，生成器随即取走，可选 gzip 压缩"""
+
+    def __init__(self, gzip: bool = False) -> None:
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._compressor = zlib.compressobj(ARCHIVE_LEVEL, zlib.DEFLATED, 31) if gzip else None
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:  # type: ignore[override]
+        size = len(data)
+        chunk = bytes(data)
+        if self._compressor is not None:
+            chunk = self._compressor.compress(chunk)
+        if chunk:
+            self._chunks.append(chunk)
+        return size
+
+    def finish(self) -> None:
+        if self._compressor is not None:
+            self._chunks.append(self._compressor.flush())
+
+    def drain(self) -> Iterator[bytes]:
+        if self._chunks:
+            chunks, self._chunks = self._chunks, []
+            yield b"".join(chunks)
+
+
+def _open_all(paths: List[Path]) -> Iterator[Tuple[Path, IO[bytes], int, float]]:
+    """依次打开日志文件并返回打开时的长度与修改时间，已被清理的文件跳过"""
+    for path in paths:
+        try:
+            handle = path.open("rb")
+        except FileNotFoundError:
+            continue
+        stat = os.fstat(handle.fileno())
+        yield path, handle, stat.st_size, stat.st_mtime
+
+
+def _read_upto(handle: IO[bytes], size: int) -> Iterator[bytes]:
+    remaining = size
+    while remaining:
+        chunk = handle.read(min(CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+
+
+def _read_tail(files: List[Path], tail: int) -> Tuple[List[bytes], str]:
+    """从最新的文件向前读取，直到凑够 tail 个完整行；返回 (各文件的数据块, 游标)"""
+    chunks: List[bytes] = []
+    next_cursor = ""
+    remaining = tail
+    for path in reversed(files):
+        newest = not next_cursor
+        try:
+            data, end = _read_file_tail(path, remaining, newest)
+        except FileNotFoundError:
+            continue
+        if newest:
+            next_cursor = f"{path.name}:{end}"
+        chunks.insert(0, data)
+        remaining -= data.count(b"\n") + (0 if not data or data.endswith(b"\n") else 1)
+        if remaining <= 0:
+            break
+    return chunks, next_cursor
+
+
+def _read_file_tail(path: Path, lines: int, newest: bool) -> Tuple[bytes, int]:
+    """
+    从文件末尾向前按块读取，直到包含 lines 个完整行或读到文件开头
+
+    newest 为 True 时去掉末尾未写完的行。返回 (数据, 数据结束处的字节偏移)。
+    """
+    with path.open("rb") as handle:
+        size = os.fstat(handle.fileno()).st_size
+        position, data = size, b""
+        while position > 0:
+            step = min(CHUNK_SIZE, position)
+            position -= step
+            handle.seek(position)
+            data = handle.read(step) + data
+            body = data[: data.rfind(b"\n") + 1] if newest else data
+            # 多一个换行才能确定最前面的一行是完整的
+            if body.count(b"\n") > lines:
+                break
+    end = data.rfind(b"\n") + 1 if newest else len(data)
+    return data[:end], position + end
+
+
+def _parse_cursor(cursor: Optional[str]) -> Tuple[str, int]:
+    name, _, offset = (cursor or "").rpartition(":")
+    if not name.startswith("inference_") or not offset.isdigit():
+        return "", 0
+    return name, int(offset)
@@ -1,18 +1,54 @@
 from __future__ import annotations
 
+from collections import deque
+from datetime import datetime
 from pathlib import Path
-from typing import List, Optional
+from typing import IO, Any, Callable, Deque, Dict, Iterable, List, Optional, Set
+import hashlib
+import json
+import os
+import shutil
+import threading
 
 from fastapi import UploadFile
 
-from app.utils import ensure_dir, safe_resolve
+from app.managers.model_delta import DEFAULT_BLOCK_SIZE, DeltaLimitError, apply_delta, file_signature
+from app.utils import TIMESTAMP_FORMAT, ensure_dir, safe_resolve
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class ModelQuotaError(RuntimeError):
+    """淘汰所有可淘汰的模型后仍放不下新模型"""
 
 
 class ModelManager:
-    def __init__(self, model_dir: Path) -> None:
+    """
+    模型文件管理
+
+    可选的存储配额：写入新模型前按最近使用时间（LRU）淘汰未固定的旧模型，
+    直到总大小不超过 quota 且磁盘剩余空间不少于 min_free。当前模型、固定的模型
+    以及 in_use 返回的模型（运行中、被部署包、任务或扫描引用）不会被淘汰。使用记录保存在 .usage.json。
+    """
+
+    def __init__(
+        self,
+        model_dir: Path,
+        quota: Optional[int] = None,
+        min_free: int = 0,
+        in_use: Optional[Callable[[], Iterable[str]]] = None,
+    ) -> None:
         self.model_dir = model_dir
         ensure_dir(self.model_dir)
         self.current_file = self.model_dir / ".current_model"
+        self.hash_file = self.model_dir / ".hashes.json"
+        self.usage_file = self.model_dir / ".usage.json"
+        self.quota = quota
+        self.min_free = min_free
+        self.in_use = in_use
+        self.evictions: Deque[Dict[str, Any]] = deque(maxlen=20)  # 最近的淘汰记录
+        self._hash_lock = threading.Lock()
+        self._usage_lock = threading.Lock()
 
     def _write_current(self, path: Path) -> None:
         self.current_file.write_text(str(path))
@@ -40,6 +76,7 @@ class ModelManager:
         if not resolved.exists():
             raise FileNotFoundError("model not found")
         self._write_current(resolved)
+        self.touch(resolved)
         return resolved
 
     def upload(self, upload: UploadFile, model_name: Optional[str] = None) -> str:
@@ -47,15 +84,94 @@ class ModelManager:
         name = model_name or upload.filename or "model.bin"
         safe_name = Path(name).name
         target = self.model_dir / safe_name
-        content = upload.file.read()
-        target.write_bytes(content)
+        partial = target.with_name(f".{safe_name}.partial")
+        upload.file.seek(0, os.SEEK_END)
+        self.make_room(upload.file.tell(), replace=safe_name)
+        upload.file.seek(0)
+        digest = hashlib.sha256()
+        try:
+            with partial.open("wb") as handle:
+                while True:
+                    chunk = upload.file.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    handle.write(chunk)
+            os.replace(partial, target)
+        finally:
+            partial.unlink(missing_ok=True)
+        self.record_hash(target, digest.hexdigest())
         self._write_current(target)
+        self.touch(target)
         return safe_name
 
+    def signature(self, model_path: str, block_size: int = DEFAULT_BLOCK_SIZE) -> Dict[str, Any]:
+        """
+        返回模型的块签名，供客户端生成增量补丁
+
+        Raises:
+            FileNotFoundError: 模型不存在时抛出
+            ValueError: 块大小不合法时抛出
+        """
+        resolved = self.get_model(model_path)
+        return {"model": resolved.name, **file_signature(resolved, block_size)}
+
+    def patch(
+        self,
+        stream: IO[bytes],
+        base: str,
+        sha256: str,
+        model_name: Optional[str] = None,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+    ) -> Dict[str, Any]:
+        """
+        以已有模型为基础应用增量补丁，校验 sha256 后原子替换并设为当前模型
+
+        Args:
+            stream: 指令流（见 model_delta）
+            base: 作为基础的已有模型
+            sha256: 新文件的 sha256
+            model_name: 新模型文件名，默认覆盖 base
+            block_size: 生成补丁时使用的块大小
+
+        Raises:
+            FileNotFoundError: 基础模型不存在时抛出
+            ValueError: 指令流不合法或哈希不一致时抛出
+            ModelQuotaError: 存储空间不足时抛出
+        """
+        base_path = self.get_model(base)
+        safe_name = Path(model_name).name if model_name else base_path.name
+        target = self.model_dir / safe_name
+        partial = target.with_name(f".{safe_name}.partial")
+        # 新文件大小未知，先按基础模型大小预留，写完后按实际大小再检查配额；
+        # 写入过程中超出配额或磁盘可用空间时立即中止
+        self.make_room(base_path.stat().st_size, replace=safe_name, keep=[base_path.name])
+        limit = self._write_limit(replace=safe_name, keep=[base_path.name])
+        try:
+            with base_path.open("rb") as source, partial.open("wb") as handle:
+                try:
+                    size, digest, literal = apply_delta(source, stream, handle, block_size, limit)
+                except DeltaLimitError as exc:
+                    raise ModelQuotaError(str(exc)) from exc
+            if digest != sha256.lower():
+                raise ValueError(f"sha256 mismatch: expected {sha256}, got {digest}")
+            self.make_room(size, replace=safe_name, written=True)
+            os.replace(partial, target)
+        finally:
+            partial.unlink(missing_ok=True)
+        self.record_hash(target, digest)
+        self._write_current(target)
+        self.touch(target)
+        return {"model": safe_name, "base": base_path.name, "size": size, "literal_bytes": literal, "sha256": digest}
+
     def list_models(self, pattern: Optional[str] = None) -> List[str]:
         ensure_dir(self.model_dir)
         glob_pattern = pattern or "*"
-        return [path.name for path in sorted(self.model_dir.glob(glob_pattern)) if path.is_file()]
+        return [
+            path.name
+            for path in sorted(self.model_dir.glob(glob_pattern))
+            if path.is_file() and not path.name.startswith(".")
+        ]
 
     def get_model(self, model_path: str) -> Path:
         resolved = safe_resolve(self.model_dir, model_path)
@@ -68,9 +184,214 @@ class ModelManager:
         if not resolved.exists():
             raise FileNotFoundError("model not found")
         resolved.unlink()
+        self._forget_hash(resolved.name)
+        self._forget_usage(resolved.name)
         self._refresh_current(resolved)
         return resolved
 
+    def touch(self, path: Path) -> None:
+        """记录模型的一次使用（上传、选择、启动推理）"""
+        with self._usage_lock:
+            usage = self._load_usage()
+            entry = usage.setdefault(path.name, {"pinned": False, "uses": 0})
+            entry["last_used"] = datetime.now().strftime(TIMESTAMP_FORMAT)
+            entry["uses"] = entry.get("uses", 0) + 1
+            self._save_usage(usage)
+
+    def pin(self, model_path: str, pinned: bool = True) -> Dict[str, Any]:
+        """
+        固定（或取消固定）模型，固定的模型不会被淘汰
+
+        Raises:
+            FileNotFoundError: 模型不存在时抛出
+        """
+        resolved = self.get_model(model_path)
+        with self._usage_lock:
+            usage = self._load_usage()
+            entry = usage.setdefault(resolved.name, {"uses": 0})
+            entry["pinned"] = pinned
+            self._save_usage(usage)
+        return {"model": resolved.name, "pinned": pinned}
+
+    def usage(self) -> Dict[str, Any]:
+        """返回配额、占用、磁盘剩余空间，以及每个模型的大小、最近使用时间与状态"""
+        protected = set(self.in_use() if self.in_use else [])
+        current = self._read_current()
+        with self._usage_lock:
+            usage = self._load_usage()
+            models = []
+            for name, size in self._model_sizes().items():
+                entry = usage.get(name, {})
+                models.append({
+                    "model": name,
+                    "size": size,
+                    "last_used": self._last_used(name, entry),
+                    "uses": entry.get("uses", 0),
+                    "pinned": bool(entry.get("pinned")),
+                    "current": current is not None and current.name == name,
+                    "in_use": name in protected,
+                })
+        return {
+            "quota": self.quota,
+            "used": sum(model["size"] for model in models),
+            "min_free": self.min_free,
+            "disk_free": shutil.disk_usage(self.model_dir).free,
+            "models": models,
+            "evictions": list(self.evictions),
+        }
+
+    def make_room(
+        self,
+        incoming: int,
+        replace: Optional[str] = None,
+        keep: Iterable[str] = (),
+        written: bool = False,
+    ) -> List[str]:
+        """
+        为即将写入的 incoming 字节腾出空间，按最近使用时间从旧到新淘汰模型
+
+        Args:
+            incoming: 新模型大小
+            replace: 新模型的文件名，同名旧文件将被覆盖，不计入占用也不会被淘汰
+            keep: 其他不可淘汰的模型名（如作为补丁基础的模型）
+            written: 新文件已写入磁盘（只检查配额，不再检查剩余空间）
+
+        Returns:
+            被淘汰的模型名
+
+        Raises:
+            ModelQuotaError: 淘汰所有可淘汰的模型后仍放不下时抛出（此时不淘汰任何模型）
+        """
+        protected = self._protected(replace, keep)
+        evicted: List[str] = []
+        with self._usage_lock:
+            sizes = self._model_sizes()
+            used = sum(size for name, size in sizes.items() if name != replace)
+            quota_need = used + incoming - self.quota if self.quota is not None else 0
+            disk_need = 0 if written else incoming + self.min_free - shutil.disk_usage(self.model_dir).free
+            if quota_need <= 0 and disk_need <= 0:
+                return evicted
+            usage = self._load_usage()
+            candidates = self._candidates(sizes, usage, protected)
+            available = sum(sizes[name] for name in candidates)
+            if quota_need > available or disk_need > available:
+                raise ModelQuotaError(
+                    f"not enough model storage: {max(quota_need, disk_need) - available} more bytes needed "
+                    "than unpinned, idle models can free"
+                )
+            for name in candidates:
+                if quota_need <= 0 and disk_need <= 0:
+                    break
+                (self.model_dir / name).unlink(missing_ok=True)
+                usage.pop(name, None)
+                quota_need -= sizes[name]
+                disk_need -= sizes[name]
+                evicted.append(name)
+                self.evictions.append({
+                    "model": name,
+                    "size": sizes[name],
+                    "time": datetime.now().strftime(TIMESTAMP_FORMAT),
+                })
+            if evicted:
+                self._save_usage(usage)
+        for name in evicted:
+            self._forget_hash(name)
+        return evicted
+
+    def _write_limit(self, replace: Optional[str] = None, keep: Iterable[str] = ()) -> int:
+        """
+        新模型最多可写入的字节数：磁盘剩余空间扣除 min_free，
+        以及配额扣除不可淘汰模型后的空间（其余模型可在写完后淘汰），取较小者
+        """
+        limit = shutil.disk_usage(self.model_dir).free - self.min_free
+        if self.quota is not None:
+            protected = self._protected(replace, keep)
+            with self._usage_lock:
+                sizes = self._model_sizes()
+                evictable = set(self._candidates(sizes, self._load_usage(), protected))
+            fixed = sum(size for name, size in sizes.items() if name != replace and name not in evictable)
+            limit = min(limit, self.quota - fixed)
+        return max(limit, 0)
+
+    def _protected(self, replace: Optional[str], keep: Iterable[str]) -> Set[str]:
+        """不可淘汰的模型名（在锁外查询 in_use，避免与推理状态锁交叉）"""
+        protected = set(keep) | set(self.in_use() if self.in_use else [])
+        if replace:
+            protected.add(replace)
+        current = self._read_current()
+        if current is not None:
+            protected.add(current.name)
+        return protected
+
+    def _candidates(self, sizes: Dict[str, int], usage: Dict[str, Dict[str, Any]], protected: Set[str]) -> List[str]:
+        """可淘汰的模型，按最近使用时间从旧到新排列"""
+        return sorted(
+            (name for name in sizes if name not in protected and not usage.get(name, {}).get("pinned")),
+            key=lambda name: self._last_used(name, usage.get(name, {})),
+        )
+
+    def record_hash(self, path: Path, digest: str) -> None:
+        """记录模型的 sha256，供启动前完整性校验使用"""
+        with self._hash_lock:
+            hashes = self._load_hashes()
+            hashes[path.name] = digest
+            self._save_hashes(hashes)
+
+    def stored_hash(self, path: Path) -> Optional[str]:
+        with self._hash_lock:
+            return self._load_hashes().get(path.name)
+
+    def _forget_hash(self, name: str) -> None:
+        with self._hash_lock:
+            hashes = self._load_hashes()
+            if hashes.pop(name, None) is not None:
+                self._save_hashes(hashes)
+
+    def _load_hashes(self) -> Dict[str, str]:
+        if not self.hash_file.exists():
+            return {}
+        try:
+            return json.loads(self.hash_file.read_text())
+        except json.JSONDecodeError:
+            return {}
+
+    def _save_hashes(self, hashes: Dict[str, str]) -> None:
+        self.hash_file.write_text(json.dumps(hashes, indent=2))
+
+    def _model_sizes(self) -> Dict[str, int]:
+        sizes: Dict[str, int] = {}
+        for path in sorted(self.model_dir.glob("*")):
+            if path.is_file() and not path.name.startswith("."):
+                sizes[path.name] = path.stat().st_size
+        return sizes
+
+    def _last_used(self, name: str, entry: Dict[str, Any]) -> str:
+        """最近使用时间，没有记录时取文件修改时间"""
+        if entry.get("last_used"):
+            return entry["last_used"]
+        try:
+            mtime = (self.model_dir / name).stat().st_mtime
+        except FileNotFoundError:
+            return ""
+        return datetime.fromtimestamp(mtime).strftime(TIMESTAMP_FORMAT)
+
+    def _forget_usage(self, name: str) -> None:
+        with self._usage_lock:
+            usage = self._load_usage()
+            if usage.pop(name, None) is not None:
+                self._save_usage(usage)
+
+    def _load_usage(self) -> Dict[str, Dict[str, Any]]:
+        if not self.usage_file.exists():
+            return {}
+        try:
+            return json.loads(self.usage_file.read_text())
+        except json.JSONDecodeError:
+            return {}
+
+    def _save_usage(self, usage: Dict[str, Dict[str, Any]]) -> None:
+        self.usage_file.write_text(json.dumps(usage, indent=2))
+
     def _refresh_current(self, removed: Path) -> None:
         current = self._read_current()
         if current and current.resolve() == removed.resolve():
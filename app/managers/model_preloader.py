@@ -0,0 +1,127 @@
+"""
+模型预加载器
+
+在 /model/select 时于后台线程中校验模型 sha256 并将文件预读进页缓存，
+推理启动时只需等待（通常已完成的）预加载结果，避免冷读 eMMC。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import hashlib
+import os
+import threading
+import time
+
+from app.managers.model_manager import ModelManager
+
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class PreloadResult:
+    """预加载结果数据类"""
+    model: str  # 模型文件名
+    state: str  # pending / ready / failed
+    verified: Optional[bool]  # 哈希校验结果，无记录哈希时为None
+    seconds: Optional[float]  # 预加载耗时（秒）
+    error: Optional[str]  # 错误信息
+
+
+class ModelPreloader:
+    """
+    模型预加载器
+
+    以 (路径, mtime_ns, size) 标识一次预加载，文件未变化时重复调度直接复用结果。
+    """
+
+    def __init__(self, model_manager: ModelManager) -> None:
+        self.model_manager = model_manager
+        self._results: Dict[Path, Tuple[Tuple[int, int], PreloadResult]] = {}
+        self._threads: Dict[Path, threading.Thread] = {}
+        self._lock = threading.Lock()
+
+    def schedule(self, model_path: Path) -> None:
+        """在后台线程中预加载模型（已完成或进行中时不重复执行）"""
+        with self._lock:
+            if self._current(model_path) is not None:
+                return
+            thread = threading.Thread(
+                target=self._run, args=(model_path,), name="model-preload", daemon=True
+            )
+            self._threads[model_path] = thread
+            thread.start()
+
+    def wait(self, model_path: Path) -> PreloadResult:
+        """
+        获取模型的预加载结果；未调度过则在当前线程同步执行
+
+        Returns:
+            已完成的预加载结果
+        """
+        with self._lock:
+            thread = self._threads.get(model_path)
+            cached = self._current(model_path)
+        if thread is not None:
+            thread.join()
+            with self._lock:
+                cached = self._current(model_path)
+        if cached is not None and cached.state != "pending":
+            return cached
+        return self._run(model_path)
+
+    def status(self, model_path: Path) -> Optional[PreloadResult]:
+        with self._lock:
+            return self._current(model_path)
+
+    def _current(self, model_path: Path) -> Optional[PreloadResult]:
+        entry = self._results.get(model_path)
+        if entry is None:
+            return None
+        try:
+            stat = model_path.stat()
+        except FileNotFoundError:
+            return None
+        if entry[0] != (stat.st_mtime_ns, stat.st_size):
+            return None
+        return entry[1]
+
+    def _run(self, model_path: Path) -> PreloadResult:
+        started = time.monotonic()
+        result = PreloadResult(model_path.name, "pending", None, None, None)
+        try:
+            stat = model_path.stat()
+            key = (stat.st_mtime_ns, stat.st_size)
+            with self._lock:
+                self._results[model_path] = (key, result)
+            expected = self.model_manager.stored_hash(model_path)
+            actual = self._warm(model_path, hashing=expected is not None)
+            result.verified = None if expected is None else actual == expected
+            result.state = "ready" if result.verified is not False else "failed"
+            if result.verified is False:
+                result.error = "model sha256 mismatch"
+        except OSError as exc:
+            result.state = "failed"
+            result.error = str(exc)
+        result.seconds = round(time.monotonic() - started, 4)
+        with self._lock:
+            self._threads.pop(model_path, None)
+        return result
+
+    def _warm(self, model_path: Path, hashing: bool) -> Optional[str]:
+        """提示内核预读并顺序读取一遍文件，读取的同时计算哈希"""
+        digest = hashlib.sha256() if hashing else None
+        with model_path.open("rb") as handle:
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(handle.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+                if digest is None:
+                    return None
+            while True:
+                chunk = handle.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if digest is not None:
+                    digest.update(chunk)
+        return digest.hexdigest() if digest is not None else None
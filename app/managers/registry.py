@@ -0,0 +1,289 @@
+"""
+管理器注册表
+
+按需构造各个管理器：首次访问时才创建实例（以及创建目录等副作用），
+使应用启动时无需为尚未用到的功能付出初始化开销。
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, TypeVar
+import threading
+
+from app.config import Settings
+from app.managers.bundle_manager import BundleManager
+from app.managers.config_manager import ConfigManager
+from app.managers.fleet import FleetAggregator, parse_boards
+from app.managers.governor import GovernorPolicy, ThermalGovernor
+from app.managers.history_manager import HistoryManager
+from app.managers.inference_manager import InferenceManager
+from app.managers.inference_state import InferenceStateStore
+from app.managers.job_queue import JobQueue
+from app.managers.log_manager import LogManager
+from app.managers.model_manager import ModelManager
+from app.managers.model_preloader import ModelPreloader
+from app.managers.resource_limits import ResourceLimiter, ResourceLimits, parse_size
+from app.managers.result_channel import ResultChannel
+from app.managers.state_manager import StateManager
+from app.managers.sweep_runner import SweepRunner
+from app.managers.system_monitor import SystemMonitor
+
+T = TypeVar("T")
+
+
+class ManagerRegistry:
+    """
+    惰性管理器容器
+
+    每个属性在首次访问时构造并缓存，构造过程在可重入锁内完成，
+    线程池中并发的首个请求不会重复创建实例。
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def created(self, name: str) -> bool:
+        """返回指定管理器是否已被构造"""
+        return name in self._instances
+
+    def _get(self, name: str, factory: Callable[[], T]) -> T:
+        instance = self._instances.get(name)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(name)
+                if instance is None:
+                    instance = factory()
+                    self._instances[name] = instance
+        return instance
+
+    @property
+    def log_manager(self) -> LogManager:
+        return self._get(
+            "log_manager",
+            lambda: LogManager(self.settings.log_dir, self.settings.log_retention_days),
+        )
+
+    @property
+    def history_manager(self) -> HistoryManager:
+        return self._get("history_manager", lambda: HistoryManager(self.settings.history_file))
+
+    @property
+    def model_manager(self) -> ModelManager:
+        settings = self.settings
+        return self._get(
+            "model_manager",
+            lambda: ModelManager(
+                settings.model_dir,
+                quota=parse_size(settings.model_quota),
+                min_free=parse_size(settings.model_min_free) or 0,
+                in_use=self._protected_models,
+            ),
+        )
+
+    @property
+    def config_manager(self) -> ConfigManager:
+        return self._get("config_manager", lambda: ConfigManager(self.settings.config_dir))
+
+    @property
+    def preloader(self) -> Optional[ModelPreloader]:
+        if not self.settings.preload_model:
+            return None
+        return self._get("preloader", lambda: ModelPreloader(self.model_manager))
+
+    @property
+    def inference_state(self) -> Optional[InferenceStateStore]:
+        if self.settings.run_dir is None:
+            return None
+        return self._get("inference_state", lambda: InferenceStateStore(self.settings.run_dir))
+
+    @property
+    def resource_limiter(self) -> ResourceLimiter:
+        settings = self.settings
+        return self._get(
+            "resource_limiter",
+            lambda: ResourceLimiter(
+                settings.model_dir / ".limits.json",
+                ResourceLimits.from_dict(
+                    {
+                        "memory_max": settings.limit_memory,
+                        "cpu_max": settings.limit_cpu or None,
+                        "cpuset": settings.limit_cpuset,
+                    }
+                ),
+                api_cpus=settings.api_cpus or None,
+                cgroup_root=settings.cgroup_root,
+            ),
+        )
+
+    @property
+    def result_channel(self) -> Optional[ResultChannel]:
+        if self.settings.result_socket is None:
+            return None
+        return self._get(
+            "result_channel",
+            lambda: ResultChannel(self.settings.result_socket, self.settings.result_queue),
+        )
+
+    @property
+    def inference_manager(self) -> InferenceManager:
+        return self._get("inference_manager", self._build_inference_manager)
+
+    def _build_inference_manager(self) -> InferenceManager:
+        """构造推理管理器，并在首次使用前与持久化的推理会话对账（接管分离运行的推理）"""
+        manager = InferenceManager(
+            self.settings.infer_binary,
+            self.log_manager,
+            self.history_manager,
+            self.preloader,
+            stop_timeout=self.settings.stop_timeout,
+            state_store=self.inference_state,
+            detach=self.settings.detach_inference,
+            limiter=self.resource_limiter,
+            result_channel=self.result_channel,
+            model_manager=self.model_manager,
+        )
+        manager.adopt()
+        return manager
+
+    @property
+    def system_monitor(self) -> SystemMonitor:
+        return self._get("system_monitor", SystemMonitor)
+
+    @property
+    def bundle_manager(self) -> BundleManager:
+        return self._get(
+            "bundle_manager",
+            lambda: BundleManager(self.model_manager, self.config_manager),
+        )
+
+    @property
+    def state_manager(self) -> StateManager:
+        return self._get(
+            "state_manager",
+            lambda: StateManager(
+                self.model_manager,
+                self.config_manager,
+                self.history_manager,
+                self.bundle_manager,
+            ),
+        )
+
+    @property
+    def job_queue(self) -> JobQueue:
+        return self._get("job_queue", self._build_job_queue)
+
+    def _build_job_queue(self) -> JobQueue:
+        """构造任务队列并启动工作线程（首次使用时）"""
+        queue = JobQueue(
+            self.inference_manager,
+            self.resolve_run,
+            poll_interval=self.settings.job_poll_interval,
+        )
+        queue.start_worker()
+        return queue
+
+    @property
+    def sweep_runner(self) -> SweepRunner:
+        return self._get(
+            "sweep_runner",
+            lambda: SweepRunner(
+                self.inference_manager,
+                self.model_manager,
+                self.config_manager,
+                self.system_monitor,
+                self._sweep_dir(),
+            ),
+        )
+
+    def _sweep_dir(self) -> Path:
+        return self.settings.sweep_dir or self.settings.log_dir.parent / "sweeps"
+
+    @property
+    def governor(self) -> ThermalGovernor:
+        settings = self.settings
+        return self._get(
+            "governor",
+            lambda: ThermalGovernor(
+                self.inference_manager,
+                self.system_monitor,
+                self.history_manager,
+                self.model_manager,
+                GovernorPolicy(
+                    policy=settings.governor_policy,
+                    temp_high=settings.governor_temp_high,
+                    temp_low=settings.governor_temp_low,
+                    cpu_high=settings.governor_cpu_high,
+                    memory_high=settings.governor_memory_high,
+                    interval=settings.governor_interval,
+                    duty=settings.governor_duty,
+                    nice=settings.governor_nice,
+                    fallback_model=settings.governor_fallback_model,
+                ),
+            ),
+        )
+
+    @property
+    def fleet(self) -> Optional[FleetAggregator]:
+        settings = self.settings
+        if not settings.fleet_boards:
+            return None
+        return self._get(
+            "fleet",
+            lambda: FleetAggregator(
+                parse_boards(settings.fleet_boards, settings.fleet_timeout),
+                cache_ttl=settings.fleet_cache_ttl,
+            ),
+        )
+
+    def resume(self) -> None:
+        """
+        应用启动后在后台线程中调用：对账推理会话；把遗留的 running 扫描标记为 interrupted；
+        有持久化的任务或定时计划时恢复任务队列，配置了调速策略时启动调速器
+        """
+        state_dir = self.inference_manager.state_store.state_dir
+        if self._sweep_dir().is_dir():
+            self.sweep_runner.close_stale()
+        if (state_dir / "jobs.json").exists():
+            self.job_queue.start_worker()
+        if self.settings.governor_policy:
+            self.governor.start()
+
+    def _protected_models(self) -> List[str]:
+        """
+        配额淘汰时跳过的模型：正在推理的模型（含其他 worker 启动的）、部署包引用的模型，
+        以及排队/定时任务与运行中扫描将要使用的模型
+        """
+        names: Set[str] = set()
+        if (self.settings.model_dir / ".bundles").is_dir():
+            names.update(self.bundle_manager.referenced_models())
+        status = self.inference_manager.status()
+        if status.running and status.current_model:
+            names.add(status.current_model)
+        if (self.inference_manager.state_store.state_dir / "jobs.json").exists():
+            names.update(self.job_queue.referenced_models())
+        names.update(self.sweep_runner.referenced_models())
+        return sorted(names)
+
+    def resolve_run(
+        self,
+        model: Optional[str] = None,
+        config: Optional[str] = None,
+        bundle: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        把模型/配置名或部署包名解析为启动推理所需的路径与参数
+
+        Raises:
+            FileNotFoundError: 模型、配置或部署包不存在时抛出
+            ValueError: 未指定且没有默认模型或配置时抛出
+        """
+        if bundle:
+            return self.bundle_manager.resolve(bundle)
+        model_path = self.model_manager.get_model(model) if model else self.model_manager.get_current()
+        config_path = self.config_manager.get_config(config) if config else self.config_manager.get_current()
+        if not model_path or not config_path:
+            raise ValueError("model or config not set")
+        return {"model_path": model_path, "config_path": config_path, "args": []}
@@ -0,0 +1,333 @@
+"""
+推理进程资源限制
+
+为每次推理创建 cgroup v2 子组（memory.max、cpu.max、cpuset.cpus），
+cgroup 不可用（v1、未委派、无写权限）时回退为 setrlimit(RLIMIT_AS) 与 sched_setaffinity。
+限制按模型配置，保存在模型目录的 .limits.json，未配置的项使用全局默认值。
+另外支持把 API 进程的全部线程绑定到保留核心，推理进程默认使用其余核心。
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import json
+import os
+import re
+import resource
+import threading
+import uuid
+
+from app.utils import ensure_dir
+
+CPU_PERIOD_US = 100_000
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_size(value: Any) -> Optional[int]:
+    """
+    解析内存大小（整数字节或 512M、1.5G 形式）
+
+    Raises:
+        ValueError: 格式不合法时抛出
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, int):
+        size = value
+    else:
+        match = re.fullmatch(r"\s*([0-9]+(?:\.[0-9]+)?)\s*([KMG]?)i?B?\s*", str(value), re.IGNORECASE)
+        if not match:
+            raise ValueError(f"invalid memory size: {value!r}")
+        size = int(float(match.group(1)) * _SIZE_UNITS[match.group(2).upper()])
+    if size <= 0:
+        raise ValueError("memory size must be positive")
+    return size
+
+
+def parse_cpuset(value: Optional[str]) -> Optional[Set[int]]:
+    """
+    解析 CPU 列表（如 "2-3"、"0,2,4-5"）
+
+    Raises:
+        ValueError: 格式不合法时抛出
+    """
+    if not value:
+        return None
+    cpus: Set[int] = set()
+    for item in value.split(","):
+        item = item.strip()
+        if not re.fullmatch(r"[0-9]+(-[0-9]+)?", item):
+            raise ValueError(f"invalid cpuset: {value!r}")
+        start, _, end = item.partition("-")
+        if end and int(end) < int(start):
+            raise ValueError(f"invalid cpuset: {value!r}")
+        cpus.update(range(int(start), int(end or start) + 1))
+    return cpus
+
+
+def format_cpuset(cpus: Set[int]) -> str:
+    ordered = sorted(cpus)
+    ranges: List[str] = []
+    start = previous = ordered[0]
+    for cpu in ordered[1:] + [None]:  # type: ignore[list-item]
+        if cpu is not None and cpu == previous + 1:
+            previous = cpu
+            continue
+        ranges.append(str(start) if start == previous else f"{start}-{previous}")
+        if cpu is not None:
+            start = previous = cpu
+    return ",".join(ranges)
+
+
+@dataclass(frozen=True)
+class ResourceLimits:
+    """单次推理的资源限制，None 表示不限制"""
+    memory_max: Optional[int] = None  # 内存上限（字节）
+    cpu_max: Optional[float] = None  # CPU 配额（核数，如 1.5）
+    cpuset: Optional[str] = None  # 可用 CPU 列表
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ResourceLimits":
+        """
+        Raises:
+            ValueError: 字段不合法时抛出
+        """
+        cpu_max = data.get("cpu_max")
+        if cpu_max in ("", None):
+            cpu_max = None
+        else:
+            cpu_max = float(cpu_max)
+            if cpu_max <= 0:
+                raise ValueError("cpu_max must be positive")
+        cpuset = data.get("cpuset") or None
+        parse_cpuset(cpuset)
+        return cls(memory_max=parse_size(data.get("memory_max")), cpu_max=cpu_max, cpuset=cpuset)
+
+    def merged(self, defaults: "ResourceLimits") -> "ResourceLimits":
+        return ResourceLimits(
+            memory_max=self.memory_max if self.memory_max is not None else defaults.memory_max,
+            cpu_max=self.cpu_max if self.cpu_max is not None else defaults.cpu_max,
+            cpuset=self.cpuset if self.cpuset is not None else defaults.cpuset,
+        )
+
+
+@dataclass
+class LaunchPlan:
+    """一次启动的限制方案：preexec_fn 在子进程 exec 前执行"""
+    mode: Optional[str]  # cgroup|rlimit|None
+    limits: ResourceLimits
+    cgroup: Optional[Path] = None
+    preexec_fn: Optional[Callable[[], None]] = None
+    error: Optional[str] = None  # cgroup 不可用的原因
+    _procs_fd: Optional[int] = None
+
+    def started(self) -> None:
+        """子进程已启动，关闭父进程持有的 cgroup.procs 描述符"""
+        if self._procs_fd is not None:
+            os.close(self._procs_fd)
+            self._procs_fd = None
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "cgroup": str(self.cgroup) if self.cgroup else None,
+            "error": self.error,
+            **asdict(self.limits),
+        }
+
+
+class ResourceLimiter:
+    """
+    推理资源限制器
+
+    Args:
+        limits_file: 按模型保存限制的 JSON 文件
+        defaults: 未按模型配置时使用的默认限制
+        api_cpus: API 进程保留的核心，设置后推理默认使用其余核心
+        cgroup_root: cgroup v2 挂载点
+        cgroup_name: 在 API 所在 cgroup 的父级下创建的子组名
+    """
+
+    def __init__(
+        self,
+        limits_file: Path,
+        defaults: ResourceLimits = ResourceLimits(),
+        api_cpus: Optional[str] = None,
+        cgroup_root: Path = Path("/sys/fs/cgroup"),
+        cgroup_name: str = "pi-infer",
+    ) -> None:
+        self.limits_file = limits_file
+        self.defaults = defaults
+        self.api_cpus = parse_cpuset(api_cpus)
+        self.cgroup_root = cgroup_root
+        self.cgroup_name = cgroup_name
+        self._lock = threading.Lock()
+
+    def get_limits(self, model: str) -> Dict[str, Any]:
+        """返回模型的限制配置与合并默认值后的生效限制"""
+        configured = self._load().get(model, {})
+        effective = self.effective(model)
+        return {"model": model, "configured": configured, "effective": asdict(effective)}
+
+    def set_limits(self, model: str, limits: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        保存模型的限制；传入None或全部为空时移除配置
+
+        Raises:
+            ValueError: 字段不合法时抛出
+        """
+        parsed = ResourceLimits.from_dict(limits or {})
+        with self._lock:
+            data = self._load()
+            stored = {key: value for key, value in asdict(parsed).items() if value is not None}
+            if stored:
+                data[model] = stored
+            else:
+                data.pop(model, None)
+            ensure_dir(self.limits_file.parent)
+            self.limits_file.write_text(json.dumps(data, indent=2))
+        return self.get_limits(model)
+
+    def forget(self, model: str) -> None:
+        with self._lock:
+            data = self._load()
+            if data.pop(model, None) is not None:
+                self.limits_file.write_text(json.dumps(data, indent=2))
+
+    def effective(self, model: str) -> ResourceLimits:
+        configured = ResourceLimits.from_dict(self._load().get(model, {}))
+        limits = configured.merged(self.defaults)
+        if limits.cpuset is None and self.api_cpus:
+            remaining = os.sched_getaffinity(0) | _online_cpus()
+            remaining -= self.api_cpus
+            if remaining:
+                limits = replace(limits, cpuset=format_cpuset(remaining))
+        return limits
+
+    def prepare(self, model: str) -> LaunchPlan:
+        """
+        为一次启动准备限制：优先创建 cgroup 子组，失败时回退为 rlimit/affinity
+        """
+        limits = self.effective(model)
+        if limits == ResourceLimits():
+            return LaunchPlan(mode=None, limits=limits)
+        cpus = parse_cpuset(limits.cpuset)
+        try:
+            cgroup, procs_fd = self._create_cgroup(limits)
+        except OSError as exc:
+            return LaunchPlan(
+                mode="rlimit",
+                limits=limits,
+                preexec_fn=_rlimit_preexec(limits.memory_max, cpus),
+                error=str(exc),
+            )
+        return LaunchPlan(
+            mode="cgroup",
+            limits=limits,
+            cgroup=cgroup,
+            preexec_fn=_cgroup_preexec(procs_fd, cpus),
+            _procs_fd=procs_fd,
+        )
+
+    def release(self, cgroup: Optional[str]) -> None:
+        """推理结束后删除会话 cgroup（仍有进程时忽略）"""
+        if not cgroup:
+            return
+        try:
+            os.rmdir(cgroup)
+        except OSError:
+            pass
+
+    def set_cpu_weight(self, cgroup: Optional[str], weight: int) -> bool:
+        """调整会话 cgroup 的 cpu.weight（1~10000，默认100），供调速器使用"""
+        if not cgroup:
+            return False
+        try:
+            Path(cgroup, "cpu.weight").write_text(str(weight))
+        except OSError:
+            return False
+        return True
+
+    def pin_api(self) -> Optional[Set[int]]:
+        """把 API 进程的所有现有线程绑定到保留核心（之后创建的线程继承该设置）"""
+        if not self.api_cpus:
+            return None
+        for task in Path("/proc/self/task").iterdir():
+            try:
+                os.sched_setaffinity(int(task.name), self.api_cpus)
+            except OSError:
+                continue
+        return self.api_cpus
+
+    def _create_cgroup(self, limits: ResourceLimits) -> Tuple[Path, int]:
+        if not (self.cgroup_root / "cgroup.controllers").exists():
+            raise OSError("cgroup v2 not mounted")
+        own = Path("/proc/self/cgroup").read_text().splitlines()
+        relative = next((line.split("::", 1)[1] for line in own if line.startswith("0::")), None)
+        if relative is None:
+            raise OSError("process is not in a cgroup v2 hierarchy")
+        # 子组建在 API 所在 cgroup 的父级下，避开 cgroup v2 “有进程的组不能再分配控制器”的限制
+        own_group = self.cgroup_root / relative.strip("/")
+        parent = (own_group if own_group == self.cgroup_root else own_group.parent) / self.cgroup_name
+        ensure_dir(parent)
+        controllers = []
+        if limits.memory_max is not None:
+            controllers.append("+memory")
+        if limits.cpu_max is not None:
+            controllers.append("+cpu")
+        if limits.cpuset is not None:
+            controllers.append("+cpuset")
+        for group in (parent.parent, parent):
+            (group / "cgroup.subtree_control").write_text(" ".join(controllers))
+        session = parent / f"session-{uuid.uuid4().hex[:8]}"
+        session.mkdir()
+        try:
+            if limits.memory_max is not None:
+                (session / "memory.max").write_text(str(limits.memory_max))
+            if limits.cpu_max is not None:
+                quota = int(limits.cpu_max * CPU_PERIOD_US)
+                (session / "cpu.max").write_text(f"{quota} {CPU_PERIOD_US}")
+            if limits.cpuset is not None:
+                (session / "cpuset.cpus").write_text(limits.cpuset)
+            procs_fd = os.open(session / "cgroup.procs", os.O_WRONLY)
+        except OSError:
+            session.rmdir()
+            raise
+        return session, procs_fd
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not self.limits_file.exists():
+            return {}
+        try:
+            return json.loads(self.limits_file.read_text())
+        except json.JSONDecodeError:
+            return {}
+
+
+def _online_cpus() -> Set[int]:
+    try:
+        return parse_cpuset(Path("/sys/devices/system/cpu/online").read_text().strip()) or set()
+    except OSError:
+        return set()
+
+
+# preexec_fn 在 fork 之后、exec 之前运行，只做系统调用，不分配锁或导入模块
+def _cgroup_preexec(procs_fd: int, cpus: Optional[Set[int]]) -> Callable[[], None]:
+    def preexec() -> None:
+        os.write(procs_fd, b"0")
+        if cpus:
+            os.sched_setaffinity(0, cpus)
+
+    return preexec
+
+
+def _rlimit_preexec(memory_max: Optional[int], cpus: Optional[Set[int]]) -> Callable[[], None]:
+    def preexec() -> None:
+        if memory_max is not None:
+            resource.setrlimit(resource.RLIMIT_AS, (memory_max, memory_max))
+        if cpus:
+            os.sched_setaffinity(0, cpus)
+
+    return preexec
@@ -0,0 +1,269 @@
+"""
+推理结果通道
+
+推理进程通过 Unix 域套接字写入带长度前缀的结果帧（4 字节大端长度 + 负载），
+API 进程读取后分发给所有订阅者（WebSocket/SSE）。每个订阅者有独立的有界队列，
+消费跟不上时丢弃最旧的结果并计数，不会阻塞推理进程或其他订阅者。
+
+推理进程从环境变量 PI_INFER_RESULT_SOCKET 得到套接字路径；负载是 JSON 时按 JSON 转发，
+否则作为二进制原样转发。
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Set
+import asyncio
+import base64
+import json
+import selectors
+import socket
+import struct
+import threading
+import time
+
+from app.utils import ensure_dir
+
+FRAME_HEADER = struct.Struct(">I")
+BINARY_HEADER = struct.Struct(">QI")  # 二进制推送：序号 + 该订阅者累计丢弃数
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+SOCKET_ENV = "PI_INFER_RESULT_SOCKET"
+
+
+def encode_frame(payload: bytes) -> bytes:
+    """按通道格式封装一帧（供推理进程或测试使用）"""
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+@dataclass(frozen=True)
+class ResultFrame:
+    """一条推理结果"""
+    seq: int  # 通道内递增序号
+    time: float  # API 收到的时间（Unix 秒）
+    payload: bytes  # 推理进程写入的原始负载
+
+    def to_dict(self) -> Dict[str, Any]:
+        try:
+            data: Any = json.loads(self.payload)
+            encoding = "json"
+        except ValueError:
+            data = base64.b64encode(self.payload).decode("ascii")
+            encoding = "base64"
+        return {"seq": self.seq, "time": self.time, "encoding": encoding, "data": data}
+
+    def to_binary(self, dropped: int) -> bytes:
+        return BINARY_HEADER.pack(self.seq, dropped) + self.payload
+
+
+class ResultSubscription:
+    """
+    单个订阅者的有界队列
+
+    推理结果由读取线程写入，订阅者在事件循环中读取；队列满时丢弃最旧的结果。
+    """
+
+    def __init__(self, channel: "ResultChannel", queue_size: int, loop: asyncio.AbstractEventLoop) -> None:
+        self.channel = channel
+        self.dropped = 0  # 因积压被丢弃的结果数
+        self._queue: Deque[ResultFrame] = deque(maxlen=queue_size)
+        self._lock = threading.Lock()
+        self._loop = loop
+        self._ready = asyncio.Event()
+
+    def push(self, frame: ResultFrame) -> None:
+        with self._lock:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append(frame)
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:  # 订阅者的事件循环已关闭
+            self.channel.unsubscribe(self)
+
+    async def get(self, timeout: Optional[float] = None) -> List[ResultFrame]:
+        """等待并取出当前积压的全部结果，超时返回空列表"""
+        if not self._queue:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        with self._lock:
+            self._ready.clear()
+            frames = list(self._queue)
+            self._queue.clear()
+        return frames
+
+    def close(self) -> None:
+        self.channel.unsubscribe(self)
+
+
+class ResultChannel:
+    """
+    推理结果通道
+
+    Args:
+        socket_path: 监听的 Unix 域套接字路径
+        queue_size: 每个订阅者最多积压的结果数
+    """
+
+    def __init__(self, socket_path: Path, queue_size: int = 256) -> None:
+        self.socket_path = socket_path
+        self.queue_size = max(1, queue_size)
+        self.frames = 0
+        self.bytes = 0
+        self.last_frame_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._seq = 0
+        self._subscribers: Set[ResultSubscription] = set()
+        self._producers = 0
+        self._lock = threading.Lock()
+        self._server: Optional[socket.socket] = None
+        self._selector: Optional[selectors.BaseSelector] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    @property
+    def listening(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> bool:
+        """
+        开始监听；套接字已被其他 worker 占用时不监听并返回 False
+        """
+        if self.listening:
+            return True
+        ensure_dir(self.socket_path.parent)
+        if self.socket_path.exists():
+            if _socket_alive(self.socket_path):
+                self.last_error = "socket owned by another worker"
+                return False
+            self.socket_path.unlink()
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(str(self.socket_path))
+        server.listen(4)
+        server.setblocking(False)
+        self._server = server
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(server, selectors.EVENT_READ)
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="result-channel", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._selector is not None:
+            for key in list(self._selector.get_map().values()):
+                key.fileobj.close()  # type: ignore[union-attr]
+            self._selector.close()
+            self._selector = None
+        if self._server is not None:
+            self._server = None
+            self.socket_path.unlink(missing_ok=True)
+
+    def child_env(self) -> Dict[str, str]:
+        """推理进程需要的环境变量"""
+        return {SOCKET_ENV: str(self.socket_path)}
+
+    def subscribe(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> ResultSubscription:
+        subscription = ResultSubscription(self, self.queue_size, loop or asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: ResultSubscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, payload: bytes) -> ResultFrame:
+        with self._lock:
+            self._seq += 1
+            frame = ResultFrame(seq=self._seq, time=time.time(), payload=payload)
+            self.frames += 1
+            self.bytes += len(payload)
+            self.last_frame_at = frame.time
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.push(frame)
+        return frame
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            subscribers = list(self._subscribers)
+            return {
+                "socket": str(self.socket_path),
+                "listening": self.listening,
+                "producers": self._producers,
+                "frames": self.frames,
+                "bytes": self.bytes,
+                "last_frame_at": self.last_frame_at,
+                "subscribers": len(subscribers),
+                "dropped": sum(subscription.dropped for subscription in subscribers),
+                "queue_size": self.queue_size,
+                "last_error": self.last_error,
+            }
+
+    def _run(self) -> None:
+        assert self._selector is not None and self._server is not None
+        buffers: Dict[socket.socket, bytearray] = {}
+        while not self._stopping.is_set():
+            for key, _ in self._selector.select(timeout=0.2):
+                sock = key.fileobj
+                if sock is self._server:
+                    conn, _ = self._server.accept()
+                    conn.setblocking(False)
+                    self._selector.register(conn, selectors.EVENT_READ)
+                    buffers[conn] = bytearray()
+                    self._producers += 1
+                    continue
+                try:
+                    chunk = sock.recv(65536)  # type: ignore[union-attr]
+                except OSError as exc:
+                    self.last_error = str(exc)
+                    chunk = b""
+                if not chunk:
+                    self._drop(sock, buffers)  # type: ignore[arg-type]
+                    continue
+                buffer = buffers[sock]  # type: ignore[index]
+                buffer += chunk
+                if not self._consume(buffer):
+                    self.last_error = "frame exceeds size limit"
+                    self._drop(sock, buffers)  # type: ignore[arg-type]
+
+    def _consume(self, buffer: bytearray) -> bool:
+        """从缓冲区取出所有完整帧并发布，帧长度超限时返回 False"""
+        offset = 0
+        while len(buffer) - offset >= FRAME_HEADER.size:
+            (length,) = FRAME_HEADER.unpack_from(buffer, offset)
+            if length > MAX_FRAME_BYTES:
+                return False
+            end = offset + FRAME_HEADER.size + length
+            if len(buffer) < end:
+                break
+            self.publish(bytes(buffer[offset + FRAME_HEADER.size:end]))
+            offset = end
+        del buffer[:offset]
+        return True
+
+    def _drop(self, sock: socket.socket, buffers: Dict[socket.socket, bytearray]) -> None:
+        assert self._selector is not None
+        self._selector.unregister(sock)
+        sock.close()
+        buffers.pop(sock, None)
+        self._producers -= 1
+
+
+def _socket_alive(path: Path) -> bool:
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(str(path))
+    except OSError:
+        return False
+    finally:
+        probe.close()
+    return True
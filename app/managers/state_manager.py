@@ -0,0 +1,422 @@
+"""
+整机状态导出与导入
+
+把模型、配置、部署包记录、当前选择与推理历史打包为一个 tar 流，用于克隆板卡：
+
+- 导出时边读边发，不生成临时文件；manifest.json 是第一个成员，列出每个文件的大小与 sha256，
+  tar 头部预先生成，因此响应可以带 Content-Length。文件数据按 1 MiB（512 字节对齐）分块读取。
+- 导入时边接收边写入临时文件并校验 sha256，全部通过后才替换到位；与本机已有文件
+  内容相同的模型/配置不再写入（同名直接跳过，不同名的模型以硬链接共享数据）。
+- 导出时可传入对端已有模型的 sha256（known），这些模型只写入 manifest 而不传数据，
+  由导入端从本机已有的同哈希模型复制。
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import hashlib
+import json
+import os
+import shutil
+import tarfile
+import time
+
+from app.managers.bundle_manager import BundleManager
+from app.managers.config_manager import ConfigManager
+from app.managers.history_manager import HistoryManager
+from app.managers.model_manager import ModelManager
+from app.utils import TIMESTAMP_FORMAT, ensure_dir
+
+MANIFEST_NAME = "manifest.json"
+HISTORY_NAME = "history.json"
+STATE_FORMAT = 1
+CHUNK_SIZE = 1024 * 1024
+
+_Source = Union[Path, bytes]
+
+
+class StateManager:
+    """整机状态的流式导出与导入"""
+
+    def __init__(
+        self,
+        model_manager: ModelManager,
+        config_manager: ConfigManager,
+        history_manager: HistoryManager,
+        bundle_manager: BundleManager,
+    ) -> None:
+        self.model_manager = model_manager
+        self.config_manager = config_manager
+        self.history_manager = history_manager
+        self.bundle_manager = bundle_manager
+
+    def manifest(self, known: Iterable[str] = ()) -> Dict[str, Any]:
+        """返回导出时的 manifest（不读取模型数据，缺少记录的模型哈希会先计算并记录）"""
+        return self._plan({digest.lower() for digest in known})[0]
+
+    def export(self, known: Iterable[str] = ()) -> Tuple[int, Iterator[bytes]]:
+        """
+        生成状态归档
+
+        Args:
+            known: 对端已有模型的 sha256，这些模型不传数据
+
+        Returns:
+            (归档总字节数, 数据块迭代器)
+        """
+        manifest, members = self._plan({digest.lower() for digest in known})
+        manifest_bytes = json.dumps(manifest, indent=2, ensure_ascii=False).encode("utf-8")
+        members.insert(0, (MANIFEST_NAME, manifest_bytes, len(manifest_bytes)))
+        mtime = int(time.time())
+        headers = [_tar_header(name, size, mtime) for name, _, size in members]
+        body = sum(len(header) + _padded(size) for header, (_, _, size) in zip(headers, members))
+        total = _padded(body + 2 * tarfile.BLOCKSIZE, tarfile.RECORDSIZE)
+        return total, self._stream(members, headers, total - body)
+
+    def import_state(self, stream: IO[bytes]) -> Dict[str, Any]:
+        """
+        从流中导入状态归档
+
+        Returns:
+            写入、去重与合并的汇总
+
+        Raises:
+            ValueError: 归档格式错误、缺少文件或哈希不匹配时抛出
+            ModelQuotaError: 模型存储空间不足时抛出
+        """
+        pending: Dict[str, Path] = {}
+        configs: Dict[str, bytes] = {}
+        result: Dict[str, Any] = {
+            "models": {"written": [], "linked": [], "unchanged": []},
+            "configs": {"written": [], "unchanged": []},
+            "bundles": [],
+            "history_added": 0,
+            "bytes_written": 0,
+        }
+        try:
+            try:
+                archive = tarfile.open(fileobj=stream, mode="r|*")
+            except tarfile.TarError as exc:
+                raise ValueError(f"invalid state archive: {exc}") from exc
+            with archive:
+                manifest: Optional[Dict[str, Any]] = None
+                expected: Dict[str, Dict[str, Any]] = {}
+                received: set = set()
+                history: List[Dict[str, Any]] = []
+                local = self._local_models()
+                for member in archive:
+                    if not member.isfile():
+                        continue
+                    source = archive.extractfile(member)
+                    if source is None:
+                        continue
+                    if manifest is None:
+                        if member.name != MANIFEST_NAME:
+                            raise ValueError("manifest.json must be the first member")
+                        manifest = _parse_manifest(source.read())
+                        expected = _expected_members(manifest)
+                        self._reserve(manifest, local)
+                        continue
+                    entry = expected.get(member.name)
+                    if entry is None:
+                        raise ValueError(f"unexpected state member: {member.name}")
+                    if member.name in received:
+                        raise ValueError(f"duplicate state member: {member.name}")
+                    received.add(member.name)
+                    if member.name == HISTORY_NAME:
+                        history = _parse_history(_read_verified(source, entry))
+                    elif member.name.startswith("configs/"):
+                        configs[entry["file"]] = _read_verified(source, entry)
+                    else:
+                        self._receive_model(source, entry, local, pending, result)
+            if manifest is None:
+                raise ValueError("state manifest missing")
+            missing = sorted(name for name, entry in expected.items() if name not in received)
+            if missing:
+                raise ValueError(f"state members missing: {', '.join(missing)}")
+            for entry in manifest["models"]:
+                if not entry["included"]:
+                    self._link_model(entry, local, pending, result)
+            for name, data in configs.items():
+                target = self.config_manager.config_dir / name
+                if target.exists() and target.read_bytes() == data:
+                    result["configs"]["unchanged"].append(name)
+                    continue
+                self.config_manager.parser.validate(name, data)
+            self._commit(manifest, pending, configs, result)
+            result["history_added"] = self.history_manager.merge(history) if history else 0
+        finally:
+            for partial in pending.values():
+                partial.unlink(missing_ok=True)
+        return result
+
+    def _plan(self, known: set) -> Tuple[Dict[str, Any], List[Tuple[str, _Source, int]]]:
+        members: List[Tuple[str, _Source, int]] = []
+        models = []
+        for name in self.model_manager.list_models():
+            path = self.model_manager.model_dir / name
+            size = path.stat().st_size
+            digest = self.model_manager.stored_hash(path)
+            if digest is None:
+                digest = _file_sha256(path)
+                self.model_manager.record_hash(path, digest)
+            included = digest not in known
+            models.append({"file": name, "size": size, "sha256": digest, "included": included})
+            if included:
+                members.append((f"models/{name}", path, size))
+        configs = []
+        for name in self.config_manager.list_configs():
+            data = (self.config_manager.config_dir / name).read_bytes()
+            configs.append({"file": name, "size": len(data), "sha256": hashlib.sha256(data).hexdigest()})
+            members.append((f"configs/{name}", data, len(data)))
+        history_entry = None
+        history_file = self.history_manager.history_file
+        if history_file.exists():
+            data = history_file.read_bytes()
+            history_entry = {"size": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+            members.append((HISTORY_NAME, data, len(data)))
+        bundles = {}
+        for name in self.bundle_manager.list_bundles():
+            try:
+                bundles[name] = self.bundle_manager.get_bundle(name)
+            except (FileNotFoundError, json.JSONDecodeError):
+                continue
+        current_model = self.model_manager.get_current()
+        current_config = self.config_manager.get_current()
+        manifest = {
+            "format": STATE_FORMAT,
+            "created": datetime.now().strftime(TIMESTAMP_FORMAT),
+            "current": {
+                "model": current_model.name if current_model else None,
+                "config": current_config.name if current_config else None,
+            },
+            "models": models,
+            "configs": configs,
+            "history": history_entry,
+            "bundles": bundles,
+        }
+        return manifest, members
+
+    def _stream(
+        self, members: List[Tuple[str, _Source, int]], headers: List[bytes], trailer: int
+    ) -> Iterator[bytes]:
+        for header, (name, source, size) in zip(headers, members):
+            yield header
+            if isinstance(source, bytes):
+                yield source + _padding(size)
+                continue
+            # 模型被替换时旧 inode 仍可读，只有原地修改才会导致大小不一致
+            with source.open("rb") as handle:
+                if os.fstat(handle.fileno()).st_size != size:
+                    raise RuntimeError(f"{name} changed during export")
+                remaining = size
+                while remaining:
+                    chunk = handle.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        raise RuntimeError(f"{name} truncated during export")
+                    remaining -= len(chunk)
+                    yield chunk
+            yield _padding(size)
+        yield bytes(trailer)
+
+    def _local_models(self) -> Dict[str, str]:
+        """本机已有模型：sha256 -> 文件名（只包含已记录哈希的模型）"""
+        local: Dict[str, str] = {}
+        for name in self.model_manager.list_models():
+            digest = self.model_manager.stored_hash(self.model_manager.model_dir / name)
+            if digest:
+                local.setdefault(digest, name)
+        return local
+
+    def _unchanged(self, entry: Dict[str, Any]) -> bool:
+        target = self.model_manager.model_dir / entry["file"]
+        return target.exists() and self.model_manager.stored_hash(target) == entry["sha256"]
+
+    def _reserve(self, manifest: Dict[str, Any], local: Dict[str, str]) -> None:
+        """按需写入的模型总大小预先腾出空间（已有同哈希模型的以硬链接共享，不占空间）"""
+        incoming = sum(
+            entry["size"]
+            for entry in manifest["models"]
+            if entry["sha256"] not in local and not self._unchanged(entry)
+        )
+        if incoming:
+            names = [entry["file"] for entry in manifest["models"]]
+            self.model_manager.make_room(incoming, keep=names + list(local.values()))
+
+    def _receive_model(
+        self,
+        source: IO[bytes],
+        entry: Dict[str, Any],
+        local: Dict[str, str],
+        pending: Dict[str, Path],
+        result: Dict[str, Any],
+    ) -> None:
+        if self._unchanged(entry):
+            result["models"]["unchanged"].append(entry["file"])
+            return  # 未读取的成员数据由 tarfile 跳过
+        if entry["sha256"] in local:
+            self._link_model(entry, local, pending, result)
+            return
+        target = self.model_manager.model_dir / entry["file"]
+        partial = target.with_name(f".{target.name}.import")
+        pending[entry["file"]] = partial
+        digest = hashlib.sha256()
+        with partial.open("wb") as handle:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                handle.write(chunk)
+        if digest.hexdigest() != entry["sha256"]:
+            raise ValueError(f"sha256 mismatch for {entry['file']}")
+        result["models"]["written"].append(entry["file"])
+        result["bytes_written"] += entry["size"]
+
+    def _link_model(
+        self,
+        entry: Dict[str, Any],
+        local: Dict[str, str],
+        pending: Dict[str, Path],
+        result: Dict[str, Any],
+    ) -> None:
+        if self._unchanged(entry):
+            result["models"]["unchanged"].append(entry["file"])
+            return
+        existing = local.get(entry["sha256"])
+        if existing is None:
+            raise ValueError(f"{entry['file']} was not included and no local model has sha256 {entry['sha256']}")
+        target = self.model_manager.model_dir / entry["file"]
+        partial = target.with_name(f".{target.name}.import")
+        partial.unlink(missing_ok=True)
+        pending[entry["file"]] = partial
+        try:
+            os.link(self.model_manager.model_dir / existing, partial)
+        except OSError:
+            shutil.copyfile(self.model_manager.model_dir / existing, partial)
+        result["models"]["linked"].append(entry["file"])
+
+    def _commit(
+        self,
+        manifest: Dict[str, Any],
+        pending: Dict[str, Path],
+        configs: Dict[str, bytes],
+        result: Dict[str, Any],
+    ) -> None:
+        hashes = {entry["file"]: entry["sha256"] for entry in manifest["models"]}
+        for name, partial in list(pending.items()):
+            target = self.model_manager.model_dir / name
+            os.replace(partial, target)
+            del pending[name]
+            self.model_manager.record_hash(target, hashes[name])
+        ensure_dir(self.config_manager.config_dir)
+        for name, data in configs.items():
+            if name in result["configs"]["unchanged"]:
+                continue
+            target = self.config_manager.config_dir / name
+            self.config_manager.snapshot_existing(target)
+            partial = target.with_name(f".{name}.import")
+            partial.write_bytes(data)
+            os.replace(partial, target)
+            self.config_manager.versions.record(name, data, "import")
+            result["configs"]["written"].append(name)
+        ensure_dir(self.bundle_manager.bundle_dir)
+        for name, record in manifest["bundles"].items():
+            (self.bundle_manager.bundle_dir / f"{name}.json").write_text(json.dumps(record, indent=2))
+            result["bundles"].append(name)
+        current = manifest["current"]
+        if current.get("model") in hashes:
+            self.model_manager.set_current(self.model_manager.model_dir / current["model"])
+        if current.get("config") in configs:
+            self.config_manager.set_current(self.config_manager.config_dir / current["config"])
+        result["current"] = current
+
+
+def _parse_manifest(raw: bytes) -> Dict[str, Any]:
+    try:
+        manifest = json.loads(raw)
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"invalid manifest: {exc}") from exc
+    if not isinstance(manifest, dict) or manifest.get("format") != STATE_FORMAT:
+        raise ValueError(f"invalid manifest: expected state format {STATE_FORMAT}")
+    for key in ("models", "configs"):
+        entries = manifest.get(key)
+        if not isinstance(entries, list):
+            raise ValueError(f"invalid manifest: {key} must be a list")
+        names = set()
+        for entry in entries:
+            if not isinstance(entry, dict) or not entry.get("file") or not entry.get("sha256"):
+                raise ValueError(f"invalid manifest: {key} entries need file and sha256")
+            entry["file"] = Path(str(entry["file"])).name
+            if entry["file"].startswith(".") or entry["file"] in names:
+                raise ValueError(f"invalid manifest: bad or duplicate file name {entry['file']!r}")
+            names.add(entry["file"])
+            entry["sha256"] = str(entry["sha256"]).lower()
+            entry["size"] = int(entry.get("size") or 0)
+            entry.setdefault("included", True)
+    bundles = manifest.get("bundles") or {}
+    if not isinstance(bundles, dict):
+        raise ValueError("invalid manifest: bundles must be an object")
+    manifest["bundles"] = {
+        Path(str(name)).name: record
+        for name, record in bundles.items()
+        if isinstance(record, dict) and Path(str(name)).name not in ("", ".", "..")
+    }
+    current = manifest.get("current")
+    manifest["current"] = current if isinstance(current, dict) else {}
+    return manifest
+
+
+def _expected_members(manifest: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    expected = {f"models/{entry['file']}": entry for entry in manifest["models"] if entry["included"]}
+    expected.update({f"configs/{entry['file']}": entry for entry in manifest["configs"]})
+    history = manifest.get("history")
+    if isinstance(history, dict) and history.get("sha256"):
+        expected[HISTORY_NAME] = {"file": HISTORY_NAME, "sha256": str(history["sha256"]).lower()}
+    return expected
+
+
+def _parse_history(raw: bytes) -> List[Dict[str, Any]]:
+    try:
+        records = json.loads(raw)
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"invalid history: {exc}") from exc
+    if not isinstance(records, list):
+        raise ValueError("invalid history: expected a list")
+    return records
+
+
+def _read_verified(source: IO[bytes], entry: Dict[str, Any]) -> bytes:
+    data = source.read()
+    if hashlib.sha256(data).hexdigest() != entry["sha256"]:
+        raise ValueError(f"sha256 mismatch for {entry['file']}")
+    return data
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        while True:
+            chunk = handle.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _tar_header(name: str, size: int, mtime: int) -> bytes:
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mtime = mtime
+    info.mode = 0o644
+    return info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+
+
+def _padded(size: int, block: int = tarfile.BLOCKSIZE) -> int:
+    return -(-size // block) * block
+
+
+def _padding(size: int) -> bytes:
+    return bytes(_padded(size) - size)
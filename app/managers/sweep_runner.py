@@ -0,0 +1,438 @@
+"""
+模型/配置基准扫描
+
+按模型 × 配置的网格依次运行推理，每组运行固定时长或帧数：
+从子进程输出中解析吞吐（fps）与延迟，同时采样进程 RSS、CPU 占用和板温，
+最终生成按吞吐（或延迟）排序的对比报告（JSON + CSV）。
+报告与取消标记都保存在扫描目录中，多个 worker 均可查询或取消。
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import csv
+import io
+import json
+import os
+import re
+import statistics
+import threading
+import time
+import uuid
+
+from app.managers.config_manager import ConfigManager
+from app.managers.inference_manager import InferenceManager
+from app.managers.inference_state import proc_start_ticks
+from app.managers.model_manager import ModelManager
+from app.managers.system_monitor import SystemMonitor
+from app.utils import TIMESTAMP_FORMAT, ensure_dir
+
+FPS_PATTERN = re.compile(rb"\bfps\s*[=:]\s*([0-9]+(?:\.[0-9]+)?)", re.IGNORECASE)
+LATENCY_PATTERN = re.compile(rb"\blatency\s*[=:]\s*([0-9]+(?:\.[0-9]+)?)\s*ms", re.IGNORECASE)
+FRAME_PATTERN = re.compile(rb"\bframe\s*[=:]\s*[0-9]+", re.IGNORECASE)
+
+RANK_KEYS = ("fps", "latency")
+CSV_FIELDS = (
+    "rank",
+    "model",
+    "config",
+    "status",
+    "frames",
+    "seconds",
+    "fps_mean",
+    "fps_min",
+    "latency_mean_ms",
+    "latency_p50_ms",
+    "latency_p95_ms",
+    "rss_peak_mb",
+    "cpu_mean",
+    "temperature_max",
+    "exit_code",
+    "error",
+)
+
+
+class _RunMetrics:
+    """增量解析日志并汇总单组运行的指标"""
+
+    def __init__(self, log_file: Path) -> None:
+        self.log_file = log_file
+        self.offset = 0
+        self.pending = b""
+        self.frames = 0
+        self.fps: List[float] = []
+        self.latency: List[float] = []
+        self.rss: List[float] = []
+        self.cpu: List[float] = []
+        self.temperature: List[float] = []
+
+    def read_log(self) -> None:
+        try:
+            with self.log_file.open("rb") as handle:
+                handle.seek(self.offset)
+                chunk = handle.read()
+        except OSError:
+            return
+        self.offset += len(chunk)
+        lines = (self.pending + chunk).split(b"\n")
+        self.pending = lines.pop()
+        for line in lines:
+            fps = FPS_PATTERN.search(line)
+            latency = LATENCY_PATTERN.search(line)
+            if fps:
+                self.fps.append(float(fps.group(1)))
+            if latency:
+                self.latency.append(float(latency.group(1)))
+            if fps or latency or FRAME_PATTERN.search(line):
+                self.frames += 1
+
+    def add_sample(self, sample: Optional[Dict[str, float]]) -> None:
+        if not sample:
+            return
+        self.rss.append(sample["rss"])
+        self.cpu.append(sample["cpu_percent"])
+        if sample["temperature"]:
+            self.temperature.append(sample["temperature"])
+
+    def summary(self, seconds: float) -> Dict[str, Any]:
+        fps_mean = statistics.fmean(self.fps) if self.fps else None
+        if fps_mean is None and self.frames and seconds > 0:
+            fps_mean = self.frames / seconds
+        return {
+            "frames": self.frames,
+            "seconds": round(seconds, 3),
+            "fps_mean": _round(fps_mean),
+            "fps_min": _round(min(self.fps)) if self.fps else None,
+            "latency_mean_ms": _round(statistics.fmean(self.latency)) if self.latency else None,
+            "latency_p50_ms": _round(_percentile(self.latency, 50)),
+            "latency_p95_ms": _round(_percentile(self.latency, 95)),
+            "rss_peak_mb": _round(max(self.rss) / (1024 * 1024)) if self.rss else None,
+            # 首个 CPU 采样恒为 0，不计入平均
+            "cpu_mean": _round(statistics.fmean(self.cpu[1:])) if len(self.cpu) > 1 else None,
+            "temperature_max": _round(max(self.temperature)) if self.temperature else None,
+        }
+
+
+def _percentile(values: List[float], percent: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+
+class SweepRunner:
+    """
+    基准扫描执行器
+
+    同一进程内同时只运行一个扫描；推理被其他请求或任务队列占用时，当前组等待空闲后再启动。
+    """
+
+    def __init__(
+        self,
+        inference_manager: InferenceManager,
+        model_manager: ModelManager,
+        config_manager: ConfigManager,
+        system_monitor: SystemMonitor,
+        sweep_dir: Path,
+    ) -> None:
+        self.inference_manager = inference_manager
+        self.model_manager = model_manager
+        self.config_manager = config_manager
+        self.system_monitor = system_monitor
+        self.sweep_dir = sweep_dir
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(
+        self,
+        models: List[str],
+        configs: List[str],
+        duration: Optional[float] = None,
+        frames: Optional[int] = None,
+        interval: float = 0.5,
+        rank_by: str = "fps",
+    ) -> Dict[str, Any]:
+        """
+        启动扫描（后台线程）
+
+        Args:
+            models: 模型文件名列表，为空时使用全部模型
+            configs: 配置文件名列表，为空时使用全部配置
+            duration: 每组运行秒数
+            frames: 每组运行帧数，达到后提前结束（与 duration 同时给出时先到先止）
+            interval: 系统采样间隔（秒）
+            rank_by: 排序依据，fps（吞吐降序）或 latency（p50 延迟升序）
+
+        Returns:
+            初始报告
+
+        Raises:
+            FileNotFoundError: 模型或配置不存在时抛出
+            ValueError: 参数不合法时抛出
+            RuntimeError: 已有扫描在运行时抛出
+        """
+        if duration is None and frames is None:
+            raise ValueError("duration or frames is required")
+        if rank_by not in RANK_KEYS:
+            raise ValueError(f"rank_by must be one of {', '.join(RANK_KEYS)}")
+        model_names = models or self.model_manager.list_models()
+        config_names = configs or self.config_manager.list_configs()
+        for name in model_names:
+            self.model_manager.get_model(name)
+        for name in config_names:
+            self.config_manager.get_config(name)
+        if not model_names or not config_names:
+            raise ValueError("no models or configs to sweep")
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                raise RuntimeError("sweep already running")
+            report = {
+                "id": datetime.now().strftime("%Y%m%d%H%M%S") + "-" + uuid.uuid4().hex[:6],
+                "status": "running",
+                "created_at": datetime.now().strftime(TIMESTAMP_FORMAT),
+                "finished_at": None,
+                "models": model_names,
+                "configs": config_names,
+                "duration": duration,
+                "frames": frames,
+                "rank_by": rank_by,
+                "results": [],
+                # 执行扫描的进程，API 重启后据此识别遗留的 running 扫描
+                "owner_pid": os.getpid(),
+                "owner_start": proc_start_ticks(os.getpid()),
+            }
+            self._save(report)
+            self._thread = threading.Thread(
+                target=self._run, args=(report, interval), name="sweep-runner", daemon=True
+            )
+            self._thread.start()
+        return report
+
+    def cancel(self, sweep_id: str) -> None:
+        """
+        请求取消扫描（写入取消标记，执行中的组会被停止）
+
+        Raises:
+            FileNotFoundError: 扫描不存在时抛出
+        """
+        report = self.get_report(sweep_id)
+        if report["status"] == "running":
+            self._path(sweep_id, ".cancel").touch()
+
+    def close_stale(self) -> int:
+        """把执行进程已不存在、仍为 running 的扫描标记为 interrupted，返回处理的个数"""
+        if not self.sweep_dir.exists():
+            return 0
+        closed = 0
+        for path in sorted(self.sweep_dir.glob("*.json")):
+            try:
+                report = json.loads(path.read_text())
+            except (OSError, json.JSONDecodeError):
+                continue
+            if report.get("status") != "running":
+                continue
+            owner = report.get("owner_pid")
+            if owner and report.get("owner_start") is not None and proc_start_ticks(owner) == report["owner_start"]:
+                continue
+            report["status"] = "interrupted"
+            report["error"] = "API restarted while the sweep was running"
+            report["finished_at"] = datetime.now().strftime(TIMESTAMP_FORMAT)
+            _rank(report["results"], report["rank_by"])
+            self._save(report)
+            self._path(report["id"], ".csv").write_text(_to_csv(report["results"]))
+            self._path(report["id"], ".cancel").unlink(missing_ok=True)
+            closed += 1
+        return closed
+
+    def list_sweeps(self) -> List[Dict[str, Any]]:
+        """列出所有扫描（新的在前），附带排名第一的组合"""
+        if not self.sweep_dir.exists():
+            return []
+        items = []
+        for path in sorted(self.sweep_dir.glob("*.json"), reverse=True):
+            try:
+                report = json.loads(path.read_text())
+            except (OSError, json.JSONDecodeError):
+                continue
+            ranked = [result for result in report["results"] if result.get("rank") == 1]
+            items.append(
+                {
+                    "id": report["id"],
+                    "status": report["status"],
+                    "created_at": report["created_at"],
+                    "finished_at": report["finished_at"],
+                    "runs": len(report["models"]) * len(report["configs"]),
+                    "completed": len(report["results"]),
+                    "best": {key: ranked[0][key] for key in ("model", "config", "fps_mean", "latency_p50_ms")}
+                    if ranked
+                    else None,
+                }
+            )
+        return items
+
+    def referenced_models(self) -> List[str]:
+        """返回运行中扫描尚未跑完的模型"""
+        if not self.sweep_dir.exists():
+            return []
+        models = set()
+        for path in self.sweep_dir.glob("*.json"):
+            try:
+                report = json.loads(path.read_text())
+            except (OSError, json.JSONDecodeError):
+                continue
+            if report.get("status") == "running":
+                models.update(report.get("models") or [])
+        return sorted(models)
+
+    def get_report(self, sweep_id: str) -> Dict[str, Any]:
+        """
+        Raises:
+            FileNotFoundError: 扫描不存在时抛出
+        """
+        path = self._path(sweep_id, ".json")
+        if not path.exists():
+            raise FileNotFoundError("sweep not found")
+        return json.loads(path.read_text())
+
+    def get_csv(self, sweep_id: str) -> str:
+        """返回报告的 CSV 文本（运行中的扫描按当前结果生成）"""
+        path = self._path(sweep_id, ".csv")
+        if path.exists():
+            return path.read_text()
+        return _to_csv(self.get_report(sweep_id)["results"])
+
+    def _run(self, report: Dict[str, Any], interval: float) -> None:
+        cancel_flag = self._path(report["id"], ".cancel")
+        try:
+            for model in report["models"]:
+                for config in report["configs"]:
+                    if cancel_flag.exists():
+                        raise _Cancelled()
+                    result = self._run_one(model, config, report, interval, cancel_flag)
+                    report["results"].append(result)
+                    _rank(report["results"], report["rank_by"])
+                    self._save(report)
+            report["status"] = "done"
+        except _Cancelled:
+            report["status"] = "cancelled"
+        except Exception as exc:  # 记录到报告中，避免后台线程静默退出
+            report["status"] = "failed"
+            report["error"] = str(exc)
+        report["finished_at"] = datetime.now().strftime(TIMESTAMP_FORMAT)
+        _rank(report["results"], report["rank_by"])
+        self._save(report)
+        self._path(report["id"], ".csv").write_text(_to_csv(report["results"]))
+        cancel_flag.unlink(missing_ok=True)
+
+    def _run_one(
+        self,
+        model: str,
+        config: str,
+        report: Dict[str, Any],
+        interval: float,
+        cancel_flag: Path,
+    ) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"model": model, "config": config, "status": "done", "error": None}
+        try:
+            model_path = self.model_manager.get_model(model)
+            config_path = self.config_manager.get_config(config)
+            pid = self._start_when_idle(model_path, config_path, cancel_flag)
+        except (OSError, ValueError) as exc:
+            result.update(status="failed", error=str(exc), exit_code=None, log_file=None)
+            result.update(_RunMetrics(Path(os.devnull)).summary(0.0))
+            return result
+        log_file = self.inference_manager.log_file
+        metrics = _RunMetrics(log_file) if log_file else _RunMetrics(Path(os.devnull))
+        started = time.monotonic()
+        stopped_by_us = False
+        while True:
+            metrics.read_log()
+            status = self.inference_manager.status()
+            if not status.running or status.pid != pid:
+                break
+            metrics.add_sample(self.system_monitor.sample_process(pid))
+            elapsed = time.monotonic() - started
+            reached = (report["duration"] is not None and elapsed >= report["duration"]) or (
+                report["frames"] is not None and metrics.frames >= report["frames"]
+            )
+            if reached or cancel_flag.exists():
+                try:
+                    self.inference_manager.stop()
+                    stopped_by_us = True
+                except RuntimeError:
+                    pass
+                break
+            time.sleep(interval)
+        seconds = time.monotonic() - started
+        metrics.read_log()
+        exit_code = self.inference_manager.status().exit_code
+        if not stopped_by_us and exit_code not in (None, 0):
+            result.update(status="failed", error=f"inference exited with code {exit_code}")
+        if cancel_flag.exists():
+            result["status"] = "cancelled"
+        result.update(metrics.summary(seconds), exit_code=exit_code, log_file=str(log_file) if log_file else None)
+        if result["status"] == "cancelled":
+            raise _Cancelled()
+        return result
+
+    def _start_when_idle(self, model_path: Path, config_path: Path, cancel_flag: Path) -> int:
+        while True:
+            try:
+                return self.inference_manager.start(model_path, config_path)
+            except RuntimeError:
+                if cancel_flag.exists():
+                    raise _Cancelled() from None
+                time.sleep(0.5)
+
+    def _path(self, sweep_id: str, suffix: str) -> Path:
+        if not re.fullmatch(r"[0-9A-Za-z-]+", sweep_id):
+            raise FileNotFoundError("sweep not found")
+        return self.sweep_dir / f"{sweep_id}{suffix}"
+
+    def _save(self, report: Dict[str, Any]) -> None:
+        ensure_dir(self.sweep_dir)
+        path = self._path(report["id"], ".json")
+        partial = path.with_name(f".{path.name}.partial")
+        partial.write_text(json.dumps(report, indent=2))
+        os.replace(partial, path)
+
+
+class _Cancelled(Exception):
+    pass
+
+
+def _rank(results: List[Dict[str, Any]], rank_by: str) -> None:
+    """按吞吐降序（或 p50 延迟升序）排列结果，缺少指标的组合排在最后且不参与排名"""
+
+    def key(result: Dict[str, Any]) -> Any:
+        fps = result.get("fps_mean")
+        latency = result.get("latency_p50_ms")
+        if rank_by == "latency":
+            return (latency is None, latency if latency is not None else 0.0, -(fps or 0.0))
+        return (fps is None, -(fps or 0.0), latency if latency is not None else float("inf"))
+
+    results.sort(key=key)
+    rank = 0
+    for result in results:
+        metric = result.get("latency_p50_ms" if rank_by == "latency" else "fps_mean")
+        if result["status"] == "done" and metric is not None:
+            rank += 1
+            result["rank"] = rank
+        else:
+            result["rank"] = None
+
+
+def _to_csv(results: List[Dict[str, Any]]) -> str:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for result in results:
+        writer.writerow(result)
+    return buffer.getvalue()
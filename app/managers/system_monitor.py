@@ -1,13 +1,26 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 import os
 
-import psutil
+_psutil_module: Any = None
+
+
+def _psutil() -> Any:
+    """返回 psutil 模块；首次采样时才导入，不计入应用启动耗时"""
+    global _psutil_module
+    if _psutil_module is None:
+        import psutil
+
+        _psutil_module = psutil
+    return _psutil_module
 
 
 class SystemMonitor:
+    def __init__(self) -> None:
+        self._processes: Dict[int, Any] = {}
+
     def get_status(self) -> Dict[str, Any]:
         return {
             "memory_usage": self._memory_usage(),
@@ -16,8 +29,28 @@ class SystemMonitor:
             "uptime": self._uptime_seconds(),
         }
 
+    def sample_process(self, pid: int) -> Optional[Dict[str, float]]:
+        """
+        采样指定进程的常驻内存、CPU 占用与当前板温
+
+        cpu_percent 为距上次采样同一进程的平均值（首次采样为 0）；进程不存在时返回None。
+        """
+        psutil = _psutil()
+        process = self._processes.get(pid)
+        try:
+            if process is None:
+                process = psutil.Process(pid)
+                self._processes = {pid: process}
+            with process.oneshot():
+                rss = process.memory_info().rss
+                cpu = process.cpu_percent(interval=None)
+        except psutil.Error:
+            self._processes.pop(pid, None)
+            return None
+        return {"rss": float(rss), "cpu_percent": float(cpu), "temperature": self._temperature()["current"]}
+
     def _memory_usage(self) -> Dict[str, float]:
-        vm = psutil.virtual_memory()
+        vm = _psutil().virtual_memory()
         return {
             "total": vm.total,
             "used": vm.used,
@@ -33,11 +66,11 @@ class SystemMonitor:
             "load1": float(load1),
             "load5": float(load5),
             "load15": float(load15),
-            "cpu_percent": psutil.cpu_percent(interval=None),
+            "cpu_percent": _psutil().cpu_percent(interval=None),
         }
 
     def _temperature(self) -> Dict[str, float]:
-        temps = psutil.sensors_temperatures(fahrenheit=False) or {}
+        temps = _psutil().sensors_temperatures(fahrenheit=False) or {}
         if not temps:
             return {"current": 0.0}
         readings = [t.current for group in temps.values() for t in group if t.current is not None]
@@ -46,4 +79,4 @@ class SystemMonitor:
         return {"current": float(max(readings))}
 
     def _uptime_seconds(self) -> float:
-        return float(datetime.now(timezone.utc).timestamp() - psutil.boot_time())
+        return float(datetime.now(timezone.utc).timestamp() - _psutil().boot_time())
@@ -0,0 +1,202 @@
+"""
+请求级采样分析
+
+按比例（或携带管理员请求头时）对请求进行统计采样：后台线程以固定间隔抓取
+处理该请求的线程（事件循环线程与执行同步接口的线程池线程）的调用栈，
+请求结束后汇总为 flamegraph 可直接使用的 collapsed stacks。
+未启用时不注册中间件，对请求路径没有任何开销。
+"""
+
+from __future__ import annotations
+
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterator, List, Optional
+import hmac
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+
+from app.utils import TIMESTAMP_FORMAT
+
+PROFILE_HEADER = b"x-profile"
+IDLE_FILES = ("threading.py", "selectors.py", "queue.py", "thread.py", "base_events.py")
+IDLE_FUNCTIONS = {"wait", "select", "poll", "get", "_worker", "_run_once", "_wait_for_tstate_lock"}
+
+# 当前请求的采样器；contextvars 随 run_in_threadpool 传入线程池，同步接口据此登记所在线程
+_active: ContextVar[Optional["_Sampler"]] = ContextVar("profiling_sampler", default=None)
+
+
+def token_matches(value: Optional[str], token: str) -> bool:
+    """请求头中的令牌是否与管理员令牌一致（未配置令牌时总是 False）"""
+    return bool(token) and value is not None and hmac.compare_digest(value.encode(), token.encode())
+
+
+@contextmanager
+def handler_thread() -> Iterator[None]:
+    """在同步接口执行期间把当前线程登记到本请求的采样器（未采样时无操作）"""
+    sampler = _active.get()
+    if sampler is None:
+        yield
+        return
+    ident = threading.get_ident()
+    sampler.threads.add(ident)
+    try:
+        yield
+    finally:
+        sampler.threads.discard(ident)
+
+
+class ProfileStore:
+    """保存最近 N 次采样结果的有界存储"""
+
+    def __init__(self, keep: int = 50) -> None:
+        self._profiles: Deque[Dict[str, Any]] = deque(maxlen=keep)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, profile: Dict[str, Any]) -> None:
+        with self._lock:
+            profile["id"] = next(self._ids)
+            self._profiles.append(profile)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {key: value for key, value in profile.items() if key != "stacks"}
+                for profile in reversed(self._profiles)
+            ]
+
+    def collapsed(self, profile_id: int) -> str:
+        """
+        返回 collapsed stacks 文本（每行 "frame;frame;... count"）
+
+        Raises:
+            KeyError: 采样记录不存在时抛出
+        """
+        with self._lock:
+            for profile in self._profiles:
+                if profile["id"] == profile_id:
+                    stacks: Counter = profile["stacks"]
+                    return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+        raise KeyError(profile_id)
+
+
+class _Sampler(threading.Thread):
+    """在请求期间以固定间隔采样处理该请求的线程（threads）中非空闲线程的调用栈"""
+
+    def __init__(self, interval: float, thread: int) -> None:
+        super().__init__(name="request-profiler", daemon=True)
+        self.interval = interval
+        self.threads = {thread}
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(self.threads):
+                frame = frames.get(ident)
+                if frame is None or _is_idle(frame):
+                    continue
+                self.stacks[_collapse(names.get(ident, str(ident)), frame)] += 1
+            self.samples += 1
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+def _is_idle(frame: Any) -> bool:
+    code = frame.f_code
+    return code.co_name in IDLE_FUNCTIONS and code.co_filename.endswith(IDLE_FILES)
+
+
+def _collapse(thread_name: str, frame: Any) -> str:
+    parts: List[str] = []
+    while frame is not None:
+        code = frame.f_code
+        module = os.path.splitext(os.path.basename(code.co_filename))[0]
+        parts.append(f"{module}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    parts.append(thread_name)
+    return ";".join(reversed(parts))
+
+
+class ProfilingMiddleware:
+    """
+    ASGI 采样中间件
+
+    Args:
+        app: 下游 ASGI 应用
+        store: 采样结果存储
+        rate: 随机采样比例（0~1）
+        token: 管理员令牌，请求头 X-Profile 与之相等时强制采样（读取采样结果同样需要该令牌）
+        interval: 栈采样间隔（秒）
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        store: ProfileStore,
+        rate: float = 0.0,
+        token: str = "",
+        interval: float = 0.002,
+    ) -> None:
+        self.app = app
+        self.store = store
+        self.rate = rate
+        self.token = token
+        self.interval = interval
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        status: Optional[int] = None
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        sampler = _Sampler(self.interval, threading.get_ident())
+        started = time.perf_counter()
+        sampler.start()
+        active = _active.set(sampler)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _active.reset(active)
+            sampler.stop()
+            self.store.add(
+                {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query": scope.get("query_string", b"").decode("latin-1"),
+                    "status": status,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                    "samples": sampler.samples,
+                    "created": datetime.now().strftime(TIMESTAMP_FORMAT),
+                    "stacks": sampler.stacks,
+                }
+            )
+
+    def _should_profile(self, scope: Dict[str, Any]) -> bool:
+        if scope["path"].startswith("/debug/profiles"):
+            return False
+        if self.token:
+            for name, value in scope.get("headers", []):
+                if name == PROFILE_HEADER and token_matches(value.decode("latin-1"), self.token):
+                    return True
+        return self.rate > 0 and random.random() < self.rate
@@ -0,0 +1,106 @@
+"""
+JSON 响应序列化
+
+- FastJSONResponse：优先用 orjson 序列化（未安装时回退到标准库 json），直接支持 dataclass、datetime、Path 等。
+- FastJSONRoute：接口返回 dict/list/dataclass 时直接交给响应类序列化，跳过 FastAPI 按返回值注解
+  推断的 response_model 校验以及 jsonable_encoder 的逐层遍历——本项目接口返回的都是已整理好的结构。
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, is_dataclass
+from datetime import date, datetime
+from enum import Enum
+from pathlib import PurePath
+from typing import Any, Callable, Type
+import asyncio
+import json
+
+from fastapi.datastructures import Default, DefaultPlaceholder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from starlette.responses import Response
+
+from app.profiling import handler_thread
+
+try:
+    import orjson
+except ImportError:  # 可选依赖，缺失时回退到标准库 json
+    orjson = None  # type: ignore[assignment]
+
+
+def _default(value: Any) -> Any:
+    """orjson/json 不能直接处理的类型"""
+    if isinstance(value, PurePath):
+        return str(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if is_dataclass(value) and not isinstance(value, type):
+        return asdict(value)
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """序列化为紧凑的 UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """orjson 序列化的 JSON 响应"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class FastJSONRoute(APIRoute):
+    """
+    直接序列化返回值的路由
+
+    未显式指定 response_model 时不按返回值注解推断；返回值不是 Response 时由路由的
+    response_class（JSONResponse 替换为 FastJSONResponse）直接构造响应。
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], *, response_model: Any = Default(None), **kwargs: Any) -> None:
+        if isinstance(response_model, DefaultPlaceholder):
+            response_model = None
+        super().__init__(path, endpoint, response_model=response_model, **kwargs)
+
+    def get_route_handler(self) -> Callable[..., Any]:
+        if self.response_model is None and self.dependant.call is self.endpoint:
+            response_class = self.response_class
+            if isinstance(response_class, DefaultPlaceholder):
+                response_class = response_class.value
+            if response_class is JSONResponse:
+                response_class = FastJSONResponse
+            self.dependant.call = _direct_response(self.endpoint, response_class, self.status_code or 200)
+        return super().get_route_handler()
+
+
+def _direct_response(call: Callable[..., Any], response_class: Type[Response], status_code: int) -> Callable[..., Any]:
+    def convert(value: Any) -> Any:
+        if isinstance(value, Response):
+            return value
+        return response_class(value, status_code=status_code)
+
+    if asyncio.iscoroutinefunction(call):
+        async def async_endpoint(**values: Any) -> Any:
+            return convert(await call(**values))
+
+        return async_endpoint
+
+    def endpoint(**values: Any) -> Any:
+        # 同步接口在线程池中执行，登记所在线程供请求采样只抓取该线程
+        with handler_thread():
+            return convert(call(**values))
+
+    return endpoint
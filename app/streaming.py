@@ -0,0 +1,115 @@
+"""
+流式请求体工具
+
+把 Starlette 的异步请求体转换为同步可读的文件对象，
+使 tarfile 等同步解析器可以边接收边处理，而无需先缓存整个请求体。
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Optional, TypeVar
+import asyncio
+import io
+import queue
+
+from starlette.requests import Request
+
+T = TypeVar("T")
+
+
+class RequestStreamReader(io.RawIOBase):
+    """
+    基于有界队列的同步读取端
+
+    事件循环一侧调用 feed() 写入数据块，工作线程一侧通过 read()/readinto() 读取。
+    队列有界，因此消费较慢时会对上传形成背压，内存占用保持恒定。
+    """
+
+    def __init__(self, max_chunks: int = 16) -> None:
+        super().__init__()
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue(max_chunks)
+        self._buffer = b""
+        self._eof = False
+        self._abandoned = False
+
+    def readable(self) -> bool:
+        return True
+
+    def try_feed(self, chunk: bytes) -> bool:
+        """非阻塞写入，队列已满时返回False"""
+        if self._abandoned:
+            return True
+        try:
+            self._queue.put_nowait(chunk)
+        except queue.Full:
+            return False
+        return True
+
+    def feed(self, chunk: Optional[bytes]) -> None:
+        """阻塞写入数据块；None 表示请求体结束。读取端放弃后直接丢弃。"""
+        while not self._abandoned:
+            try:
+                self._queue.put(chunk, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def abandon(self) -> None:
+        """读取端不再需要更多数据（处理完成或失败）"""
+        self._abandoned = True
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+    def readinto(self, buffer: Any) -> int:
+        while not self._buffer and not self._eof:
+            chunk = self._queue.get()
+            if chunk is None:
+                self._eof = True
+            else:
+                self._buffer = chunk
+        if not self._buffer:
+            return 0
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+async def consume_request_stream(
+    request: Request,
+    func: Callable[..., T],
+    *args: Any,
+) -> T:
+    """
+    在工作线程中以同步文件对象的方式消费请求体
+
+    Args:
+        request: 当前请求
+        func: 同步处理函数，第一个参数为可读的文件对象
+        *args: 传给处理函数的其余参数
+
+    Returns:
+        处理函数的返回值
+    """
+    reader = RequestStreamReader()
+    loop = asyncio.get_running_loop()
+
+    def _run() -> T:
+        try:
+            return func(io.BufferedReader(reader), *args)
+        finally:
+            reader.abandon()
+
+    future = loop.run_in_executor(None, _run)
+    try:
+        async for chunk in request.stream():
+            if future.done():
+                break
+            if chunk and not reader.try_feed(chunk):
+                await loop.run_in_executor(None, reader.feed, chunk)
+    finally:
+        await loop.run_in_executor(None, reader.feed, None)
+    return await future
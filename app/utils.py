@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
+import os
 
 TIMESTAMP_FORMAT = "%Y-%m-%d_%H:%M:%S"
 
@@ -24,3 +26,15 @@ def safe_resolve(base_dir: Path, user_path: str) -> Path:
 
 def parse_timestamp(value: str) -> datetime:
     return datetime.strptime(value, TIMESTAMP_FORMAT)
+
+
+def process_age_seconds() -> Optional[float]:
+    """返回当前进程自 exec 以来的秒数（基于 /proc），不可用时返回None"""
+    try:
+        stat = Path("/proc/self/stat").read_text()
+        uptime = float(Path("/proc/uptime").read_text().split()[0])
+    except (OSError, ValueError):
+        return None
+    fields = stat.rsplit(")", 1)[1].split()
+    started_ticks = int(fields[19])
+    return uptime - started_ticks / os.sysconf("SC_CLK_TCK")
@@ -0,0 +1,315 @@
+"""
+API 热点接口基准测试
+
+两种驱动方式：
+- inprocess: 在当前进程内通过 TestClient 顺序请求，测量处理函数本身的开销；
+- uvicorn: 启动真实的 uvicorn 进程，多个并发客户端同时请求。
+
+每个接口报告 p50/p99 延迟、吞吐和服务进程峰值 RSS，结果保存为 JSON，
+可通过 --compare 与历史基线比较，超出阈值时以非零状态退出。
+
+用法：
+    python benchmarks/bench_api.py --save benchmarks/baselines/local.json
+    python benchmarks/bench_api.py --compare benchmarks/baselines/local.json
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+repo_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(repo_root))
+
+import httpx
+import psutil
+
+from benchmarks.fixtures import FixtureSpec, build_fixtures, existing_fixtures
+
+ENDPOINTS: List[Tuple[str, str, Dict[str, Any]]] = [
+    ("logs_tail", "/logs", {"tail": 200}),
+    ("history", "/history", {"limit": 50}),
+    ("status_system", "/status/system", {}),
+    ("inference_status", "/inference/status", {}),
+    ("model_list", "/model/list", {}),
+    ("config_list", "/config/list", {}),
+    ("version", "/version", {}),
+]
+
+
+class RssSampler:
+    """后台线程定期采样进程 RSS，记录峰值"""
+
+    def __init__(self, pid: int, interval: float = 0.02) -> None:
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self) -> "RssSampler":
+        self.peak = self.process.memory_info().rss
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.peak = max(self.peak, self.process.memory_info().rss)
+            except psutil.Error:
+                return
+            self._stop.wait(self.interval)
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    position = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[position]
+
+
+def _summarize(latencies: List[float], elapsed: float, errors: int, peak_rss: int) -> Dict[str, Any]:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+        "peak_rss_mb": round(peak_rss / (1024 * 1024), 2),
+    }
+
+
+def _fixture_env(paths: Dict[str, Path], root: Path) -> Dict[str, str]:
+    return {
+        "PI_INFER_BASE_DIR": str(repo_root),
+        "PI_INFER_DATA_DIR": str(root),
+        "PI_INFER_LOG_DIR": str(paths["log_dir"]),
+        "PI_INFER_MODEL_DIR": str(paths["model_dir"]),
+        "PI_INFER_CONFIG_DIR": str(paths["config_dir"]),
+        "PI_INFER_HISTORY_FILE": str(paths["history_file"]),
+        "PI_INFER_BINARY": str(repo_root / "tests" / "fake_infer.py"),
+        "PI_INFER_LOG_RETENTION_DAYS": "3650",
+    }
+
+
+def run_inprocess(env: Dict[str, str], requests: int) -> Dict[str, Any]:
+    """在当前进程内顺序请求每个接口"""
+    os.environ.update(env)
+    from fastapi.testclient import TestClient
+
+    from app.config import load_settings
+    from app.main import create_app
+
+    client = TestClient(create_app(load_settings()))
+    results: Dict[str, Any] = {}
+    for name, path, params in ENDPOINTS:
+        client.get(path, params=params)
+        latencies: List[float] = []
+        errors = 0
+        with RssSampler(os.getpid()) as sampler:
+            started = time.perf_counter()
+            for _ in range(requests):
+                begin = time.perf_counter()
+                response = client.get(path, params=params)
+                latencies.append(time.perf_counter() - begin)
+                errors += response.status_code >= 400
+            elapsed = time.perf_counter() - started
+        results[name] = _summarize(latencies, elapsed, errors, sampler.peak)
+    return results
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def run_uvicorn(env: Dict[str, str], requests: int, concurrency: int) -> Dict[str, Any]:
+    """启动 uvicorn 子进程，并发客户端请求每个接口"""
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=str(repo_root),
+        env={**os.environ, **env},
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_ready(base_url, server)
+        results: Dict[str, Any] = {}
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        with httpx.Client(base_url=base_url, limits=limits, timeout=60) as client:
+            for name, path, params in ENDPOINTS:
+                client.get(path, params=params)
+                results[name] = _drive_concurrent(
+                    lambda: client.get(path, params=params).status_code,
+                    requests,
+                    concurrency,
+                    server.pid,
+                )
+        return results
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def _wait_ready(base_url: str, server: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("uvicorn exited before becoming ready")
+        try:
+            if httpx.get(f"{base_url}/version", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    raise RuntimeError("uvicorn did not become ready")
+
+
+def _drive_concurrent(
+    call: Callable[[], int], requests: int, concurrency: int, server_pid: int
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+    per_worker = max(1, requests // concurrency)
+
+    def worker() -> None:
+        nonlocal errors
+        local: List[float] = []
+        failed = 0
+        for _ in range(per_worker):
+            begin = time.perf_counter()
+            try:
+                failed += call() >= 400
+            except httpx.HTTPError:
+                failed += 1
+            local.append(time.perf_counter() - begin)
+        with lock:
+            latencies.extend(local)
+            errors += failed
+
+    with RssSampler(server_pid) as sampler:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for future in [pool.submit(worker) for _ in range(concurrency)]:
+                future.result()
+        elapsed = time.perf_counter() - started
+    return _summarize(latencies, elapsed, errors, sampler.peak)
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """比较两次结果，返回延迟超出 baseline*threshold 的条目说明"""
+    regressions: List[str] = []
+    for mode, endpoints in current["results"].items():
+        for name, stats in endpoints.items():
+            base = baseline.get("results", {}).get(mode, {}).get(name)
+            if not base:
+                continue
+            for metric in ("p50_ms", "p99_ms"):
+                if base[metric] > 0 and stats[metric] > base[metric] * threshold:
+                    regressions.append(
+                        f"{mode}/{name} {metric}: {base[metric]} -> {stats[metric]}"
+                    )
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=str(repo_root), capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("inprocess", "uvicorn", "both"), default="both")
+    parser.add_argument("--requests", type=int, default=200, help="每个接口的请求数")
+    parser.add_argument("--concurrency", type=int, default=8, help="uvicorn 模式的并发客户端数")
+    parser.add_argument("--log-mb", type=int, default=64, help="日志总量（MB）")
+    parser.add_argument("--history", type=int, default=10_000, help="历史记录条数")
+    parser.add_argument("--models", type=int, default=200, help="模型与配置数量")
+    parser.add_argument(
+        "--data-dir",
+        type=Path,
+        default=None,
+        help="数据目录；其中已有按相同参数生成的数据时直接复用，否则在此生成（默认使用临时目录）",
+    )
+    parser.add_argument("--save", type=Path, default=None, help="保存结果 JSON 的路径")
+    parser.add_argument("--compare", type=Path, default=None, help="用于比较的基线 JSON")
+    parser.add_argument("--threshold", type=float, default=1.25, help="判定回归的延迟倍数")
+    args = parser.parse_args()
+
+    spec = FixtureSpec(
+        log_mb=args.log_mb,
+        history_entries=args.history,
+        models=args.models,
+        configs=args.models,
+    )
+    with tempfile.TemporaryDirectory(prefix="pi-infer-bench-") as scratch:
+        root = args.data_dir or Path(scratch)
+        started = time.perf_counter()
+        paths = existing_fixtures(root, spec)
+        if paths is not None:
+            print(f"reusing fixtures at {root}", file=sys.stderr)
+        else:
+            paths = build_fixtures(root, spec)
+            print(f"fixtures ready in {time.perf_counter() - started:.1f}s at {root}", file=sys.stderr)
+        env = _fixture_env(paths, root)
+
+        results: Dict[str, Any] = {}
+        if args.mode in ("inprocess", "both"):
+            results["inprocess"] = run_inprocess(env, args.requests)
+        if args.mode in ("uvicorn", "both"):
+            results["uvicorn"] = run_uvicorn(env, args.requests, args.concurrency)
+
+    report = {
+        "meta": {
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "fixtures": spec.__dict__,
+        },
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(report, indent=2))
+    if args.compare:
+        regressions = compare(report, json.loads(args.compare.read_text()), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
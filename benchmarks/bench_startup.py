@@ -0,0 +1,88 @@
+"""
+启动耗时基准测试
+
+反复冷启动 uvicorn 进程，测量从 exec 到 /version 首次返回 200 的时间，
+中位数超过 --budget 时以非零状态退出，可在 CI 或板端作为启动耗时的守护。
+
+用法：
+    python benchmarks/bench_startup.py --runs 5 --budget 2.0
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+repo_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(repo_root))
+
+import httpx
+
+from benchmarks.bench_api import _free_port
+
+
+def measure_once(data_dir: Path) -> dict:
+    """启动一次 uvicorn，返回首个 200 的耗时与 /version 报告的启动信息"""
+    port = _free_port()
+    env = {
+        **os.environ,
+        "PI_INFER_DATA_DIR": str(data_dir),
+        "PI_INFER_BINARY": str(repo_root / "tests" / "fake_infer.py"),
+    }
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=str(repo_root),
+        env=env,
+    )
+    try:
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn exited before becoming ready")
+            try:
+                response = httpx.get(f"http://127.0.0.1:{port}/version", timeout=1)
+                if response.status_code == 200:
+                    return {
+                        "first_200_seconds": round(time.perf_counter() - started, 4),
+                        "reported": response.json().get("startup"),
+                    }
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.005)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=2.0, help="首个 200 的中位数上限（秒）")
+    args = parser.parse_args()
+
+    runs: List[dict] = []
+    with tempfile.TemporaryDirectory(prefix="pi-infer-startup-") as scratch:
+        for _ in range(args.runs):
+            runs.append(measure_once(Path(scratch)))
+    first_200 = [run["first_200_seconds"] for run in runs]
+    report = {
+        "median_first_200_seconds": statistics.median(first_200),
+        "max_first_200_seconds": max(first_200),
+        "budget_seconds": args.budget,
+        "runs": runs,
+    }
+    print(json.dumps(report, indent=2))
+    return 0 if report["median_first_200_seconds"] <= args.budget else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,117 @@
+"""
+基准测试数据生成
+
+生成贴近现场的数据目录：大体量日志、上万条历史记录、数百个模型与配置。
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+import json
+
+TIMESTAMP_FORMAT = "%Y-%m-%d_%H:%M:%S"
+LOG_FILE_MB = 64
+MARKER_NAME = ".fixtures.json"  # 生成完成后写入，记录生成参数
+
+
+@dataclass(frozen=True)
+class FixtureSpec:
+    log_mb: int = 64  # 日志总量（MB），GB 级场景使用 1024 以上
+    history_entries: int = 10_000  # 历史记录条数
+    models: int = 200  # 模型文件数量
+    configs: int = 200  # 配置文件数量
+    model_kb: int = 64  # 单个模型文件大小（KB）
+
+
+def fixture_paths(root: Path) -> dict:
+    """各数据目录的路径"""
+    return {
+        "log_dir": root / "logs",
+        "model_dir": root / "models",
+        "config_dir": root / "configs",
+        "history_file": root / "history" / "history.json",
+    }
+
+
+def existing_fixtures(root: Path, spec: FixtureSpec) -> Optional[dict]:
+    """root 下已有按相同参数生成完成的数据时返回各目录路径，否则返回None"""
+    try:
+        generated = json.loads((root / MARKER_NAME).read_text())
+    except (OSError, json.JSONDecodeError):
+        return None
+    return fixture_paths(root) if generated == asdict(spec) else None
+
+
+def build_fixtures(root: Path, spec: FixtureSpec) -> dict:
+    """
+    在 root 下生成 logs/models/configs/history 目录，已存在的同名文件会被覆盖
+
+    Returns:
+        各数据目录路径组成的字典
+    """
+    paths = fixture_paths(root)
+    (root / MARKER_NAME).unlink(missing_ok=True)
+    for key in ("log_dir", "model_dir", "config_dir"):
+        paths[key].mkdir(parents=True, exist_ok=True)
+    paths["history_file"].parent.mkdir(parents=True, exist_ok=True)
+
+    _build_logs(paths["log_dir"], spec.log_mb)
+    _build_history(paths["history_file"], spec.history_entries)
+    _build_models(paths["model_dir"], spec.models, spec.model_kb)
+    _build_configs(paths["config_dir"], spec.configs)
+    (root / MARKER_NAME).write_text(json.dumps(asdict(spec)))
+    return paths
+
+
+def _build_logs(log_dir: Path, total_mb: int) -> None:
+    start = datetime.now() - timedelta(days=1)
+    remaining = total_mb * 1024 * 1024
+    index = 0
+    while remaining > 0:
+        size = min(remaining, LOG_FILE_MB * 1024 * 1024)
+        stamp = (start + timedelta(minutes=index)).strftime(TIMESTAMP_FORMAT)
+        line = f"[{stamp}] [INFO] frame={{:08d}} fps=29.97 latency=33.4ms detections=3\n"
+        block = "".join(line.format(n) for n in range(1000)).encode()
+        with (log_dir / f"inference_{stamp}.log").open("wb") as handle:
+            written = 0
+            while written < size:
+                chunk = block[: size - written]
+                handle.write(chunk)
+                written += len(chunk)
+        remaining -= size
+        index += 1
+
+
+def _build_history(history_file: Path, entries: int) -> None:
+    start = datetime.now() - timedelta(days=30)
+    statuses = ("manual_stopped", "failed", "manual_stopped", "manual_stopped")
+    items = []
+    for index in range(entries):
+        begin = start + timedelta(minutes=3 * index)
+        items.append(
+            {
+                "start_time": begin.strftime(TIMESTAMP_FORMAT),
+                "end_time": (begin + timedelta(minutes=2)).strftime(TIMESTAMP_FORMAT),
+                "model": f"model_{index % 50:03d}.onnx",
+                "config": f"config_{index % 20:03d}.yaml",
+                "log_file": f"inference_{begin.strftime(TIMESTAMP_FORMAT)}.log",
+                "status": statuses[index % len(statuses)],
+            }
+        )
+    history_file.write_text(json.dumps(items, indent=2))
+
+
+def _build_models(model_dir: Path, count: int, size_kb: int) -> None:
+    payload = bytes(range(256)) * (size_kb * 4)
+    for index in range(count):
+        (model_dir / f"model_{index:03d}.onnx").write_bytes(payload)
+
+
+def _build_configs(config_dir: Path, count: int) -> None:
+    for index in range(count):
+        (config_dir / f"config_{index:03d}.yaml").write_text(
+            f"name: config_{index:03d}\nthreshold: 0.{index % 10}\ninput_size: [640, 640]\n"
+        )
@@ -7,6 +7,14 @@
 #include "string"
 #include "vector"
 #include "map"
+#include "cstdlib"
+#include "csignal"
+#include "fstream"
+#include "sstream"
+#include "sys/socket.h"
+#include "sys/un.h"
+#include "unistd.h"
+#include "arpa/inet.h"
 
 namespace logger {
     typedef enum {
@@ -98,6 +106,100 @@ namespace options {
     };
 }
 
+namespace results {
+    // Result channel: 4-byte big-endian length followed by the payload, sent over
+    // the Unix socket named by PI_INFER_RESULT_SOCKET. Reconnects on the next send
+    // after a failure (e.g. the API restarted).
+    class Writer {
+    public:
+        Writer() {
+            const char* path = std::getenv("PI_INFER_RESULT_SOCKET");
+            if (path) {
+                socketPath = path;
+            }
+        }
+
+        ~Writer() {
+            close();
+        }
+
+        bool enabled() const {
+            return !socketPath.empty();
+        }
+
+        void send(const std::string &payload) {
+            if (!enabled()) {
+                return;
+            }
+            if (fd < 0 && !connect()) {
+                return;
+            }
+            uint32_t length = htonl(static_cast<uint32_t>(payload.size()));
+            std::string frame(reinterpret_cast<const char*>(&length), sizeof(length));
+            frame += payload;
+            size_t sent = 0;
+            while (sent < frame.size()) {
+                ssize_t n = ::send(fd, frame.data() + sent, frame.size() - sent, MSG_NOSIGNAL);
+                if (n <= 0) {
+                    close();
+                    return;
+                }
+                sent += static_cast<size_t>(n);
+            }
+        }
+
+    private:
+        std::string socketPath;
+        int fd = -1;
+
+        bool connect() {
+            sockaddr_un addr{};
+            if (socketPath.size() >= sizeof(addr.sun_path)) {
+                return false;
+            }
+            fd = socket(AF_UNIX, SOCK_STREAM, 0);
+            if (fd < 0) {
+                return false;
+            }
+            addr.sun_family = AF_UNIX;
+            std::strncpy(addr.sun_path, socketPath.c_str(), sizeof(addr.sun_path) - 1);
+            if (::connect(fd, reinterpret_cast<sockaddr*>(&addr), sizeof(addr)) != 0) {
+                close();
+                return false;
+            }
+            return true;
+        }
+
+        void close() {
+            if (fd >= 0) {
+                ::close(fd);
+                fd = -1;
+            }
+        }
+    };
+}
+
+namespace reload {
+    // SIGHUP asks the inference loop to re-read its config file (PATCH /config?reload=true).
+    // Without a handler the default action would terminate the process.
+    volatile std::sig_atomic_t requested = 0;
+
+    void onSignal(int) {
+        requested = 1;
+    }
+
+    bool readConfig(const std::string &path, std::string &content) {
+        std::ifstream file(path, std::ios::binary);
+        if (!file) {
+            return false;
+        }
+        std::ostringstream buffer;
+        buffer << file.rdbuf();
+        content = buffer.str();
+        return true;
+    }
+}
+
 int main(int argc, char** argv) {
     logger::info("Starting inference application...");
     options::Options opts;
@@ -105,6 +207,7 @@ int main(int argc, char** argv) {
     logger::info("Using model: " + opts.get("model", "default_model_path"));
     logger::info("Using config: " + opts.get("config", "default_config_path"));
     logger::info("Log level: " + opts.get("log_level", "INFO"));
+    std::signal(SIGHUP, reload::onSignal);
 
 
     logger::info("Init model done.");
@@ -112,9 +215,25 @@ int main(int argc, char** argv) {
 
     logger::info("Start inference loop.");
 
+    results::Writer resultWriter;
+    if (resultWriter.enabled()) {
+        logger::info("Result channel enabled.");
+    }
+
     uint64_t counter = 0;
     while (true) {
+        if (reload::requested) {
+            reload::requested = 0;
+            std::string configPath = opts.get("config", "default_config_path");
+            std::string content;
+            if (reload::readConfig(configPath, content)) {
+                logger::info("Reloaded config: " + configPath + " (" + std::to_string(content.size()) + " bytes)");
+            } else {
+                logger::error("Failed to reload config: " + configPath);
+            }
+        }
         logger::info("Inference running... count: " + std::to_string(counter));
+        resultWriter.send("{\"count\": " + std::to_string(counter) + "}");
         counter++;
         std::this_thread::sleep_for(std::chrono::milliseconds(500));
     }
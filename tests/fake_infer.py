@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import argparse
+import signal
 import time
 
 
@@ -8,9 +9,10 @@ def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("--model", required=True)
     parser.add_argument("--config", required=True)
-    args = parser.parse_args()
+    args, _ = parser.parse_known_args()
     print(f"model={args.model}")
     print(f"config={args.config}")
+    signal.signal(signal.SIGHUP, lambda signum, frame: print(f"reloaded config={args.config}", flush=True))
     time.sleep(0.2)
 
 
@@ -0,0 +1,159 @@
+"""
+负载模拟推理程序
+
+可通过 PI_INFER_BINARY 直接替换真实推理程序，用于压测日志与进程管理路径。
+InferenceManager 只传递 --model/--config，因此所有选项也可以通过
+LOAD_INFER_<OPTION> 环境变量设置（例如 LOAD_INFER_RATE=5000）。
+"""
+
+from __future__ import annotations
+
+from typing import List, Optional
+import argparse
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+import time
+
+OPTIONS = {
+    "rate": (float, 1000.0, "每秒输出的日志行数"),
+    "burst_size": (int, 0, "每次突发额外输出的行数"),
+    "burst_every": (float, 1.0, "突发间隔（秒）"),
+    "crash_after": (int, 0, "输出 N 行后以 exit_code 退出，0 表示不崩溃"),
+    "exit_code": (int, 1, "崩溃时的退出码"),
+    "ignore_sigterm": (int, 0, "为 1 时忽略 SIGTERM"),
+    "shutdown_delay": (float, 0.0, "收到 SIGTERM 后延迟退出的秒数"),
+    "mem_growth_kb": (int, 0, "每秒增长的内存（KB）"),
+    "ready_delay": (float, 0.0, "开始输出前的就绪延迟（秒）"),
+    "duration": (float, 0.0, "运行时长（秒），0 表示一直运行"),
+    "line_bytes": (int, 80, "每行日志的大致字节数"),
+    "result_every": (int, 0, "每 N 帧向结果通道（PI_INFER_RESULT_SOCKET）写一条结果，0 表示不写"),
+}
+
+_terminating = False
+_reload_requested = False
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--config", required=True)
+    for name, (kind, default, help_text) in OPTIONS.items():
+        env_value = os.getenv(f"LOAD_INFER_{name.upper()}")
+        parser.add_argument(
+            f"--{name.replace('_', '-')}",
+            type=kind,
+            default=kind(env_value) if env_value is not None else default,
+            help=help_text,
+        )
+    args, _ = parser.parse_known_args()
+    return args
+
+
+def _on_sigterm(signum: int, frame: object) -> None:
+    global _terminating
+    _terminating = True
+
+
+def _on_sighup(signum: int, frame: object) -> None:
+    global _reload_requested
+    _reload_requested = True
+
+
+class _ResultWriter:
+    """按结果通道格式（4 字节大端长度 + JSON）写结果，连接断开时下次写入重连"""
+
+    def __init__(self, path: Optional[str]) -> None:
+        self.path = path
+        self.sock: Optional[socket.socket] = None
+
+    def send(self, result: dict) -> None:
+        if not self.path:
+            return
+        payload = json.dumps(result).encode()
+        try:
+            if self.sock is None:
+                self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self.sock.connect(self.path)
+            self.sock.sendall(struct.pack(">I", len(payload)) + payload)
+        except OSError:
+            if self.sock is not None:
+                self.sock.close()
+            self.sock = None
+
+
+def main() -> None:
+    global _reload_requested
+    args = _parse_args()
+    if args.ignore_sigterm:
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    else:
+        signal.signal(signal.SIGTERM, _on_sigterm)
+    signal.signal(signal.SIGHUP, _on_sighup)
+
+    out = sys.stdout
+    out.write(f"model={args.model}\nconfig={args.config}\n")
+    out.flush()
+    if args.ready_delay > 0:
+        time.sleep(args.ready_delay)
+    out.write("ready\n")
+    out.flush()
+
+    results = _ResultWriter(os.getenv("PI_INFER_RESULT_SOCKET") if args.result_every else None)
+    padding = "x" * max(0, args.line_bytes - 48)
+    ballast: List[bytes] = []
+    started = time.monotonic()
+    last_burst = started
+    last_growth = started
+    emitted = 0
+    tick = 0.01
+
+    while not _terminating:
+        if _reload_requested:
+            _reload_requested = False
+            try:
+                size = len(open(args.config, "rb").read())
+            except OSError as exc:
+                out.write(f"reload failed: {exc}\n")
+            else:
+                out.write(f"reloaded config={args.config} bytes={size}\n")
+            out.flush()
+        now = time.monotonic()
+        if args.duration and now - started >= args.duration:
+            break
+        due = int((now - started) * args.rate) - emitted
+        if args.burst_size and now - last_burst >= args.burst_every:
+            due += args.burst_size
+            last_burst = now
+        if due > 0:
+            if args.crash_after:
+                due = min(due, args.crash_after - emitted)
+            out.write("".join(
+                f"frame={emitted + i:09d} fps=30.0 latency=33.3ms {padding}\n" for i in range(due)
+            ))
+            out.flush()
+            if args.result_every:
+                for frame in range(emitted, emitted + due):
+                    if frame % args.result_every == 0:
+                        results.send({"frame": frame, "fps": 30.0, "latency_ms": 33.3})
+            emitted += due
+            if args.crash_after and emitted >= args.crash_after:
+                out.write("simulated crash\n")
+                out.flush()
+                os._exit(args.exit_code)
+        if args.mem_growth_kb and now - last_growth >= 1.0:
+            ballast.append(b"\x01" * args.mem_growth_kb * 1024)
+            last_growth = now
+        time.sleep(tick)
+
+    if args.shutdown_delay > 0:
+        time.sleep(args.shutdown_delay)
+    out.write(f"stopped after {emitted} lines\n")
+    out.flush()
+
+
+if __name__ == "__main__":
+    main()
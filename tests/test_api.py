@@ -1,11 +1,27 @@
 from __future__ import annotations
 
+from dataclasses import replace
+from datetime import datetime
 from pathlib import Path
+import asyncio
+import fcntl
+import hashlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tarfile
+import threading
+import time
 
 from fastapi.testclient import TestClient
+import pytest
 
 from app.config import Settings
 from app.main import create_app
+from app.managers.job_queue import CronSchedule
 
 
 def _build_settings(tmp_path: Path) -> Settings:
@@ -23,6 +39,8 @@ def _build_settings(tmp_path: Path) -> Settings:
         history_file=history_file,
         infer_binary=infer_binary,
         log_retention_days=7,
+        host="127.0.0.1",
+        port=8000,
         version="0.1.0",
         build_time="2026-02-06T00:00:00Z",
         git_commit="test",
@@ -76,7 +94,7 @@ def test_model_config_upload_and_list(tmp_path: Path) -> None:
     assert config_upload.status_code == 200
 
     models = client.get("/model/list").json()["models"]
-    configs = client.get("/configs/list").json()["configs"]
+    configs = client.get("/config/list").json()["configs"]
     assert any(path.endswith("model.onnx") for path in models)
     assert any(path.endswith("config.yaml") for path in configs)
 
@@ -91,3 +109,1028 @@ def test_system_status(tmp_path: Path) -> None:
     data = response.json()
     assert "memory_usage" in data
     assert "cpu_load" in data
+
+
+def _build_bundle(files: dict[str, bytes], manifest: dict) -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, data in [("manifest.json", json.dumps(manifest).encode())] + list(files.items()):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def test_bundle_upload_and_start(tmp_path: Path) -> None:
+    settings = _build_settings(tmp_path)
+    app = create_app(settings)
+    client = TestClient(app)
+
+    model_data = b"model-bytes"
+    config_data = b"threshold: 0.5\n"
+    manifest = {
+        "name": "det",
+        "model": {"file": "det.onnx", "sha256": hashlib.sha256(model_data).hexdigest()},
+        "config": {"file": "det.yaml", "sha256": hashlib.sha256(config_data).hexdigest()},
+        "args": ["--threads", "2"],
+    }
+    body = _build_bundle({"det.onnx": model_data, "det.yaml": config_data}, manifest)
+    upload = client.post("/bundle/upload", content=body)
+    assert upload.status_code == 200
+    assert upload.json()["name"] == "det"
+    assert (settings.model_dir / "det.onnx").read_bytes() == model_data
+    assert client.get("/bundle/list").json()["bundles"] == ["det"]
+
+    manifest["model"]["sha256"] = "0" * 64
+    bad = _build_bundle({"det.onnx": b"other", "det.yaml": config_data}, dict(manifest, name="bad"))
+    rejected = client.post("/bundle/upload", content=bad)
+    assert rejected.status_code == 400
+    assert (settings.model_dir / "det.onnx").read_bytes() == model_data
+
+    broken_config = b"threshold: [0.5,\n"
+    broken = _build_bundle(
+        {"det.onnx": model_data, "det.yaml": broken_config},
+        dict(manifest, name="broken", model=dict(manifest["model"], sha256=hashlib.sha256(model_data).hexdigest()),
+             config={"file": "det.yaml", "sha256": hashlib.sha256(broken_config).hexdigest()}),
+    )
+    invalid = client.post("/bundle/upload", content=broken)
+    assert invalid.status_code == 422
+    assert invalid.json()["detail"][0]["line"] == 2
+
+    hidden = dict(manifest, name="hidden", config={"file": ".current_config", "sha256": manifest["config"]["sha256"]})
+    sneaky = client.post(
+        "/bundle/upload", content=_build_bundle({"det.onnx": model_data, ".current_config": config_data}, hidden)
+    )
+    assert sneaky.status_code == 400
+    assert not (settings.config_dir / ".current_config").exists()
+
+    start = client.post("/inference/start", params={"bundle": "det"})
+    assert start.status_code == 200
+    status = client.get("/inference/status").json()
+    assert status["current_model"] == "det.onnx"
+    assert status["current_config"] == "det.yaml"
+    client.post("/inference/stop")
+
+
+def test_config_schema_validation_and_parsed_read(tmp_path: Path) -> None:
+    settings = _build_settings(tmp_path)
+    app = create_app(settings)
+    client = TestClient(app)
+
+    schema = {
+        "type": "object",
+        "required": ["threshold"],
+        "properties": {"threshold": {"type": "number", "minimum": 0, "maximum": 1}},
+    }
+    assert client.post("/config/schema", json=schema).status_code == 200
+    for invalid in (
+        {"properties": {"name": {"type": "string", "pattern": "(unclosed"}}},
+        {"required": "threshold"},
+        {"properties": ["threshold"]},
+    ):
+        response = client.post("/config/schema", json=invalid)
+        assert response.status_code == 400
+        assert response.json()["detail"][0]["message"]
+    assert client.post("/config/schema", json={"type": "object", "properties": {"a": {"pattern": "("}}}).json()[
+        "detail"
+    ][0]["path"] == "/properties/a"
+    assert client.get("/config/schema").json()["schema"] == schema
+
+    upload = client.post(
+        "/config/upload",
+        files={"file": ("det.yaml", b"name: det\nthreshold: 0.5\n", "text/plain")},
+    )
+    assert upload.status_code == 200
+
+    rejected = client.post(
+        "/config/update",
+        params={"config": "det.yaml"},
+        json={"content": "name: det\nthreshold: 3\n"},
+    )
+    assert rejected.status_code == 422
+    assert rejected.json()["detail"][0]["path"] == "/threshold"
+    assert rejected.json()["detail"][0]["line"] == 2
+
+    broken = client.post(
+        "/config/upload",
+        files={"file": ("bad.json", b'{\n  "threshold": ,\n}', "application/json")},
+    )
+    assert broken.status_code == 422
+    assert broken.json()["detail"][0]["line"] == 2
+
+    parsed = client.get("/config/get", params={"config": "det.yaml", "format": "json"})
+    assert parsed.status_code == 200
+    assert parsed.json()["data"] == {"name": "det", "threshold": 0.5}
+    assert parsed.headers["etag"] == f'"{parsed.json()["hash"]}"'
+
+
+def test_config_patch_with_if_match(tmp_path: Path) -> None:
+    settings = _build_settings(tmp_path)
+    app = create_app(settings)
+    client = TestClient(app)
+
+    client.post(
+        "/config/upload",
+        files={"file": ("det.json", b'{"threshold": 0.5, "labels": ["a"]}', "application/json")},
+    )
+    etag = client.get("/config/get", params={"config": "det.json"}).headers["etag"]
+
+    merged = client.patch(
+        "/config",
+        params={"config": "det.json"},
+        content=json.dumps({"threshold": 0.7}),
+        headers={"Content-Type": "application/merge-patch+json", "If-Match": etag},
+    )
+    assert merged.status_code == 200
+    assert merged.json()["reloaded"] is False
+
+    stale = client.patch(
+        "/config",
+        params={"config": "det.json"},
+        content=json.dumps([{"op": "add", "path": "/labels/-", "value": "b"}]),
+        headers={"Content-Type": "application/json-patch+json", "If-Match": etag},
+    )
+    assert stale.status_code == 412
+
+    patched = client.patch(
+        "/config",
+        params={"config": "det.json"},
+        content=json.dumps([{"op": "add", "path": "/labels/-", "value": "b"}]),
+        headers={"Content-Type": "application/json-patch+json", "If-Match": merged.headers["etag"]},
+    )
+    assert patched.status_code == 200
+    data = client.get("/config/get", params={"config": "det.json", "format": "json"}).json()["data"]
+    assert data == {"threshold": 0.7, "labels": ["a", "b"]}
+
+
+def test_config_patch_reload_keeps_inference_running(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("LOAD_INFER_RATE", "10")
+    settings = replace(_build_settings(tmp_path), infer_binary=Path(__file__).parent / "load_infer.py")
+    settings.model_dir.mkdir(parents=True, exist_ok=True)
+    (settings.model_dir / "model.onnx").write_text("model")
+    client = TestClient(create_app(settings))
+    client.post("/config/upload", files={"file": ("det.json", b'{"threshold": 0.5}', "application/json")})
+
+    client.post("/inference/start", params={"model": "model.onnx", "config": "det.json"})
+    try:
+        log_file = Path(client.get("/inference/status").json()["log_file"])
+        deadline = time.monotonic() + 5
+        while "ready" not in log_file.read_text() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        patched = client.patch(
+            "/config",
+            params={"config": "det.json", "reload": "true"},
+            content=json.dumps({"threshold": 0.7}),
+            headers={"Content-Type": "application/merge-patch+json"},
+        )
+        assert patched.json()["reloaded"] is True
+        assert client.get("/inference/status").json()["running"] is True
+        deadline = time.monotonic() + 5
+        while "reloaded config=" not in log_file.read_text() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert "reloaded config=" in log_file.read_text()
+    finally:
+        client.post("/inference/stop")
+
+
+def test_config_versions_and_rollback(tmp_path: Path) -> None:
+    settings = _build_settings(tmp_path)
+    app = create_app(settings)
+    client = TestClient(app)
+
+    client.post("/config/upload", files={"file": ("det.yaml", b"threshold: 0.5\n", "text/plain")})
+    for value in ("0.6", "0.7", "0.5"):
+        response = client.post(
+            "/config/update",
+            params={"config": "det.yaml"},
+            json={"content": f"threshold: {value}\n"},
+        )
+        assert response.status_code == 200
+
+    versions = client.get("/config/versions", params={"config": "det.yaml"}).json()
+    assert [entry["version"] for entry in versions["versions"]] == [1, 2, 3, 4]
+    assert versions["head"] == 4
+    assert versions["versions"][0]["hash"] == versions["versions"][3]["hash"]
+
+    diff = client.get("/config/diff", params={"config": "det.yaml", "from": 2, "to": 3}).text
+    assert "-threshold: 0.6" in diff
+    assert "+threshold: 0.7" in diff
+
+    rollback = client.post("/config/rollback", params={"config": "det.yaml", "version": 3})
+    assert rollback.status_code == 200
+    assert (settings.config_dir / "det.yaml").read_text() == "threshold: 0.7\n"
+    versions = client.get("/config/versions", params={"config": "det.yaml"}).json()
+    assert versions["head"] == 3
+    assert len(versions["versions"]) == 4
+
+
+def test_model_verified_before_start(tmp_path: Path) -> None:
+    settings = _build_settings(tmp_path)
+    app = create_app(settings)
+    client = TestClient(app)
+
+    client.post("/config/upload", files={"file": ("config.yaml", b"a: 1\n", "text/plain")})
+    client.post("/model/upload", files={"file": ("model.onnx", b"weights", "application/octet-stream")})
+    assert client.post("/model/select", params={"model": "model.onnx"}).status_code == 200
+
+    start = client.post("/inference/start")
+    assert start.status_code == 200
+    status = client.get("/inference/status").json()
+    assert status["model_verified"] is True
+    assert status["preload_seconds"] is not None
+    client.post("/inference/stop")
+
+    (settings.model_dir / "model.onnx").write_bytes(b"corrupted")
+    rejected = client.post("/inference/start")
+    assert rejected.status_code == 422
+    assert "sha256" in rejected.json()["detail"]
+
+
+def test_profiling_with_admin_header(tmp_path: Path) -> None:
+    settings = replace(_build_settings(tmp_path), profile_token="secret")
+    app = create_app(settings)
+    client = TestClient(app)
+
+    admin = {"X-Profile": "secret"}
+
+    client.get("/history")
+    assert client.get("/debug/profiles").status_code == 403
+    assert client.get("/debug/profiles", headers={"X-Profile": "wrong"}).status_code == 403
+    assert client.get("/debug/profiles", headers=admin).json()["profiles"] == []
+
+    stop = threading.Event()
+
+    def busy() -> None:
+        while not stop.is_set():
+            sum(range(1000))
+
+    neighbour = threading.Thread(target=busy, name="busy-neighbour", daemon=True)
+    neighbour.start()
+    try:
+        client.get("/history", headers=admin)
+    finally:
+        stop.set()
+        neighbour.join()
+    profiles = client.get("/debug/profiles", headers=admin).json()["profiles"]
+    assert len(profiles) == 1
+    assert profiles[0]["path"] == "/history"
+    assert client.get("/debug/profiles", params={"id": profiles[0]["id"]}).status_code == 403
+    collapsed = client.get("/debug/profiles", params={"id": profiles[0]["id"]}, headers=admin)
+    assert collapsed.status_code == 200
+    # 只采样处理该请求的线程，同时运行的其他线程不计入
+    threads = {line.split(";", 1)[0] for line in collapsed.text.splitlines() if line}
+    assert "busy-neighbour" not in threads
+
+
+def test_import_is_side_effect_free_and_startup_reported(tmp_path: Path) -> None:
+    data_dir = tmp_path / "data"
+    env = {**os.environ, "PI_INFER_DATA_DIR": str(data_dir)}
+    subprocess.run(
+        [sys.executable, "-c", "import app.main; import app.managers.system_monitor as m; "
+         "import sys; assert 'psutil' not in sys.modules and 'yaml' not in sys.modules"],
+        cwd=str(Path(__file__).resolve().parents[1]),
+        env=env,
+        check=True,
+    )
+    assert not data_dir.exists()
+
+    settings = _build_settings(tmp_path)
+    client = TestClient(create_app(settings))
+    startup = client.get("/version").json()["startup"]
+    assert startup["create_app_seconds"] >= 0
+    assert not settings.model_dir.exists()
+
+
+def test_workers_share_inference_state(tmp_path: Path) -> None:
+    settings = replace(_build_settings(tmp_path), run_dir=tmp_path / "run")
+    settings.model_dir.mkdir(parents=True, exist_ok=True)
+    settings.config_dir.mkdir(parents=True, exist_ok=True)
+    (settings.model_dir / "model.onnx").write_text("model")
+    (settings.config_dir / "config.yaml").write_text("config")
+    worker_a = TestClient(create_app(settings))
+    worker_b = TestClient(create_app(settings))
+
+    pid = worker_a.post("/inference/start").json()["pid"]
+    status_b = worker_b.get("/inference/status").json()
+    assert status_b["running"] is True
+    assert status_b["pid"] == pid
+    assert worker_b.post("/inference/start").status_code == 409
+
+    # 其他进程持有排他锁（如正在停止推理）时，状态查询不被阻塞
+    with (settings.run_dir / "inference.lock").open("a+") as handle:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        assert worker_b.get("/inference/status").json()["running"] is True
+
+    assert worker_b.post("/inference/stop").status_code == 200
+    assert worker_a.get("/inference/status").json()["running"] is False
+    history = worker_a.get("/history").json()["history"]
+    assert history[0]["status"] == "manual_stopped"
+
+
+def test_detached_inference_is_adopted_after_restart(tmp_path: Path) -> None:
+    settings = replace(_build_settings(tmp_path), run_dir=tmp_path / "run", detach_inference=True)
+    settings.model_dir.mkdir(parents=True, exist_ok=True)
+    settings.config_dir.mkdir(parents=True, exist_ok=True)
+    (settings.model_dir / "model.onnx").write_text("model")
+    (settings.config_dir / "config.yaml").write_text("config")
+    settings.history_file.parent.mkdir(parents=True, exist_ok=True)
+    settings.history_file.write_text(json.dumps([
+        {"start_time": "2026-01-01_00:00:00", "end_time": None, "model": "old.onnx",
+         "config": "old.yaml", "log_file": "old.log", "status": "running"},
+    ]))
+
+    with TestClient(create_app(settings)) as client:
+        pid = client.post("/inference/start").json()["pid"]
+    os.kill(pid, 0)
+
+    with TestClient(create_app(settings)) as client:
+        status = client.get("/inference/status").json()
+        assert status["running"] is True
+        assert status["pid"] == pid
+        assert status["detached"] is True
+        history = client.get("/history").json()["history"]
+        assert [item["status"] for item in history] == ["interrupted", "running"]
+        assert client.post("/inference/stop").status_code == 200
+
+
+def test_job_queue_runs_jobs_by_priority(tmp_path: Path) -> None:
+    settings = replace(_build_settings(tmp_path), run_dir=tmp_path / "run", job_poll_interval=0.05)
+    settings.model_dir.mkdir(parents=True, exist_ok=True)
+    settings.config_dir.mkdir(parents=True, exist_ok=True)
+    for name in ("a.onnx", "b.onnx"):
+        (settings.model_dir / name).write_text(name)
+    (settings.config_dir / "config.yaml").write_text("config")
+
+    with TestClient(create_app(settings)) as client:
+        blocker = client.post("/inference/start", params={"model": "a.onnx"})
+        assert blocker.status_code == 200
+        low = client.post("/jobs/enqueue", params={"model": "a.onnx", "duration": 0.2}).json()
+        high = client.post("/jobs/enqueue", params={"model": "b.onnx", "duration": 0.2}).json()
+        dropped = client.post("/jobs/enqueue", params={"model": "a.onnx"}).json()
+        assert client.post("/jobs/priority", params={"id": high["id"], "priority": 5}).status_code == 200
+        assert client.post("/jobs/cancel", params={"id": dropped["id"]}).json()["status"] == "cancelled"
+        queued = client.get("/jobs", params={"status": "queued"}).json()["jobs"]
+        assert [job["id"] for job in queued] == [high["id"], low["id"]]
+        schedule = client.post("/jobs/enqueue", params={"cron": "0 3 * * *"}).json()
+        assert schedule["next_run"].endswith("_03:00:00")
+        sunday = client.post("/jobs/enqueue", params={"cron": "0 3 * * 7"}).json()
+        assert time.strptime(sunday["next_run"], "%Y-%m-%d_%H:%M:%S").tm_wday == 6
+        assert client.post("/jobs/enqueue", params={"cron": "61 * * * *"}).status_code == 400
+        assert CronSchedule("0 0 * * 2-7/2").fields[4] == {2, 4, 6}
+        assert CronSchedule("0 0 * * 6-7/3").fields[4] == {6}
+        assert CronSchedule("0 0 * * 5-7").fields[4] == {0, 5, 6}
+        # */n 与 * 一样视为不限制：日、周同时满足才匹配
+        every_other_monday = CronSchedule("0 0 */2 * 1")
+        assert every_other_monday.matches(datetime(2026, 10, 19))
+        assert not every_other_monday.matches(datetime(2026, 10, 26))
+
+        client.post("/inference/stop")
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            jobs = {job["id"]: job for job in client.get("/jobs").json()["jobs"]}
+            if jobs[low["id"]]["status"] == "done":
+                break
+            time.sleep(0.05)
+        assert jobs[high["id"]]["status"] == "done"
+        assert jobs[low["id"]]["status"] == "done"
+        assert jobs[high["id"]]["started_at"] <= jobs[low["id"]]["started_at"]
+        history = client.get("/history").json()["history"]
+        assert [item["model"] for item in history[-2:]] == ["b.onnx", "a.onnx"]
+
+        # 空闲轮询不重写 jobs.json
+        jobs_file = settings.run_dir / "jobs.json"
+        deadline = time.monotonic() + 5
+        while client.get("/inference/status").json()["running"] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.2)
+        stamp = jobs_file.stat().st_mtime_ns
+        time.sleep(0.3)
+        assert jobs_file.stat().st_mtime_ns == stamp
+
+
+def test_manually_stopped_job_is_cancelled_on_any_worker(tmp_path: Path) -> None:
+    settings = replace(_build_settings(tmp_path), run_dir=tmp_path / "run", job_poll_interval=0.05)
+    settings.model_dir.mkdir(parents=True, exist_ok=True)
+    settings.config_dir.mkdir(parents=True, exist_ok=True)
+    (settings.model_dir / "model.onnx").write_text("model")
+    (settings.config_dir / "config.yaml").write_text("config")
+
+    with TestClient(create_app(settings)) as worker_a, TestClient(create_app(settings)) as worker_b:
+        for stopper in (worker_a, worker_b):
+            job = worker_a.post("/jobs/enqueue").json()
+            deadline = time.monotonic() + 10
+            while worker_a.get("/jobs").json()["jobs"][0]["status"] != "running" and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert stopper.post("/inference/stop").status_code == 200
+            while time.monotonic() < deadline:
+                current = {item["id"]: item for item in worker_a.get("/jobs").json()["jobs"]}[job["id"]]
+                if current["status"] != "running":
+                    break
+                time.sleep(0.05)
+            assert current["status"] == "cancelled"
+
+
+def test_sweep_reports_ranked_metrics(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("LOAD_INFER_RATE", "200")
+    settings = replace(
+        _build_settings(tmp_path),
+        infer_binary=Path(__file__).parent / "load_infer.py",
+        run_dir=tmp_path / "run",
+        sweep_dir=tmp_path / "sweeps",
+    )
+    settings.model_dir.mkdir(parents=True, exist_ok=True)
+    settings.config_dir.mkdir(parents=True, exist_ok=True)
+    for name in ("fast.onnx", "slow.onnx"):
+        (settings.model_dir / name).write_text(name)
+    (settings.config_dir / "config.yaml").write_text("config")
+    client = TestClient(create_app(settings))
+
+    assert client.post("/sweeps/start", params={"models": "missing.onnx", "duration": 1}).status_code == 404
+    assert client.post("/sweeps/start", params={"models": "fast.onnx"}).status_code == 400
+    sweep = client.post("/sweeps/start", params={"duration": 0.4, "interval": 0.1}).json()
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        report = client.get("/sweeps/report", params={"id": sweep["id"]}).json()
+        if report["status"] != "running":
+            break
+        time.sleep(0.1)
+
+    assert report["status"] == "done"
+    assert {result["model"] for result in report["results"]} == {"fast.onnx", "slow.onnx"}
+    assert sorted(result["rank"] for result in report["results"]) == [1, 2]
+    best = report["results"][0]
+    assert best["frames"] > 0
+    assert best["fps_mean"] == 30.0
+    assert best["latency_p50_ms"] == 33.3
+    assert best["rss_peak_mb"] > 0
+    listed = client.get("/sweeps").json()["sweeps"]
+    assert listed[0]["id"] == sweep["id"]
+    assert listed[0]["best"]["model"] == best["model"]
+    csv_text = client.get("/sweeps/report", params={"id": sweep["id"], "format": "csv"}).text
+    assert csv_text.splitlines()[0].startswith("rank,model,config")
+    assert len(csv_text.splitlines()) == 3
+
+
+def test_startup_interrupts_stale_sweeps(tmp_path: Path) -> None:
+    settings = replace(_build_settings(tmp_path), run_dir=tmp_path / "run", sweep_dir=tmp_path / "sweeps")
+    settings.sweep_dir.mkdir(parents=True)
+    stale = {
+        "id": "20260101000000-abcdef",
+        "status": "running",
+        "models": ["model.onnx"],
+        "configs": ["config.yaml"],
+        "rank_by": "fps",
+        "results": [{"model": "model.onnx", "config": "config.yaml", "status": "done", "fps_mean": 30.0}],
+        "owner_pid": 2 ** 22 + 1,
+        "owner_start": 1,
+    }
+    (settings.sweep_dir / f"{stale['id']}.json").write_text(json.dumps(stale))
+
+    with TestClient(create_app(settings)) as client:
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            report = client.get("/sweeps/report", params={"id": stale["id"]}).json()
+            if report["status"] != "running":
+                break
+            time.sleep(0.05)
+
+    assert report["status"] == "interrupted"
+    assert report["finished_at"]
+    assert report["results"][0]["rank"] == 1
+    assert (settings.sweep_dir / f"{stale['id']}.csv").exists()
+
+
+def test_model_limits_apply_to_inference(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("LOAD_INFER_RATE", "10")
+    settings = replace(
+        _build_settings(tmp_path),
+        infer_binary=Path(__file__).parent / "load_infer.py",
+        run_dir=tmp_path / "run",
+        cgroup_root=tmp_path / "no-cgroup",
+    )
+    settings.model_dir.mkdir(parents=True, exist_ok=True)
+    settings.config_dir.mkdir(parents=True, exist_ok=True)
+    (settings.model_dir / "model.onnx").write_text("model")
+    (settings.config_dir / "config.yaml").write_text("config")
+    client = TestClient(create_app(settings))
+    cpu = min(os.sched_getaffinity(0))
+
+    assert client.post("/model/limits", params={"model": "model.onnx", "cpuset": "x"}).status_code == 400
+    limits = client.post(
+        "/model/limits", params={"model": "model.onnx", "memory_max": "2G", "cpuset": str(cpu)}
+    ).json()
+    assert limits["effective"]["memory_max"] == 2 * 1024 ** 3
+
+    pid = client.post("/inference/start").json()["pid"]
+    try:
+        status = client.get("/inference/status").json()
+        assert status["limits"]["mode"] == "rlimit"
+        address_space = next(
+            line for line in Path(f"/proc/{pid}/limits").read_text().splitlines()
+            if line.startswith("Max address space")
+        )
+        assert str(2 * 1024 ** 3) in address_space
+        assert os.sched_getaffinity(pid) == {cpu}
+    finally:
+        client.post("/inference/stop")
+
+    client.post("/model/limits", params={"model": "model.onnx"})
+    assert client.get("/model/limits", params={"model": "model.onnx"}).json()["configured"] == {}
+
+
+def test_history_pagination_filters_and_stats(tmp_path: Path) -> None:
+    settings = _build_settings(tmp_path)
+    records = []
+    for index in range(30):
+        day = 1 + index // 10
+        records.append({
+            "start_time": f"2026-03-{day:02d}_10:{index:02d}:00",
+            "end_time": f"2026-03-{day:02d}_11:{index:02d}:00",
+            "model": "a.onnx" if index % 2 else "b.onnx",
+            "config": "c.yaml",
+            "log_file": f"run{index}.log",
+            "status": "failed" if index % 5 == 0 else "manual_stopped",
+        })
+    settings.history_file.parent.mkdir(parents=True, exist_ok=True)
+    settings.history_file.write_text(json.dumps(records))
+    client = TestClient(create_app(settings))
+
+    page = client.get("/history", params={"limit": 4}).json()
+    assert [item["id"] for item in page["history"]] == [26, 27, 28, 29]
+    older = client.get("/history", params={"limit": 4, "cursor": page["next_cursor"]}).json()
+    assert [item["id"] for item in older["history"]] == [22, 23, 24, 25]
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 3, "model": "a.onnx", "since": "2026-03-02_00:00:00"}
+        if cursor is not None:
+            params["cursor"] = cursor
+        data = client.get("/history", params=params).json()
+        seen = [item["id"] for item in data["history"]] + seen
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == list(range(11, 30, 2))
+    failed = client.get("/history", params={"status": "failed", "limit": 100}).json()["history"]
+    assert [item["id"] for item in failed] == [0, 5, 10, 15, 20, 25]
+    assert client.get("/history", params={"since": "yesterday"}).status_code == 400
+
+    stats = client.get("/history/stats").json()["stats"]
+    by_model = {row["model"]: row for row in stats}
+    assert by_model["b.onnx"]["runs"] == 15
+    assert by_model["b.onnx"]["failed"] == 3
+    assert by_model["b.onnx"]["failure_rate"] == 0.2
+    assert by_model["a.onnx"]["mean_uptime"] == 3600.0
+    march_first = client.get(
+        "/history/stats", params={"group_by": "pair", "until": "2026-03-01_23:59:59"}
+    ).json()["stats"]
+    assert sum(row["runs"] for row in march_first) == 10
+
+    settings.model_dir.mkdir(parents=True, exist_ok=True)
+    settings.config_dir.mkdir(parents=True, exist_ok=True)
+    (settings.model_dir / "a.onnx").write_text("model")
+    (settings.config_dir / "c.yaml").write_text("config")
+    client.post("/inference/start", params={"model": "a.onnx", "config": "c.yaml"})
+    client.post("/inference/stop")
+    stats = client.get("/history/stats", params={"model": "a.onnx"}).json()["stats"]
+    assert stats[0]["runs"] == 16
+    assert stats[0]["finished"] == 16
+
+
+def test_logs_cursor_returns_only_new_lines(tmp_path: Path) -> None:
+    settings = _build_settings(tmp_path)
+    settings.log_dir.mkdir(parents=True, exist_ok=True)
+    first = settings.log_dir / "inference_2026-03-01_10:00:00.log"
+    first.write_text("a\nb\nc\npart")
+    client = TestClient(create_app(settings))
+
+    response = client.get("/logs", params={"cursor": "", "tail": 2})
+    assert response.text == "b\nc"
+    cursor = response.headers["X-Log-Cursor"]
+    assert client.get("/logs", params={"cursor": cursor}).text == ""
+
+    with first.open("a") as handle:
+        handle.write("ial\nd\n")
+    (settings.log_dir / "inference_2026-03-01_11:00:00.log").write_text("e\n")
+    response = client.get("/logs", params={"cursor": cursor})
+    assert response.text == "partial\nd\ne"
+    cursor = response.headers["X-Log-Cursor"]
+    assert cursor == "inference_2026-03-01_11:00:00.log:2"
+    assert client.get("/logs", params={"cursor": cursor}).text == ""
+
+    # tail 从末尾向前按块读取，可跨越多个块与文件
+    big = settings.log_dir / "inference_2026-03-01_12:00:00.log"
+    big.write_text("".join(f"line {index:06d}\n" for index in range(100000)) + "tail-part")
+    response = client.get("/logs", params={"cursor": "", "tail": 3}, headers={"Origin": "http://ui.example"})
+    assert response.text == "line 099997\nline 099998\nline 099999"
+    assert response.headers["X-Log-Cursor"] == f"{big.name}:{big.stat().st_size - len('tail-part')}"
+    assert "x-log-cursor" in response.headers["access-control-expose-headers"].lower()
+    assert client.get("/logs", params={"cursor": "", "tail": 100002}).text.splitlines()[:3] == ["d", "e", "line 000000"]
+
+
+def test_inference_results_fan_out_over_websocket(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    from app.managers.result_channel import BINARY_HEADER, ResultChannel
+
+    monkeypatch.setenv("LOAD_INFER_RATE", "200")
+    monkeypatch.setenv("LOAD_INFER_RESULT_EVERY", "10")
+    settings = replace(
+        _build_settings(tmp_path),
+        infer_binary=Path(__file__).parent / "load_infer.py",
+        result_socket=tmp_path / "run" / "results.sock",
+    )
+    settings.model_dir.mkdir(parents=True, exist_ok=True)
+    settings.config_dir.mkdir(parents=True, exist_ok=True)
+    (settings.model_dir / "model.onnx").write_text("model")
+    (settings.config_dir / "config.yaml").write_text("config")
+
+    with TestClient(create_app(settings)) as client:
+        with client.websocket_connect("/inference/results") as json_ws, \
+                client.websocket_connect("/inference/results?format=binary") as binary_ws:
+            assert client.post("/inference/start").status_code == 200
+            first = json_ws.receive_json()
+            second = json_ws.receive_json()
+            assert first["encoding"] == "json"
+            assert first["data"]["frame"] % 10 == 0
+            assert second["seq"] == first["seq"] + 1
+            raw = binary_ws.receive_bytes()
+            seq, dropped = BINARY_HEADER.unpack_from(raw)
+            assert seq == first["seq"] and dropped == 0
+            assert json.loads(raw[BINARY_HEADER.size:]) == first["data"]
+            status = client.get("/inference/results/status").json()
+            assert status["listening"] is True and status["producers"] == 1
+            assert status["subscribers"] == 2
+            # 另一个 worker 无法监听同一套接字，不会收到结果
+            with TestClient(create_app(settings)) as other_worker:
+                assert other_worker.get("/inference/results").status_code == 503
+                assert other_worker.get("/inference/results/status").json()["listening"] is False
+            client.post("/inference/stop")
+
+    async def slow_subscriber() -> None:
+        channel = ResultChannel(tmp_path / "unused.sock", queue_size=2)
+        subscription = channel.subscribe()
+        for index in range(5):
+            channel.publish(json.dumps({"frame": index}).encode())
+        frames = await subscription.get(timeout=1)
+        assert [frame.to_dict()["data"]["frame"] for frame in frames] == [3, 4]
+        assert subscription.dropped == 3
+
+    asyncio.run(slow_subscriber())
+
+
+def test_fleet_aggregates_and_broadcasts_to_boards(tmp_path: Path) -> None:
+    import httpx
+
+    from app.managers.fleet import FleetAggregator, parse_boards
+
+    apps = {}
+    for name in ("board-1", "board-2"):
+        settings = _build_settings(tmp_path / name)
+        settings.model_dir.mkdir(parents=True, exist_ok=True)
+        (settings.model_dir / "yolo.onnx").write_text("model")
+        (settings.model_dir / "latest.onnx").write_text("model")
+        os.utime(settings.model_dir / "yolo.onnx", (0, 0))
+        apps[name] = create_app(settings)
+
+    def unreachable(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("connection refused", request=request)
+
+    boards = parse_boards("http://board-1:8000,http://board-2:8000#0.5,http://board-3:8000", 2.0)
+    assert [board.timeout for board in boards] == [2.0, 0.5, 2.0]
+    mounts = {
+        "http://board-1:8000": httpx.ASGITransport(app=apps["board-1"]),
+        "http://board-2:8000": httpx.ASGITransport(app=apps["board-2"]),
+        "http://board-3:8000": httpx.MockTransport(unreachable),
+    }
+
+    async def scenario() -> None:
+        fleet = FleetAggregator(boards, cache_ttl=60, mounts=mounts)
+        try:
+            view = await fleet.snapshot()
+            assert view["summary"] == {"boards": 3, "online": 2, "running": 0, "models": ["latest.onnx"]}
+            offline = view["boards"][2]
+            assert offline["ok"] is False and "ConnectError" in offline["error"]
+            assert view["boards"][0]["system"]["memory_usage"]["total"] > 0
+            assert (await fleet.snapshot())["boards"][0]["fetched_at"] == view["boards"][0]["fetched_at"]
+
+            result = await fleet.broadcast(
+                "model/select", {"model": "yolo.onnx"}, names=["board-1:8000", "board-2:8000"]
+            )
+            assert result["ok"] is True
+            assert [item["response"] for item in result["results"]] == [{"model": "yolo.onnx"}] * 2
+            view = await fleet.snapshot(names=["board-1:8000", "board-2:8000"])
+            assert view["summary"]["models"] == ["yolo.onnx"]
+            with pytest.raises(ValueError):
+                await fleet.broadcast("model/delete", {})
+        finally:
+            await fleet.close()
+
+    asyncio.run(scenario())
+    assert TestClient(apps["board-1"]).get("/fleet").status_code == 404
+
+
+def test_model_patch_rebuilds_from_delta(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    from app.__main__ import main
+    from app.managers.model_delta import make_delta
+
+    settings = _build_settings(tmp_path)
+    settings.model_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(7)
+    old = bytes(rng.getrandbits(8) for _ in range(200_000))
+    new = old[:50_000] + b"inserted bytes" + old[50_000:120_000] + bytes(3000) + old[125_000:]
+    (settings.model_dir / "model.onnx").write_bytes(old)
+    new_file = tmp_path / "model-v2.onnx"
+    new_file.write_bytes(new)
+    client = TestClient(create_app(settings))
+
+    signature = client.get("/model/signature", params={"model": "model.onnx", "block_size": 4096}).json()
+    assert signature["size"] == len(old)
+    assert len(signature["blocks"]) == 49
+    delta = b"".join(make_delta(signature, new_file))
+    assert len(delta) < len(new) // 5
+    digest = hashlib.sha256(new).hexdigest()
+
+    params = {"base": "model.onnx", "model": "model-v2.onnx", "sha256": digest, "block_size": 4096}
+    response = client.post("/model/patch", params=params, content=delta)
+    assert response.status_code == 200
+    assert response.json()["literal_bytes"] < 12_000
+    assert (settings.model_dir / "model-v2.onnx").read_bytes() == new
+    assert client.get("/model/current").json()["model"] == "model-v2.onnx"
+
+    bad = client.post("/model/patch", params={**params, "sha256": "0" * 64}, content=delta)
+    assert bad.status_code == 400
+    assert client.post("/model/patch", params=params, content=delta[:-1]).status_code == 400
+    assert client.post("/model/patch", params={**params, "base": "missing.onnx"}, content=delta).status_code == 404
+    assert sorted(path.name for path in settings.model_dir.iterdir()) == [
+        ".current_model", ".hashes.json", ".usage.json", "model-v2.onnx", "model.onnx"
+    ]
+
+    # 命令行生成补丁：-o 只写出指令流，否则直接应用到本机数据目录
+    monkeypatch.setenv("PI_INFER_DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("PI_INFER_MODEL_DIR", str(settings.model_dir))
+    stream_file = tmp_path / "model.delta"
+    assert main(["delta", str(new_file), "--base", "model.onnx", "--block-size", "4096", "-o", str(stream_file)]) == 0
+    assert stream_file.read_bytes() == delta
+    assert main(["delta", str(new_file), "--base", "model.onnx", "--model", "cli.onnx", "--block-size", "4096"]) == 0
+    assert (settings.model_dir / "cli.onnx").read_bytes() == new
+    assert main(["delta", str(new_file), "--base", "missing.onnx"]) == 1
+
+    # 配额只够再放一个与基础模型同样大的文件：变大的补丁在写入过程中被中止
+    quota_dir = tmp_path / "quota"
+    limited = replace(settings, model_dir=quota_dir / "models", model_quota=str(2 * len(old) + 100))
+    limited.model_dir.mkdir(parents=True)
+    (limited.model_dir / "model.onnx").write_bytes(old)
+    grown = tmp_path / "grown.onnx"
+    grown.write_bytes(old + bytes(5000))
+    limited_client = TestClient(create_app(limited))
+    signature = limited_client.get("/model/signature", params={"model": "model.onnx", "block_size": 4096}).json()
+    response = limited_client.post(
+        "/model/patch",
+        params={"base": "model.onnx", "model": "grown.onnx", "sha256": hashlib.sha256(grown.read_bytes()).hexdigest(),
+                "block_size": 4096},
+        content=b"".join(make_delta(signature, grown)),
+    )
+    assert response.status_code == 507
+    assert "exceeds" in response.json()["detail"]
+    assert sorted(path.name for path in limited.model_dir.iterdir() if not path.name.startswith(".")) == ["model.onnx"]
+    assert not list(limited.model_dir.glob("*.partial"))
+
+
+def test_model_quota_evicts_least_recently_used(tmp_path: Path) -> None:
+    settings = replace(_build_settings(tmp_path), model_quota="100")
+    settings.model_dir.mkdir(parents=True, exist_ok=True)
+    usage = {}
+    for name, last_used in (("old.onnx", "2024-01-01"), ("mid.onnx", "2024-06-01"), ("new.onnx", "2025-01-01")):
+        (settings.model_dir / name).write_bytes(b"m" * 30)
+        usage[name] = {"last_used": f"{last_used}_00:00:00", "uses": 1, "pinned": False}
+    (settings.model_dir / ".usage.json").write_text(json.dumps(usage))
+    client = TestClient(create_app(settings))
+
+    assert client.post("/model/upload", files={"file": ("x.onnx", b"x" * 30)}).status_code == 200
+    assert client.post("/model/pin", params={"model": "mid.onnx"}).json() == {"model": "mid.onnx", "pinned": True}
+    assert client.post("/model/upload", files={"file": ("y.onnx", b"y" * 40)}).status_code == 200
+    assert client.get("/model/list").json() == {"models": ["mid.onnx", "x.onnx", "y.onnx"]}
+
+    # 当前模型 y 与固定的 mid 不可淘汰，只淘汰 x 也放不下：不删除任何模型
+    response = client.post("/model/upload", files={"file": ("z.onnx", b"z" * 50)})
+    assert response.status_code == 507
+    report = client.get("/model/usage").json()
+    assert report["quota"] == 100 and report["used"] == 100
+    assert [item["model"] for item in report["evictions"]] == ["old.onnx", "new.onnx"]
+    assert {item["model"]: (item["pinned"], item["current"]) for item in report["models"]} == {
+        "mid.onnx": (True, False), "x.onnx": (False, False), "y.onnx": (False, True),
+    }
+
+    client.post("/model/pin", params={"model": "mid.onnx", "pinned": "false"})
+    # 定时计划引用的模型同样不可淘汰
+    schedule = client.post("/jobs/enqueue", params={"cron": "0 3 * * *", "model": "mid.onnx"}).json()
+    assert client.post("/model/upload", files={"file": ("z.onnx", b"z" * 50)}).status_code == 507
+    client.post("/jobs/cancel", params={"id": schedule["id"]})
+    assert client.post("/model/upload", files={"file": ("z.onnx", b"z" * 50)}).status_code == 200
+    assert client.get("/model/list").json() == {"models": ["y.onnx", "z.onnx"]}
+    assert client.post("/model/pin", params={"model": "gone.onnx"}).status_code == 404
+
+
+def test_state_export_import_clones_board(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    from app.__main__ import main
+
+    source_settings = _build_settings(tmp_path / "source")
+    source = TestClient(create_app(source_settings))
+    source.post("/model/upload", files={"file": ("a.onnx", b"a" * 5000)})
+    source.post("/model/upload", files={"file": ("b.onnx", b"b" * 3000)})
+    source.post("/config/upload", files={"file": ("det.yaml", b"threshold: 0.5\n")})
+    source.post("/model/select", params={"model": "a.onnx"})
+    source_settings.history_file.parent.mkdir(parents=True, exist_ok=True)
+    history = [
+        {"start_time": "2026-01-01_10:00:00", "end_time": "2026-01-01_11:00:00", "model": "a.onnx",
+         "config": "det.yaml", "log_file": "run-1.log", "status": "stopped"},
+    ]
+    source_settings.history_file.write_text(json.dumps(history))
+
+    response = source.get("/state/export")
+    assert response.status_code == 200
+    archive = response.content
+    assert int(response.headers["content-length"]) == len(archive)
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        names = tar.getnames()
+        manifest = json.load(tar.extractfile("manifest.json"))
+    assert names == ["manifest.json", "models/a.onnx", "models/b.onnx", "configs/det.yaml", "history.json"]
+    assert manifest["current"] == {"model": "a.onnx", "config": "det.yaml"}
+
+    # 目标板卡已有同内容的 b（不同文件名）：以硬链接共享，不再写入
+    target_settings = _build_settings(tmp_path / "target")
+    target = TestClient(create_app(target_settings))
+    target.post("/model/upload", files={"file": ("b-old.onnx", b"b" * 3000)})
+    result = target.post("/state/import", content=archive).json()
+    assert result["models"] == {"written": ["a.onnx"], "linked": ["b.onnx"], "unchanged": []}
+    assert result["configs"]["written"] == ["det.yaml"] and result["history_added"] == 1
+    assert target.get("/model/current").json()["model"] == "a.onnx"
+    assert (target_settings.model_dir / "b.onnx").stat().st_ino == (target_settings.model_dir / "b-old.onnx").stat().st_ino
+    assert target.get("/history").json()["history"][0]["log_file"] == "run-1.log"
+
+    again = target.post("/state/import", content=archive).json()
+    assert again["models"]["unchanged"] == ["a.onnx", "b.onnx"] and again["history_added"] == 0
+
+    # 数据被篡改时整体拒绝，不留下任何文件
+    fresh_settings = _build_settings(tmp_path / "fresh")
+    fresh = TestClient(create_app(fresh_settings))
+    tampered = archive.replace(b"a" * 5000, b"a" * 4999 + b"x")
+    assert fresh.post("/state/import", content=tampered).status_code == 400
+    assert fresh.get("/model/list").json() == {"models": []}
+    # known 中的模型不传数据，导入端本机没有同哈希模型时拒绝
+    without_b = source.get("/state/export", params={"known": manifest["models"][1]["sha256"]}).content
+    assert len(without_b) < len(archive)
+    assert fresh.post("/state/import", content=without_b).status_code == 400
+
+    # 命令行直接读写本机数据目录
+    for name, value in (("MODEL_DIR", "models"), ("CONFIG_DIR", "configs"), ("HISTORY_FILE", "history/history.json")):
+        monkeypatch.setenv(f"PI_INFER_{name}", str(tmp_path / "source" / value))
+    monkeypatch.setenv("PI_INFER_DATA_DIR", str(tmp_path / "source"))
+    output = tmp_path / "state.tar"
+    assert main(["export", "-o", str(output)]) == 0
+    with tarfile.open(output) as tar:
+        assert tar.getnames() == names
+
+
+def test_run_log_download_and_streamed_archive(tmp_path: Path) -> None:
+    import zipfile
+
+    settings = _build_settings(tmp_path)
+    settings.log_dir.mkdir(parents=True, exist_ok=True)
+    settings.history_file.parent.mkdir(parents=True, exist_ok=True)
+    old_log = settings.log_dir / "inference_2026-01-01_10:00:00.log"
+    new_log = settings.log_dir / "inference_2026-01-02_10:00:00.log"
+    old_log.write_text("old run\n" * 1000)
+    new_log.write_text("".join(f"frame {index}\n" for index in range(5000)))
+    os.utime(old_log, (1767261600, 1767261600))  # 2026-01-01 左右
+    history = [
+        {"start_time": "2026-01-01_10:00:00", "end_time": "2026-01-01_11:00:00", "model": "a.onnx",
+         "config": "c.yaml", "log_file": str(old_log), "status": "stopped"},
+        {"start_time": "2026-01-02_10:00:00", "end_time": None, "model": "a.onnx",
+         "config": "c.yaml", "log_file": str(new_log), "status": "running"},
+    ]
+    settings.history_file.write_text(json.dumps(history))
+    client = TestClient(create_app(settings))
+
+    response = client.get("/logs/run", params={"id": 0})
+    assert response.status_code == 200 and response.text == old_log.read_text()
+    partial = client.get("/logs/run", params={"id": 0}, headers={"Range": "bytes=0-6"})
+    assert partial.status_code == 206 and partial.text == "old run"
+    running = client.get("/logs/run", params={"id": 1})
+    assert running.status_code == 200 and running.content == new_log.read_bytes()
+    assert client.get("/logs/run", params={"id": 9}).status_code == 404
+
+    archive = client.get("/logs/archive", params={"format": "zip"})
+    assert archive.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(archive.content)) as bundle:
+        assert bundle.namelist() == [old_log.name, new_log.name]
+        assert bundle.read(new_log.name) == new_log.read_bytes()
+    recent = client.get("/logs/archive", params={"since": "2026-01-02_00:00:00", "format": "tar.gz"})
+    with tarfile.open(fileobj=io.BytesIO(recent.content), mode="r:gz") as bundle:
+        assert bundle.getnames() == [new_log.name]
+        assert bundle.extractfile(new_log.name).read() == new_log.read_bytes()
+    assert len(recent.content) < new_log.stat().st_size // 4
+    assert client.get("/logs/archive", params={"format": "rar"}).status_code == 400
+    assert client.get("/logs/archive", params={"until": "2025-01-01_00:00:00"}).status_code == 404
+
+
+def test_fast_json_routes_and_negotiated_compression(tmp_path: Path) -> None:
+    from fastapi.routing import APIRoute
+
+    from app.compression import negotiate
+    from app.responses import FastJSONRoute, dumps
+
+    assert json.loads(dumps({"path": Path("/data/a.onnx"), "tags": {"x"}, 1: b"raw"})) == {
+        "path": "/data/a.onnx", "tags": ["x"], "1": "raw",
+    }
+    assert negotiate("gzip;q=0, br", ["zstd", "br", "gzip"]) == "br"
+    assert negotiate("gzip;q=0", ["gzip"]) is None
+    assert negotiate("*", ["zstd", "gzip"]) == "zstd"
+
+    settings = _build_settings(tmp_path)
+    settings.log_dir.mkdir(parents=True, exist_ok=True)
+    settings.history_file.parent.mkdir(parents=True, exist_ok=True)
+    log_file = settings.log_dir / "inference_2026-01-02_10:00:00.log"
+    log_file.write_text("".join(f"frame {index} detections=3 latency_ms=12.5\n" for index in range(2000)))
+    settings.history_file.write_text(json.dumps([
+        {"start_time": "2026-01-02_10:00:00", "end_time": None, "model": "a.onnx",
+         "config": "c.yaml", "log_file": str(log_file), "status": "running"},
+    ]))
+    app = create_app(settings)
+    routes = [route for route in app.routes if isinstance(route, APIRoute)]
+    assert routes and all(isinstance(route, FastJSONRoute) and route.response_model is None for route in routes)
+    client = TestClient(app)
+
+    status = client.get("/inference/status", headers={"Accept-Encoding": "gzip"})
+    assert status.json()["running"] is False and "content-encoding" not in status.headers
+
+    logs = client.get("/logs", headers={"Accept-Encoding": "gzip"})
+    assert logs.headers["content-encoding"] == "gzip" and logs.headers["vary"] == "Accept-Encoding"
+    assert int(logs.headers["content-length"]) < len(logs.content) // 10
+    assert logs.text == log_file.read_text().rstrip("\n")
+    plain = client.get("/logs", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers and plain.text == logs.text
+
+    # 流式响应逐块压缩，不再带原始长度
+    streamed = client.get("/logs/run", params={"id": 0}, headers={"Accept-Encoding": "gzip"})
+    assert streamed.headers["content-encoding"] == "gzip" and "content-length" not in streamed.headers
+    assert streamed.content == log_file.read_bytes()
+    ranged = client.get("/logs/run", params={"id": 0}, headers={"Accept-Encoding": "gzip", "Range": "bytes=0-6"})
+    assert ranged.status_code == 206 and "content-encoding" not in ranged.headers
+
+    # zstd/br（requirements.txt 中固定版本）按服务端偏好协商，一次性与流式响应都可解压
+    for encoding in ("zstd", "br"):
+        whole = client.get("/logs", headers={"Accept-Encoding": f"{encoding}, gzip"})
+        assert whole.headers["content-encoding"] == encoding and whole.text == logs.text
+        streamed = client.get("/logs/run", params={"id": 0}, headers={"Accept-Encoding": encoding})
+        assert streamed.headers["content-encoding"] == encoding
+        assert streamed.content == log_file.read_bytes()
+
+    # 压缩后的表示使用带编码后缀的强 ETag，If-Match 仍按内容哈希比较
+    settings.config_dir.mkdir(parents=True, exist_ok=True)
+    (settings.config_dir / "big.yaml").write_text("".join(f"key{index}: {index}\n" for index in range(500)))
+    raw = client.get("/config/get", params={"config": "big.yaml"}, headers={"Accept-Encoding": "identity"})
+    compressed = client.get("/config/get", params={"config": "big.yaml"}, headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["etag"] == raw.headers["etag"][:-1] + '-gzip"'
+    patched = client.patch(
+        "/config",
+        params={"config": "big.yaml"},
+        json={"key0": 1},
+        headers={"If-Match": compressed.headers["etag"], "Content-Type": "application/merge-patch+json"},
+    )
+    assert patched.status_code == 200
+
+
+def test_read_endpoints_are_coalesced_and_invalidated_by_writes(tmp_path: Path) -> None:
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.coalescing import RequestCoalescer
+
+    settings = replace(_build_settings(tmp_path), cache_ttl=60)
+    client = TestClient(create_app(settings))
+    assert client.get("/model/list").json() == {"models": []}
+    assert client.get("/model/list").json() == {"models": []}
+    client.post("/model/upload", files={"file": ("a.onnx", b"model")})
+    assert client.get("/model/list").json() == {"models": ["a.onnx"]}
+    stats = client.get("/status/cache").json()
+    assert stats["endpoints"]["model_list"] == {"hits": 1, "misses": 2, "coalesced": 0}
+    assert stats["invalidations"] >= 1
+
+    coalescer = RequestCoalescer(ttl=60)
+    calls = []
+
+    def slow() -> int:
+        calls.append(1)
+        time.sleep(0.2)
+        return len(calls)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: coalescer.get("slow", None, slow), range(8)))
+    assert results == [1] * 8
+    assert coalescer.get("slow", None, slow) == 1
+    coalescer.invalidate()
+    assert coalescer.get("slow", None, slow) == 2
+    stats = coalescer.stats()
+    assert len(calls) == stats["misses"] == 2
+    assert stats["coalesced"] >= 1 and stats["coalesced"] + stats["hits"] == 8
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+from pathlib import Path
+import time
+
+import pytest
+
+from app.managers import HistoryManager, InferenceManager, LogManager, ModelManager, ThermalGovernor
+from app.managers.governor import GovernorPolicy
+
+LOAD_INFER = Path(__file__).parent / "load_infer.py"
+
+
+def _build_manager(tmp_path: Path, stop_timeout: float = 5.0) -> InferenceManager:
+    log_manager = LogManager(tmp_path / "logs", retention_days=7)
+    history_manager = HistoryManager(tmp_path / "history" / "history.json")
+    return InferenceManager(LOAD_INFER, log_manager, history_manager, stop_timeout=stop_timeout)
+
+
+def _model_and_config(tmp_path: Path) -> tuple[Path, Path]:
+    model = tmp_path / "model.onnx"
+    config = tmp_path / "config.yaml"
+    model.write_text("model")
+    config.write_text("a: 1\n")
+    return model, config
+
+
+def _wait_until(predicate, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return
+        time.sleep(0.02)
+    raise AssertionError("condition not met in time")
+
+
+def test_log_flood_is_readable_while_running(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("LOAD_INFER_RATE", "20000")
+    monkeypatch.setenv("LOAD_INFER_BURST_SIZE", "5000")
+    manager = _build_manager(tmp_path)
+    manager.start(*_model_and_config(tmp_path))
+    try:
+        _wait_until(lambda: manager.log_file.stat().st_size > 2_000_000)
+        tail = manager.log_manager.read_logs(tail=100).splitlines()
+        assert len(tail) == 100
+        assert manager.status().running is True
+    finally:
+        manager.stop()
+    assert manager.status().running is False
+
+
+def test_crash_is_detected_and_recorded(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("LOAD_INFER_CRASH_AFTER", "500")
+    monkeypatch.setenv("LOAD_INFER_EXIT_CODE", "3")
+    manager = _build_manager(tmp_path)
+    manager.start(*_model_and_config(tmp_path))
+    _wait_until(lambda: manager.process is not None and manager.process.poll() is not None)
+    status = manager.status()
+    assert status.running is False
+    assert status.exit_code == 3
+    assert manager.history_manager.list_history(1)[0]["status"] == "failed"
+
+
+def test_stop_escalates_when_sigterm_is_ignored(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("LOAD_INFER_IGNORE_SIGTERM", "1")
+    monkeypatch.setenv("LOAD_INFER_RATE", "100")
+    manager = _build_manager(tmp_path, stop_timeout=0.5)
+    manager.start(*_model_and_config(tmp_path))
+    _wait_until(lambda: "ready" in manager.log_file.read_text())
+    started = time.monotonic()
+    manager.stop()
+    assert time.monotonic() - started < 3.0
+    assert manager.last_exit_code == -9
+
+
+class _HeatSource:
+    """可调温度的系统采样替身"""
+
+    def __init__(self) -> None:
+        self.temperature = 50.0
+
+    def get_status(self) -> dict:
+        return {
+            "temperature": {"current": self.temperature},
+            "cpu_load": {"cpu_percent": 10.0},
+            "memory_usage": {"percent": 20.0},
+        }
+
+
+def _proc_state(pid: int) -> str:
+    return Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()[0]
+
+
+def test_governor_duty_cycles_hot_inference(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("LOAD_INFER_RATE", "100")
+    manager = _build_manager(tmp_path)
+    heat = _HeatSource()
+    governor = ThermalGovernor(
+        manager,
+        heat,
+        manager.history_manager,
+        ModelManager(tmp_path / "models"),
+        GovernorPolicy(policy="duty", interval=0.2, duty=0.5, duty_period=0.1),
+    )
+    pid = manager.start(*_model_and_config(tmp_path))
+    governor.start()
+    try:
+        heat.temperature = 90.0
+        _wait_until(lambda: governor.status()["state"] == "throttled")
+        _wait_until(lambda: _proc_state(pid) == "T", timeout=2.0)
+        heat.temperature = 60.0
+        _wait_until(lambda: governor.status()["state"] == "normal")
+        assert _proc_state(pid) != "T"
+    finally:
+        governor.stop()
+        manager.stop()
+    status = governor.status()
+    assert status["throttle_count"] == 1
+    assert status["throttled_seconds"] > 0
+    events = manager.history_manager.list_history(1)[0]["events"]
+    assert [event["action"] for event in events] == ["throttle", "restore"]
+    assert events[0]["reason"].startswith("temperature 90.0")
+
+
+def test_only_one_worker_runs_the_governor(tmp_path: Path) -> None:
+    manager = _build_manager(tmp_path)
+    policy = GovernorPolicy(policy="nice", interval=0.05)
+    governors = [
+        ThermalGovernor(manager, _HeatSource(), manager.history_manager, ModelManager(tmp_path / "models"), policy)
+        for _ in range(2)
+    ]
+    leader, follower = governors
+    leader.start()
+    try:
+        _wait_until(lambda: leader.status()["leader"])
+        follower.start()
+        time.sleep(0.2)
+        assert follower.status()["running"] is True
+        assert follower.status()["leader"] is False
+        leader.stop()
+        _wait_until(lambda: follower.status()["leader"])
+    finally:
+        for governor in governors:
+            governor.stop()
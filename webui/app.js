@@ -53,7 +53,7 @@ const logOutput = document.getElementById("logOutput");
 
 const historyLimitInput = document.getElementById("historyLimit");
 const loadHistoryBtn = document.getElementById("loadHistory");
-const historyTable = document.getElementById("historyTable");
+const historyBody = document.getElementById("historyBody");
 
 const configEditor = document.getElementById("configEditor");
 const loadConfigBtn = document.getElementById("loadConfig");
@@ -72,6 +72,7 @@ const tabsToggle = document.getElementById("tabsToggle");
 const tabsMenu = document.getElementById("tabsMenu");
 
 let autoRefreshTimer = null;
+let logCursor = null;
 let telemetryChart = null;
 let telemetryPoints = [];
 let selectedModelPath = "";
@@ -89,6 +90,7 @@ const defaultApiBase = "/api";
 const savedApiBase = localStorage.getItem("piInferApiBase");
 
 const defaultRefreshRate = 5;
+const maxLogLines = 5000; // Oldest lines are dropped so memory stays flat in long sessions
 const savedRefreshRate = localStorage.getItem("piInferRefreshRate");
 
 const savedSelectedModelPath = localStorage.getItem("piInferSelectedModelPath");
@@ -130,6 +132,103 @@ const buildTimestampedName = (filename, baseOverride = "") => {
   return `${base}_${stamp}${ext}`;
 };
 
+// Virtualized list: only rows inside the viewport (plus overscan) live in the DOM.
+// Rows are keyed, so refreshes reuse existing elements and only rewrite rows whose content changed.
+const createVirtualList = ({
+  container,
+  rowHeight,
+  rowClass,
+  renderRow,
+  keyOf = null,
+  signatureOf = (item) => item,
+  emptyText = "",
+  overscan = 8,
+}) => {
+  const spacer = document.createElement("div");
+  spacer.className = "virtual-spacer";
+  const empty = document.createElement("div");
+  empty.className = `${rowClass} virtual-empty`;
+  empty.textContent = emptyText;
+  container.replaceChildren(spacer, empty);
+
+  let items = [];
+  let dropped = 0; // Rows trimmed from the front, keeps default keys stable
+  let frame = null;
+  const rows = new Map();
+
+  const keyAt = (index) => (keyOf ? keyOf(items[index]) : dropped + index);
+  const atBottom = () => container.scrollHeight - container.scrollTop - container.clientHeight < rowHeight * 2;
+
+  const render = () => {
+    frame = null;
+    spacer.style.height = `${items.length * rowHeight}px`;
+    empty.hidden = items.length > 0;
+    const first = Math.max(0, Math.floor(container.scrollTop / rowHeight) - overscan);
+    const last = Math.min(items.length, Math.ceil((container.scrollTop + container.clientHeight) / rowHeight) + overscan);
+    const visible = new Set();
+    for (let index = first; index < last; index += 1) {
+      const key = keyAt(index);
+      const signature = signatureOf(items[index]);
+      visible.add(key);
+      let row = rows.get(key);
+      if (!row) {
+        const element = document.createElement("div");
+        element.className = rowClass;
+        element.style.height = `${rowHeight}px`;
+        spacer.appendChild(element);
+        row = { element, signature: null, index: -1 };
+        rows.set(key, row);
+      }
+      if (row.signature !== signature) {
+        renderRow(row.element, items[index]);
+        row.signature = signature;
+      }
+      if (row.index !== index) {
+        row.element.style.transform = `translateY(${index * rowHeight}px)`;
+        row.index = index;
+      }
+    }
+    rows.forEach((row, key) => {
+      if (!visible.has(key)) {
+        row.element.remove();
+        rows.delete(key);
+      }
+    });
+  };
+
+  const schedule = () => {
+    if (frame === null) frame = requestAnimationFrame(render);
+  };
+
+  container.addEventListener("scroll", schedule, { passive: true });
+  // Re-render when a hidden tab panel becomes visible or the viewport is resized
+  if (window.ResizeObserver) new ResizeObserver(schedule).observe(container);
+
+  return {
+    setItems(nextItems, { scrollToEnd = false } = {}) {
+      items = nextItems;
+      dropped = 0;
+      render();
+      if (scrollToEnd) container.scrollTop = container.scrollHeight;
+      schedule();
+    },
+    append(newItems, maxItems = Infinity) {
+      if (!newItems.length) return;
+      const follow = atBottom();
+      items = items.concat(newItems);
+      const overflow = items.length - maxItems;
+      if (overflow > 0) {
+        items = items.slice(overflow);
+        dropped += overflow;
+        if (!follow) container.scrollTop = Math.max(0, container.scrollTop - overflow * rowHeight);
+      }
+      render();
+      if (follow) container.scrollTop = container.scrollHeight;
+      schedule();
+    },
+  };
+};
+
 // Check URL parameters for API base
 const urlParams = new URLSearchParams(window.location.search);
 const urlApiBase = urlParams.get("api");
@@ -343,15 +442,33 @@ const listConfigs = async () => {
   renderConfigList(filtered);
 };
 
-const loadLogs = async () => {
+const logList = createVirtualList({
+  container: logOutput,
+  rowHeight: 18,
+  rowClass: "log-line",
+  renderRow: (element, line) => {
+    element.textContent = line;
+  },
+  emptyText: "No logs yet.",
+});
+
+// First load (or "Load Logs") fetches the tail; later refreshes only fetch lines after the cursor
+const loadLogs = async ({ reset = false } = {}) => {
   const tail = getInputValue(tailLinesInput).trim();
   const params = new URLSearchParams();
-  if (tail) params.set("tail", tail);
-  const suffix = params.toString() ? `?${params}` : "";
-  const response = await apiFetch(`/logs${suffix}`);
+  const incremental = !reset && logCursor !== null;
+  if (!incremental && tail) params.set("tail", tail);
+  params.set("cursor", incremental ? logCursor : "");
+  const response = await apiFetch(`/logs?${params}`);
   const text = await response.text();
-  logOutput.textContent = text || "No logs yet.";
-  logOutput.scrollTop = logOutput.scrollHeight; // Auto-scroll logs
+  const lines = text ? text.split("\n") : [];
+  const cursor = response.headers.get("X-Log-Cursor");
+  if (incremental) {
+    logList.append(lines, maxLogLines);
+  } else {
+    logList.setItems(lines.slice(-maxLogLines), { scrollToEnd: true });
+  }
+  logCursor = cursor;
 };
 
 const uploadFile = async (endpoint, fileInput, nameInput, nameKey) => {
@@ -614,69 +731,63 @@ const deleteConfig = async (pathValue) => {
   await listConfigs();
 };
 
+const historyFields = ["start_time", "end_time", "status", "model", "config"];
+
+const historyList = createVirtualList({
+  container: historyBody,
+  rowHeight: 36,
+  rowClass: "history-row",
+  keyOf: (entry) => entry.id ?? `${entry.start_time}|${entry.log_file}`,
+  signatureOf: (entry) => historyFields.map((field) => entry[field] || "-").join("\u0000"),
+  renderRow: (element, entry) => {
+    if (!element.childElementCount) {
+      historyFields.forEach(() => {
+        const cell = document.createElement("div");
+        cell.className = "history-cell";
+        element.appendChild(cell);
+      });
+    }
+    historyFields.forEach((field, index) => {
+      const cell = element.children[index];
+      const value = entry[field] || "-";
+      if (cell.textContent !== value) {
+        cell.textContent = value;
+        cell.title = value;
+      }
+    });
+  },
+  emptyText: "No history yet.",
+});
+
 const loadHistory = async () => {
   const limit = Number.parseInt(getInputValue(historyLimitInput), 10) || 10;
   const response = await apiFetch(`/history?limit=${limit}`);
   const data = await response.json();
-  const items = data.history || [];
-  historyTable.innerHTML = "";
-  const header = document.createElement("div");
-  header.className = "history-row header";
-  ["Start", "End", "Status", "Model", "Config"].forEach((text) => {
-    const cell = document.createElement("div");
-    cell.className = "history-cell";
-    cell.textContent = text;
-    header.appendChild(cell);
-  });
-  historyTable.appendChild(header);
-  if (!items.length) {
-    const empty = document.createElement("div");
-    empty.className = "history-row";
-    const cell = document.createElement("div");
-    cell.className = "history-cell";
-    cell.textContent = "No history yet.";
-    cell.style.gridColumn = "1 / -1";
-    empty.appendChild(cell);
-    historyTable.appendChild(empty);
-    return;
+  historyList.setItems(data.history || []);
+};
+
+const refreshTick = () => {
+  // Skip all polling while the browser tab is hidden; visibilitychange catches up on return
+  if (document.hidden) return;
+  refreshAll().catch(console.error);
+  loadLogs().catch(console.error);
+  loadHistory().catch(console.error);
+  // Only refresh lists for active tabs
+  const activeTab = document.querySelector('.tab-btn.active');
+  if (activeTab) {
+    if (activeTab.dataset.tab === 'models') {
+      listModels().catch(console.error);
+    } else if (activeTab.dataset.tab === 'configs') {
+      listConfigs().catch(console.error);
+    }
   }
-  items.forEach((entry) => {
-    const row = document.createElement("div");
-    row.className = "history-row";
-    [
-      entry.start_time || "-",
-      entry.end_time || "-",
-      entry.status || "-",
-      entry.model || "-",
-      entry.config || "-",
-    ].forEach((value) => {
-      const cell = document.createElement("div");
-      cell.className = "history-cell";
-      cell.textContent = value;
-      row.appendChild(cell);
-    });
-    historyTable.appendChild(row);
-  });
 };
 
 const applyRefresh = () => {
   const value = Number.parseInt(getInputValue(refreshRateInput), 10);
   const intervalMs = Number.isFinite(value) && value > 0 ? value * 1000 : 5000;
   if (autoRefreshTimer) clearInterval(autoRefreshTimer);
-  autoRefreshTimer = setInterval(() => {
-    refreshAll().catch(console.error);
-    loadLogs().catch(console.error);
-    loadHistory().catch(console.error);
-    // Only refresh lists for active tabs
-    const activeTab = document.querySelector('.tab-btn.active');
-    if (activeTab) {
-      if (activeTab.dataset.tab === 'models') {
-        listModels().catch(console.error);
-      } else if (activeTab.dataset.tab === 'configs') {
-        listConfigs().catch(console.error);
-      }
-    }
-  }, intervalMs);
+  autoRefreshTimer = setInterval(refreshTick, intervalMs);
   refreshAll().catch(console.error);
   loadLogs().catch(console.error);
   loadHistory().catch(console.error);
@@ -689,8 +800,13 @@ const applyRefresh = () => {
   setAction(`Auto refresh: ${Math.round(intervalMs / 1000)}s`, "ok");
 };
 
+document.addEventListener("visibilitychange", () => {
+  if (!document.hidden) refreshTick();
+});
+
 saveApiBaseBtn.addEventListener("click", () => {
   localStorage.setItem("piInferApiBase", getInputValue(apiBaseInput).trim());
+  logCursor = null;
   refreshAll();
 });
 
@@ -728,7 +844,7 @@ useConfigBtn.addEventListener("click", () => {
 
 listModelsBtn.addEventListener("click", () => listModels().catch(console.error));
 listConfigsBtn.addEventListener("click", () => listConfigs().catch(console.error));
-loadLogsBtn.addEventListener("click", () => loadLogs().catch(console.error));
+loadLogsBtn.addEventListener("click", () => loadLogs({ reset: true }).catch(console.error));
 applyRefreshBtn.addEventListener("click", applyRefresh);
 refreshRateInput.addEventListener("change", applyRefresh);
 loadHistoryBtn.addEventListener("click", () => loadHistory().catch(console.error));